@@ -1,4 +1,4 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.response import Response
 
 class StandardResultsSetPagination(PageNumberPagination):
@@ -17,3 +17,17 @@ class StandardResultsSetPagination(PageNumberPagination):
             'current_page': self.page.number,
             'results': data
         })
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Keyset pagination on (created_at, id), newest first.
+
+    Each page is an index range scan from the cursor, so old pages cost the
+    same as the first one. Responses carry opaque next/previous links instead
+    of page numbers and totals.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
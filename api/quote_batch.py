@@ -0,0 +1,195 @@
+"""
+Batch quotes for partner manifests.
+
+A batch is a JSON array of ``QuoteView`` payloads (or ``{"packages": [...]}``)
+or a CSV upload with the same columns. Rows are checked in a single pass
+without building a serializer per row, priced together by
+``shipping.pricing.quote_batch`` and returned in input order; rows that fail
+validation or have no rate card carry their errors instead of a price.
+
+Settings:
+    QUOTE_BATCH_MAX_ROWS: largest accepted batch (default 1000)
+
+Rows without ``usd_rate`` are converted at the server-side rate from
+``shipping.fx``.
+"""
+import csv
+import io
+import math
+
+from django.conf import settings
+
+from shipping import fx, pricing
+
+from .serializers import INDIA_CITIES, QUOTE_TYPES, ROUTE_CITIES, USA_CITIES, WEIGHT_METRICS, route_city_errors
+
+CHOICE_FIELDS = {
+    "shipping_route": list(ROUTE_CITIES),
+    "type": QUOTE_TYPES,
+    "origin": INDIA_CITIES + USA_CITIES,
+    "destination": INDIA_CITIES + USA_CITIES,
+    "weight_metric": WEIGHT_METRICS,
+}
+# Number field -> smallest accepted value and whether it must be strictly greater
+NUMBER_FIELDS = {
+    "weight": (0, True),
+    "dim_length": (0, False),
+    "dim_width": (0, False),
+    "dim_height": (0, False),
+    "usd_rate": (0, True),
+}
+OPTIONAL_FIELDS = {"usd_rate"}
+
+REQUIRED_MESSAGE = "This field is required."
+NUMBER_MESSAGE = "A valid number is required."
+
+
+class BatchError(ValueError):
+    """Raised when a batch as a whole cannot be read."""
+
+
+def max_rows():
+    return getattr(settings, 'QUOTE_BATCH_MAX_ROWS', 1000)
+
+
+def read_csv(upload):
+    """Return the rows of an uploaded CSV file as dicts."""
+    try:
+        text = io.TextIOWrapper(upload, encoding='utf-8-sig', newline='')
+        reader = csv.DictReader(text)
+        if not reader.fieldnames:
+            raise BatchError("The CSV file is empty.")
+        rows = []
+        for row in reader:
+            if not any((value or '').strip() for value in row.values() if isinstance(value, str)):
+                continue
+            rows.append({(key or '').strip(): (value or '').strip() for key, value in row.items()
+                         if isinstance(value, str)})
+            if len(rows) > max_rows():
+                break
+        return rows
+    except UnicodeDecodeError:
+        raise BatchError("The CSV file must be UTF-8 encoded.")
+    except csv.Error as e:
+        raise BatchError(f"Could not parse the CSV file: {e}")
+
+
+def read_batch(request):
+    """Return the list of package dicts posted to the batch endpoint."""
+    upload = request.FILES.get('file')
+    if upload is not None:
+        rows = read_csv(upload.file)
+    else:
+        rows = request.data
+        if isinstance(rows, dict) and 'packages' in rows:
+            rows = rows['packages']
+        if not isinstance(rows, list):
+            raise BatchError('Expected a JSON array of packages, {"packages": [...]} or a CSV file upload.')
+
+    if not rows:
+        raise BatchError("The batch contains no packages.")
+    if len(rows) > max_rows():
+        raise BatchError(f"A batch may contain at most {max_rows()} packages.")
+    return rows
+
+
+def clean_row(row):
+    """Return ``(data, errors)`` for one package; ``data`` is None when the row is invalid."""
+    if not isinstance(row, dict):
+        return None, {"non_field_errors": ["Expected an object with the quote fields."]}
+
+    data = {}
+    errors = {}
+    for field, choices in CHOICE_FIELDS.items():
+        value = row.get(field)
+        if value in (None, ''):
+            errors[field] = [REQUIRED_MESSAGE]
+        elif value not in choices:
+            errors[field] = [f'"{value}" is not a valid choice.']
+        else:
+            data[field] = value
+
+    for field, (minimum, exclusive) in NUMBER_FIELDS.items():
+        value = row.get(field)
+        if value in (None, ''):
+            if field not in OPTIONAL_FIELDS:
+                errors[field] = [REQUIRED_MESSAGE]
+            continue
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            errors[field] = [NUMBER_MESSAGE]
+            continue
+        if isinstance(value, bool) or not math.isfinite(number):
+            errors[field] = [NUMBER_MESSAGE]
+        elif number < minimum or (exclusive and number == minimum):
+            comparison = "greater than" if exclusive else "greater than or equal to"
+            errors[field] = [f"Ensure this value is {comparison} {minimum}."]
+        else:
+            data[field] = number
+
+    if "shipping_route" in data and "origin" in data and "destination" in data:
+        for field, message in route_city_errors(data["shipping_route"], data["origin"],
+                                                data["destination"]).items():
+            errors[field] = [message]
+
+    if errors:
+        return None, errors
+    return data, None
+
+
+def quote_rows(rows):
+    """Validate and price a batch; return one result dict per row, in input order."""
+    import numpy as np
+
+    results = [None] * len(rows)
+    valid = []
+    for position, row in enumerate(rows):
+        data, errors = clean_row(row)
+        if errors:
+            results[position] = {"index": position, "errors": errors}
+        else:
+            valid.append((position, data))
+
+    quotes = pricing.quote_batch([
+        {
+            "zone": data["shipping_route"],
+            "package_type": data["type"],
+            "weight": data["weight"],
+            "dimensions": (data["dim_length"], data["dim_width"], data["dim_height"]),
+            "weight_unit": data["weight_metric"],
+        }
+        for _, data in valid
+    ])
+
+    priced = [(position, data, quote) for (position, data), quote in zip(valid, quotes)
+              if not isinstance(quote, pricing.NoRateError)]
+    for (position, _), quote in zip(valid, quotes):
+        if isinstance(quote, pricing.NoRateError):
+            results[position] = {"index": position, "errors": {"non_field_errors": [str(quote)]}}
+
+    default_usd_rate = None
+    if any("usd_rate" not in data for _, data, _ in priced):
+        try:
+            default_usd_rate = float(fx.get_rate("USD", "INR"))
+        except fx.FxRateError as e:
+            for position, data, _ in priced:
+                if "usd_rate" not in data:
+                    results[position] = {"index": position, "errors": {"usd_rate": [str(e)]}}
+            priced = [item for item in priced if "usd_rate" in item[1]]
+
+    if priced:
+        inr_prices = np.array([pricing.whole_amount(quote.amount) for _, _, quote in priced], dtype=float)
+        usd_rates = np.array([data.get("usd_rate", default_usd_rate) for _, data, _ in priced])
+        usd_prices = np.ceil(inr_prices / usd_rates).astype(int).tolist()
+        for (position, _, quote), inr_price, usd_price, usd_rate in zip(
+                priced, inr_prices.astype(int).tolist(), usd_prices, usd_rates.tolist()):
+            results[position] = {
+                "index": position,
+                "inr_price": inr_price,
+                "usd_price": usd_price,
+                "chargeable_Weight": float(quote.chargeable_weight),
+                "shipping_time": quote.transit_time,
+                "usd_rate": usd_rate,
+            }
+    return results
@@ -6,6 +6,7 @@ from shipping.models import (
     ShipmentItem, TrackingEvent, Contact
 )
 from django.utils import timezone
+from shipping.shipments import create_shipment
 
 User = get_user_model()
 
@@ -51,10 +52,9 @@ class ShipmentItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = ShipmentItem
         fields = [
-            'id', 'shipment', 'name', 'quantity', 'description', 
-            'declared_value'
+            'id', 'shipment', 'name', 'quantity', 'description'
         ]
-        read_only_fields = ['id', 'created_at']
+        read_only_fields = ['id', 'shipment']
 
 class TrackingEventSerializer(serializers.ModelSerializer):
     class Meta:
@@ -68,7 +68,7 @@ class TrackingEventSerializer(serializers.ModelSerializer):
 class ShipmentSerializer(serializers.ModelSerializer):
     sender_address = ShippingAddressSerializer()
     recipient_address = ShippingAddressSerializer()
-    items = ShipmentItemSerializer(many=True, read_only=True)
+    items = ShipmentItemSerializer(many=True, required=False)
     tracking_events = TrackingEventSerializer(many=True, read_only=True)
     
     class Meta:
@@ -76,38 +76,18 @@ class ShipmentSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'tracking_number', 'sender_address', 'recipient_address',
             'package_type', 'weight', 'length', 'width', 'height',
-            'declared_value', 'status', 'shipping_date', 'delivery_date',
-            'shipping_cost', 'created_at', 'updated_at', 'items', 'tracking_events'
+            'status', 'status_changed_at', 'latest_location', 'shipping_date', 'delivery_date',
+            'courier_service', 'shipping_cost', 'created_at', 'updated_at', 'items', 'tracking_events'
         ]
         read_only_fields = [
-            'id', 'tracking_number', 'status', 'shipping_cost', 
-            'created_at', 'updated_at', 'items', 'tracking_events'
+            'id', 'tracking_number', 'status', 'status_changed_at', 'latest_location', 'shipping_cost', 
+            'created_at', 'updated_at', 'tracking_events'
         ]
 
     def create(self, validated_data):
-        sender_data = validated_data.pop('sender_address')
-        recipient_data = validated_data.pop('recipient_address')
-        
-        # Create or update sender address
-        sender_address = ShippingAddress.objects.create(
-            user=self.context['request'].user,
-            **sender_data
-        )
-        
-        # Create recipient address
-        recipient_address = ShippingAddress.objects.create(
-            user=None,  # Recipient might be a different user or not a user at all
-            **recipient_data
-        )
-        
-        # Create the shipment
-        shipment = Shipment.objects.create(
-            sender_address=sender_address,
-            recipient_address=recipient_address,
-            **validated_data
-        )
-        
-        return shipment
+        # Addresses, items, the first tracking event and the invoice are written by the shared service
+        request = self.context['request']
+        return create_shipment(validated_data, created_by=request.user, request=request)
 
 class BillSerializer(serializers.ModelSerializer):
     customer = UserSerializer(read_only=True)
@@ -201,49 +181,57 @@ class PickupRequestSerializer(serializers.ModelSerializer):
             'weight': {'required': False}
         }
 
+INDIA_CITIES = ["mumbai", "delhi", "bangalore", "chennai", "hyderabad"]
+USA_CITIES = ["new-york", "los-angeles", "chicago", "houston", "atlanta"]
+
+# shipping_route -> (valid origins, valid destinations)
+ROUTE_CITIES = {
+    "india-to-usa": (INDIA_CITIES, USA_CITIES),
+    "usa-to-india": (USA_CITIES, INDIA_CITIES),
+}
+QUOTE_TYPES = ["document", "package"]
+WEIGHT_METRICS = ["kg", "lb"]
+
+
+def route_city_errors(route, origin, destination):
+    """Return a dict of origin/destination errors for a shipping route."""
+    valid_origins, valid_destinations = ROUTE_CITIES[route]
+    errors = {}
+
+    if origin not in valid_origins:
+        errors["origin"] = (
+            f"'{origin}' is not valid for route '{route}'. "
+            f"Valid origins: {valid_origins}"
+        )
+
+    if destination not in valid_destinations:
+        errors["destination"] = (
+            f"'{destination}' is not valid for route '{route}'. "
+            f"Valid destinations: {valid_destinations}"
+        )
+
+    return errors
+
+
 class QuoteSerializer(serializers.Serializer):
-    shipping_route = serializers.ChoiceField(choices=["india-to-usa", "usa-to-india"])
-    type = serializers.ChoiceField(choices=["document", "package"])
-    origin = serializers.ChoiceField(choices=["mumbai", "delhi", "bangalore", "chennai", "hyderabad", "new-york", "los-angeles", "chicago", "houston", "atlanta"])
-    destination = serializers.ChoiceField(choices=["mumbai", "delhi", "bangalore", "chennai", "hyderabad", "new-york", "los-angeles", "chicago", "houston", "atlanta"])
+    shipping_route = serializers.ChoiceField(choices=list(ROUTE_CITIES))
+    type = serializers.ChoiceField(choices=QUOTE_TYPES)
+    origin = serializers.ChoiceField(choices=INDIA_CITIES + USA_CITIES)
+    destination = serializers.ChoiceField(choices=INDIA_CITIES + USA_CITIES)
     weight = serializers.FloatField()
-    weight_metric = serializers.ChoiceField(choices=["kg", "lb"])
+    weight_metric = serializers.ChoiceField(choices=WEIGHT_METRICS)
     dim_length = serializers.FloatField()
     dim_width = serializers.FloatField()
     dim_height = serializers.FloatField()
-    usd_rate = serializers.FloatField()
+    # INR per USD; the server-side rate is used when omitted
+    usd_rate = serializers.FloatField(required=False, min_value=0.0001)
 
     def validate(self, data):
         route = data.get("shipping_route")
-        origin = data.get("origin")
-        destination = data.get("destination")
-
-        india_cities = ["mumbai", "delhi", "bangalore", "chennai", "hyderabad"]
-        usa_cities = ["new-york", "los-angeles", "chicago", "houston", "atlanta"]
-
-        if route == "india-to-usa":
-            valid_origins = india_cities
-            valid_destinations = usa_cities
-        elif route == "usa-to-india":
-            valid_origins = usa_cities
-            valid_destinations = india_cities
-        else:
+        if route not in ROUTE_CITIES:
             raise serializers.ValidationError("Invalid shipping route.")
 
-        errors = {}
-
-        if origin not in valid_origins:
-            errors["origin"] = (
-                f"'{origin}' is not valid for route '{route}'. "
-                f"Valid origins: {valid_origins}"
-            )
-
-        if destination not in valid_destinations:
-            errors["destination"] = (
-                f"'{destination}' is not valid for route '{route}'. "
-                f"Valid destinations: {valid_destinations}"
-            )
-
+        errors = route_city_errors(route, data.get("origin"), data.get("destination"))
         if errors:
             raise serializers.ValidationError(errors)
 
@@ -11,7 +11,10 @@ from drf_yasg import openapi
 from django.conf import settings
 from django.conf.urls.static import static
 from . import views
-from .views import QuoteView, OrderViewSet, FeedbackViewSet
+from .views import (
+    QuoteView, QuoteBatchView, QuoteStatsView, TrackingEventIngestView, TrackingBatchLookupView, TrackingLookupView,
+    OrderViewSet, FeedbackViewSet,
+)
 
 # DRF Router
 router = DefaultRouter()
@@ -52,6 +55,13 @@ urlpatterns = [
 
     # Quote endpoint
     path('quote/', QuoteView.as_view(), name='quote'),
+    path('quote/batch/', QuoteBatchView.as_view(), name='quote-batch'),
+    path('quote/stats/', QuoteStatsView.as_view(), name='quote-stats'),
+
+    # Courier tracking feeds
+    path('tracking/events/', TrackingEventIngestView.as_view(), name='tracking-events-ingest'),
+    path('tracking/batch/', TrackingBatchLookupView.as_view(), name='tracking-batch-lookup'),
+    path('tracking/<str:tracking_number>/', TrackingLookupView.as_view(), name='tracking-lookup'),
 
     # Auth endpoints (JWT)
     path('auth/', include([
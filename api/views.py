@@ -6,9 +6,10 @@ from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.views import APIView
 from rest_framework.renderers import JSONRenderer
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models
-from django.db.models import Q
+from django.db.models import Prefetch, Q
 from django.utils import timezone
 import math
 
@@ -29,11 +30,37 @@ from .serializers import (
 
 # Import permissions
 from .permissions import IsOwnerOrAdmin, IsAdminOrReadOnly
+from .pagination import CreatedAtCursorPagination
+from shipping import fx, pricing
+from shipping.shipments import create_shipments
+from shipping import tracking_cache, tracking_events
+from . import quote_batch
 
 User = get_user_model()
 
 User = get_user_model()
 
+
+class QueryPlanMixin:
+    """
+    Declares the relations a viewset's serializer reads.
+
+    ``select_related`` and ``prefetch_related`` cover every nested or related
+    field the serializer renders, so a list page costs the same number of
+    queries whatever its size. Viewsets pass their queryset through
+    ``plan_queryset``.
+    """
+    select_related = ()
+    prefetch_related = ()
+
+    def plan_queryset(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        return queryset
+
+
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -85,7 +112,8 @@ class AddressViewSet(viewsets.ModelViewSet):
         address.save()
         return Response({'status': 'default address set'})
 
-class ShipmentViewSet(viewsets.ModelViewSet):
+class ShipmentViewSet(QueryPlanMixin, viewsets.ModelViewSet):
+    pagination_class = CreatedAtCursorPagination
     serializer_class = ShipmentSerializer
     permission_classes = [IsAuthenticated, IsOwnerOrAdmin]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -96,21 +124,43 @@ class ShipmentViewSet(viewsets.ModelViewSet):
         'status'
     ]
     ordering_fields = ['shipping_date', 'delivery_date', 'created_at', 'updated_at']
+    select_related = ('sender_address', 'recipient_address')
+    prefetch_related = (
+        'items',
+        # In the order ShipmentSerializer and the tracking_events action return them
+        Prefetch('tracking_events', queryset=TrackingEvent.objects.order_by('timestamp', 'id')),
+    )
 
     def get_queryset(self):
-        # Users can see shipments where they are either sender or recipient
-        return Shipment.objects.filter(
+        # Users can see shipments where they are either sender or recipient.
+        # Both joins follow foreign keys, so no shipment appears twice.
+        return self.plan_queryset(Shipment.objects.filter(
             models.Q(sender_address__user=self.request.user) |
             models.Q(recipient_address__user=self.request.user)
-        ).distinct()
+        ))
 
-    def perform_create(self, serializer):
-        # Automatically set the sender address user if not set
-        sender_address = serializer.validated_data.get('sender_address')
-        if sender_address and not sender_address.user:
-            sender_address.user = self.request.user
-            sender_address.save()
-        serializer.save()
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Create several shipments in one request.
+
+        Takes a JSON array of shipment payloads (at most SHIPMENT_BATCH_MAX_SIZE).
+        Nothing is created unless every payload is valid; errors are returned
+        per payload, in input order.
+        """
+        max_size = getattr(settings, 'SHIPMENT_BATCH_MAX_SIZE', 100)
+        if not isinstance(request.data, list) or not request.data:
+            return Response({"error": "Expected a non-empty JSON array of shipments."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(request.data) > max_size:
+            return Response({"error": f"A batch may contain at most {max_size} shipments."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(data=request.data, many=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        shipments = create_shipments(serializer.validated_data, created_by=request.user, request=request)
+        return Response(self.get_serializer(shipments, many=True).data, status=status.HTTP_201_CREATED)
 
     @action(detail=True, methods=['post'])
     def generate_bill(self, request, pk=None):
@@ -140,8 +190,7 @@ class ShipmentViewSet(viewsets.ModelViewSet):
     def tracking_events(self, request, pk=None):
         """Get tracking events for a shipment"""
         shipment = self.get_object()
-        events = shipment.tracking_events.all().order_by('timestamp')
-        serializer = TrackingEventSerializer(events, many=True)
+        serializer = TrackingEventSerializer(shipment.tracking_events.all(), many=True)
         return Response(serializer.data)
 
     @action(detail=True, methods=['get'])
@@ -152,7 +201,8 @@ class ShipmentViewSet(viewsets.ModelViewSet):
         serializer = ShipmentItemSerializer(items, many=True)
         return Response(serializer.data)
 
-class BillViewSet(viewsets.ModelViewSet):
+class BillViewSet(QueryPlanMixin, viewsets.ModelViewSet):
+    pagination_class = CreatedAtCursorPagination
     serializer_class = BillSerializer
     permission_classes = [IsAuthenticated, IsOwnerOrAdmin]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -162,13 +212,14 @@ class BillViewSet(viewsets.ModelViewSet):
         'payment_method'
     ]
     ordering_fields = ['due_date', 'created_at', 'paid_at']
+    select_related = ('customer', 'created_by')
 
     def get_queryset(self):
         # Users can see their own bills or bills they created
-        return Bill.objects.filter(
+        return self.plan_queryset(Bill.objects.filter(
             models.Q(customer=self.request.user) |
             models.Q(created_by=self.request.user)
-        ).distinct()
+        ))
 
     def perform_create(self, serializer):
         # Set the customer to the current user if not provided
@@ -187,7 +238,8 @@ class BillViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-class InvoiceViewSet(viewsets.ModelViewSet):
+class InvoiceViewSet(QueryPlanMixin, viewsets.ModelViewSet):
+    pagination_class = CreatedAtCursorPagination
     serializer_class = InvoiceSerializer
     permission_classes = [IsAuthenticated, IsOwnerOrAdmin]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -197,13 +249,14 @@ class InvoiceViewSet(viewsets.ModelViewSet):
         'invoice_number'
     ]
     ordering_fields = ['due_date', 'created_at', 'paid_at']
+    select_related = ('customer', 'created_by')
 
     def get_queryset(self):
         # Users can see their own invoices or invoices they created
-        return Invoice.objects.filter(
+        return self.plan_queryset(Invoice.objects.filter(
             models.Q(customer=self.request.user) |
             models.Q(created_by=self.request.user)
-        ).distinct()
+        ))
 
     def perform_create(self, serializer):
         # Set the customer to the current user if not provided
@@ -243,39 +296,155 @@ class QuoteView(APIView):
     def post(self, request):
         serializer = QuoteSerializer(data = request.data)
         if serializer.is_valid():
-            shipping_route = serializer.validated_data["shipping_route"]
-            type = serializer.validated_data["type"]
-            weight = serializer.validated_data["weight"]
-            weight_metric = serializer.validated_data["weight_metric"]
-            dim_length = serializer.validated_data["dim_length"]
-            dim_width = serializer.validated_data["dim_width"]
-            dim_height = serializer.validated_data["dim_height"]
-            usd_rate = serializer.validated_data["usd_rate"]
-
-            if weight_metric == "lb":
-                weight *= 0.453592
-
-            volumetric_weight = (dim_length * dim_width * dim_height) / 5000
-
-            chargeable_weight = max(volumetric_weight, weight)
-
-            base_price = chargeable_weight * 1000
-            route_multiplier = 1.5 if shipping_route == "india-to-usa" else 2.5
-            package_multiplier = 1.0 if type == "document" else 1.5
-            inr_price = math.ceil(base_price * route_multiplier * package_multiplier)
+            data = serializer.validated_data
+            try:
+                quote = pricing.quote(
+                    data["shipping_route"],
+                    data["type"],
+                    data["weight"],
+                    dimensions=(data["dim_length"], data["dim_width"], data["dim_height"]),
+                    weight_unit=data["weight_metric"],
+                )
+            except pricing.NoRateError as e:
+                return Response({"error": str(e)}, status=400)
+
+            usd_rate = data.get("usd_rate")
+            if usd_rate is None:
+                try:
+                    usd_rate = fx.get_rate("USD", "INR")
+                except fx.FxRateError as e:
+                    return Response({"error": str(e)}, status=503)
+
+            inr_price = pricing.whole_amount(quote.amount)
             usd_price = math.ceil(inr_price / usd_rate)
 
-            shipping_time = "10-15 business days" if shipping_route == "india-to-usa" else "7-10 business days"
-
             return Response({
                 "inr_price": inr_price, 
                 "usd_price": usd_price, 
-                "chargeable_Weight": chargeable_weight, 
-                "shipping_time": shipping_time
+                "chargeable_Weight": float(quote.chargeable_weight), 
+                "shipping_time": quote.transit_time,
+                "usd_rate": float(usd_rate)
             })
         return Response(serializer.errors, status=400)
 
 
+
+class QuoteStatsView(APIView):
+    """Quote cache counters and the exchange rates of this worker process."""
+    renderer_classes = [JSONRenderer]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        store = fx.get_rate_store()
+        return Response({
+            "quote_cache": pricing.quote_cache_stats(),
+            "fx": {
+                "base": store.base,
+                "rates": {currency: float(rate) for currency, rate in store.rates.items()},
+                "stale": store.is_stale(),
+            },
+        })
+
+
+class QuoteBatchView(APIView):
+    """
+    Price a manifest of packages in one request.
+
+    Accepts a JSON array of quote payloads (or {"packages": [...]}) or a CSV
+    upload in the ``file`` field with the same columns. Results come back in
+    input order; rows that cannot be priced carry ``errors`` instead.
+    """
+    renderer_classes = [JSONRenderer]
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        try:
+            rows = quote_batch.read_batch(request)
+        except quote_batch.BatchError as e:
+            return Response({"error": str(e)}, status=400)
+
+        results = quote_batch.quote_rows(rows)
+        failed = sum(1 for result in results if "errors" in result)
+        return Response({
+            "count": len(results),
+            "priced": len(results) - failed,
+            "failed": failed,
+            "results": results,
+        })
+
+class TrackingLookupView(APIView):
+    """
+    Public tracking lookup by tracking number.
+
+    Served from ``shipping.tracking_cache``; responses carry ETag and
+    Last-Modified, and an unchanged shipment is answered with 304.
+    """
+    renderer_classes = [JSONRenderer]
+    permission_classes = [AllowAny]
+    # Anonymous and identical for everyone, so no session or token lookups
+    authentication_classes = []
+
+    def get(self, request, tracking_number):
+        entry = tracking_cache.get_tracking(tracking_number)
+        if entry is None:
+            return Response({"error": "Shipment not found."}, status=404)
+        etag = tracking_cache.etag(entry)
+        response = tracking_cache.not_modified(request, entry, etag) or Response(entry.data)
+        return tracking_cache.add_validators(response, entry, etag)
+
+
+class TrackingBatchLookupView(APIView):
+    """
+    Look up several tracking numbers at once.
+
+    Accepts {"tracking_numbers": [...]} (or one string separated by commas,
+    spaces or newlines), at most TRACKING_LOOKUP_MAX_NUMBERS of them. Returns
+    a compact timeline per shipment in input order and the numbers that
+    matched nothing.
+    """
+    renderer_classes = [JSONRenderer]
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def post(self, request):
+        try:
+            numbers = tracking_cache.parse_tracking_numbers(request.data.get("tracking_numbers") or [])
+        except tracking_cache.TrackingLookupError as e:
+            return Response({"error": str(e)}, status=400)
+
+        entries = tracking_cache.get_trackings(numbers)
+        return Response({
+            "count": len(numbers),
+            "found": len(entries),
+            "results": [tracking_cache.timeline(entries[number]) for number in numbers if number in entries],
+            "not_found": [number for number in numbers if number not in entries],
+        })
+
+
+class TrackingEventIngestView(APIView):
+    """
+    Ingest a batch of courier tracking events.
+
+    Accepts a JSON array of events (or {"events": [...]}) with
+    tracking_number, status, location and optional timestamp and
+    description. Events already stored are skipped and each shipment's
+    status follows its newest event; see ``shipping.tracking_events``.
+    """
+    renderer_classes = [JSONRenderer]
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        events = request.data
+        if isinstance(events, dict) and 'events' in events:
+            events = events['events']
+        if not isinstance(events, list) or not events:
+            return Response({"error": 'Expected a non-empty JSON array of events or {"events": [...]}.'},
+                            status=400)
+        if len(events) > tracking_events.max_events():
+            return Response({"error": f"A batch may contain at most {tracking_events.max_events()} events."},
+                            status=400)
+        return Response(tracking_events.ingest_events(events).as_dict())
+
 #pickupRequest
 
 from rest_framework import viewsets
@@ -48,9 +48,9 @@ python manage.py collectstatic --noinput --clear
 echo "Starting Streamlit..."
 streamlit run streamlit_app.py --server.port=8501 --server.address=0.0.0.0 --server.headless=true &
 
-# Start Django
+# Start Django under ASGI, which the live tracking stream (shipping.live) needs
 echo "Starting Django..."
-python manage.py runserver 0.0.0.0:8000
+uvicorn pmb_hello.asgi:application --host 0.0.0.0 --port 8000 --lifespan off --reload
 
 # Keep the container running
 wait
@@ -1,20 +1,28 @@
 from flask import Flask, render_template, request
+import os
 import random
 import string
 import sqlite3
+import sys
+import threading
+
+# Locker codes come from the same generator as shipment tracking numbers
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shipping.tracking_numbers import TrackingNumberGenerator, default_worker_id
 
 app = Flask(__name__)
 
+locker_codes = None
+locker_codes_lock = threading.Lock()
+
 # 📦 Generate locker code
 def generate_unique_locker_code():
-    conn = sqlite3.connect('lockers.db')
-    cursor = conn.cursor()
-    while True:
-        code = "LK" + str(random.randint(1000, 9999))
-        cursor.execute("SELECT 1 FROM lockers WHERE locker_code = ?", (code,))
-        if not cursor.fetchone():
-            conn.close()
-            return code
+    global locker_codes
+    with locker_codes_lock:
+        if locker_codes is None:
+            # Needs PMB_WORKER_ID unless running the debug server
+            locker_codes = TrackingNumberGenerator(default_worker_id(development=app.debug), prefix='LK')
+    return locker_codes.next()
 
 # 🏢 Generate warehouse address
 def generate_warehouse_address():
@@ -1,15 +1,24 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
 from django.contrib.auth import get_user_model
 from django.urls import path, reverse
 from django.shortcuts import render, redirect
 from django.utils.html import format_html
 from django.contrib.admin.views.decorators import staff_member_required
 from django.utils.safestring import mark_safe
-from .models import ShippingAddress, Shipment, ShipmentItem, TrackingEvent, Bill, SupportRequest, SupportRequestHistory
+from .models import (
+    ShippingAddress, Shipment, ShipmentItem, TrackingEvent, Bill, SupportRequest, SupportRequestHistory,
+    RateCard, RateCardWeightBreak, RateCardSurcharge,
+)
 from django.utils import timezone
 from .admin_index import custom_admin_site
 from .admin_views import billing_dashboard
 from .admin_index import get_billing_stats
+from .rollups import update_bills
+from .exports import ExportColumn, ExportMixin, choice_label, format_date, format_datetime, format_money
+from . import lifecycle
+from .forms import ManifestImportForm
+from .manifests import MANIFEST_COLUMNS, REQUIRED_COLUMNS, ManifestError, import_manifest
 
 # Use our custom admin site instance
 site = custom_admin_site
@@ -47,19 +56,40 @@ class ShippingAddressAdmin(admin.ModelAdmin):
     formatted_address.short_description = 'Address'
 
 @admin.register(Shipment, site=site)
-class ShipmentAdmin(admin.ModelAdmin):
-    list_display = ('tracking_number_link', 'status_badge', 'sender_info', 'recipient_info', 
+class ShipmentAdmin(ExportMixin, admin.ModelAdmin):
+    list_display = ('tracking_number_link', 'status_badge', 'latest_location', 'sender_info', 'recipient_info', 
                    'shipping_date', 'delivery_date', 'shipping_cost_display', 'created_at')
     list_filter = ('status', 'package_type', 'courier_service', 'shipping_date', 'created_at')
-    search_fields = ('tracking_number', 'sender_address__address_line1', 
+    search_fields = ('tracking_number', 'courier_tracking_number', 'sender_address__address_line1', 
                     'recipient_address__address_line1', 'sender_first_name', 'recipient_first_name')
     list_select_related = ('sender_address', 'recipient_address')
     date_hierarchy = 'created_at'
     inlines = [ShipmentItemInline, TrackingEventInline]
-    readonly_fields = ('tracking_number', 'created_at', 'updated_at')
+    # Status follows the tracking events; add one in the inline to change it
+    readonly_fields = ('tracking_number', 'status', 'latest_location', 'status_changed_at', 'created_at',
+                       'updated_at')
+    actions = ['export_to_csv', 'export_to_xlsx']
+    export_filename = 'shipments_export'
+    export_columns = [
+        ExportColumn('Tracking #', 'tracking_number'),
+        ExportColumn('Status', 'status', choice_label(Shipment, 'status')),
+        ExportColumn('Courier', 'courier_service', choice_label(Shipment, 'courier_service')),
+        ExportColumn('Sender First Name', 'sender_address__first_name'),
+        ExportColumn('Sender Last Name', 'sender_address__last_name'),
+        ExportColumn('Sender City', 'sender_address__city'),
+        ExportColumn('Recipient First Name', 'recipient_address__first_name'),
+        ExportColumn('Recipient Last Name', 'recipient_address__last_name'),
+        ExportColumn('Recipient City', 'recipient_address__city'),
+        ExportColumn('Weight', 'weight'),
+        ExportColumn('Cost', 'shipping_cost', format_money),
+        ExportColumn('Shipping Date', 'shipping_date', format_date),
+        ExportColumn('Delivery Date', 'delivery_date', format_date),
+        ExportColumn('Created', 'created_at', format_datetime),
+    ]
     fieldsets = (
         ('Shipment Information', {
-            'fields': ('tracking_number', 'status', 'package_type', 'courier_service')
+            'fields': ('tracking_number', 'status', 'status_changed_at', 'latest_location', 'package_type',
+                       'courier_service', 'courier_tracking_number')
         }),
         ('Sender Details', {
             'fields': ('sender_address', 'sender_first_name', 'sender_last_name')
@@ -75,6 +105,56 @@ class ShipmentAdmin(admin.ModelAdmin):
         }),
     )
     
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        if any(formset.model is TrackingEvent and formset.has_changed() for formset in formsets):
+            # Events edited in the inline bypass shipping.lifecycle
+            lifecycle.refresh_latest_event(form.instance)
+
+    def get_urls(self):
+        urls = [
+            path('import/', self.admin_site.admin_view(self.import_manifest_view), name='shipping_shipment_import'),
+        ]
+        return urls + super().get_urls()
+
+    def import_manifest_view(self, request):
+        """Upload a CSV/Excel manifest and create its shipments (see shipping.manifests)."""
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        result = None
+        if request.method == 'POST':
+            form = ManifestImportForm(request.POST, request.FILES)
+            if form.is_valid():
+                manifest = form.cleaned_data['manifest']
+                try:
+                    result = import_manifest(
+                        manifest.file, manifest.name, form.cleaned_data['customer'], created_by=request.user,
+                        dry_run=form.cleaned_data['dry_run'], invoice=form.cleaned_data['create_invoices'],
+                    )
+                except ManifestError as e:
+                    form.add_error('manifest', str(e))
+                else:
+                    if result.dry_run:
+                        self.message_user(request, f'{result.valid} of {result.rows} row(s) would be imported.')
+                    elif result.imported:
+                        self.message_user(request, f'Imported {result.imported} of {result.rows} shipment(s).',
+                                          messages.SUCCESS)
+                    if not result.errors and not result.dry_run:
+                        return redirect('admin:shipping_shipment_changelist')
+        else:
+            form = ManifestImportForm()
+
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Import shipment manifest',
+            'opts': self.model._meta,
+            'form': form,
+            'result': result,
+            'columns': MANIFEST_COLUMNS,
+            'required_columns': REQUIRED_COLUMNS,
+        }
+        return render(request, 'admin/shipping/shipment/import_manifest.html', context)
+
     def tracking_number_link(self, obj):
         url = reverse('admin:shipping_shipment_change', args=[obj.id])
         return mark_safe(f'<a href="{url}">{obj.tracking_number}</a>')
@@ -159,7 +239,7 @@ class TrackingEventAdmin(admin.ModelAdmin):
     description_short.short_description = 'Description'
 
 @admin.register(Bill, site=site)
-class BillAdmin(admin.ModelAdmin):
+class BillAdmin(ExportMixin, admin.ModelAdmin):
     list_display = ('id', 'invoice_number', 'customer_link', 'amount_display', 'status_badge', 
                    'created_at', 'due_date', 'is_overdue_display')
     list_filter = ('status', 'created_at', 'due_date', 'payment_method')
@@ -168,7 +248,17 @@ class BillAdmin(admin.ModelAdmin):
     change_list_template = 'admin/billing_dashboard.html'
     readonly_fields = ('created_at', 'updated_at', 'paid_at')
     list_select_related = ('customer', 'shipment')
-    actions = ['mark_as_paid', 'export_to_csv']
+    actions = ['mark_as_paid', 'export_to_csv', 'export_to_xlsx']
+    export_filename = 'bills_export'
+    export_columns = [
+        ExportColumn('Invoice #', 'id', lambda value: f'INV-{value:06d}'),
+        ExportColumn('Customer', 'customer__username'),
+        ExportColumn('Amount', 'amount', format_money),
+        ExportColumn('Status', 'status', choice_label(Bill, 'status')),
+        ExportColumn('Created', 'created_at', format_date),
+        ExportColumn('Due Date', 'due_date', format_date),
+        ExportColumn('Paid', 'paid_at', lambda value: 'Yes' if value else 'No'),
+    ]
     
     def invoice_number(self, obj):
         return f"INV-{obj.id:06d}"
@@ -209,40 +299,47 @@ class BillAdmin(admin.ModelAdmin):
     
     @admin.action(description='Mark selected bills as paid')
     def mark_as_paid(self, request, queryset):
-        updated = queryset.update(status='paid', paid_at=timezone.now())
+        updated = update_bills(queryset, status='PAID', paid_at=timezone.now())
         self.message_user(request, f"{updated} bill(s) marked as paid.")
     
-    @admin.action(description='Export selected bills to CSV')
-    def export_to_csv(self, request, queryset):
-        import csv
-        from django.http import HttpResponse
-        import io
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename=bills_export.csv'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Invoice #', 'Customer', 'Amount', 'Status', 'Created', 'Due Date', 'Paid'])
-        
-        for bill in queryset:
-            writer.writerow([
-                f"INV-{bill.id:06d}",
-                bill.customer.username if bill.customer else '',
-                f"${bill.amount:.2f}",
-                bill.get_status_display(),
-                bill.created_at.strftime('%Y-%m-%d'),
-                bill.due_date.strftime('%Y-%m-%d') if bill.due_date else '',
-                'Yes' if bill.paid_at else 'No'
-            ])
-        
-        return response
-    
     def changelist_view(self, request, extra_context=None):
         extra_context = extra_context or {}
-        extra_context['billing_stats'] = get_billing_stats()
+        extra_context['billing_stats'] = get_billing_stats(request)
         return super().changelist_view(request, extra_context=extra_context)
 
 
+class RateCardWeightBreakInline(admin.TabularInline):
+    model = RateCardWeightBreak
+    extra = 0
+
+
+class RateCardSurchargeInline(admin.TabularInline):
+    model = RateCardSurcharge
+    extra = 0
+
+
+@admin.register(RateCard, site=site)
+class RateCardAdmin(admin.ModelAdmin):
+    list_display = ('name', 'zone', 'package_type', 'courier_service', 'currency', 'base_rate', 'per_kg_rate',
+                    'multiplier', 'volumetric_divisor', 'priority', 'valid_from', 'valid_until', 'is_active')
+    list_filter = ('zone', 'currency', 'courier_service', 'is_active')
+    search_fields = ('name', 'zone', 'package_type')
+    list_editable = ('is_active',)
+    inlines = [RateCardWeightBreakInline, RateCardSurchargeInline]
+    fieldsets = (
+        ('Scope', {
+            'fields': ('name', 'zone', 'package_type', 'courier_service', 'priority', 'is_active')
+        }),
+        ('Pricing', {
+            'fields': ('currency', 'base_rate', 'per_kg_rate', 'multiplier', 'volumetric_divisor', 'rounding',
+                       'transit_time')
+        }),
+        ('Validity', {
+            'fields': ('valid_from', 'valid_until')
+        }),
+    )
+
+
 class SupportRequestHistoryInline(admin.TabularInline):
     model = SupportRequestHistory
     extra = 0
@@ -253,7 +350,7 @@ class SupportRequestHistoryInline(admin.TabularInline):
         return False
 
 @admin.register(SupportRequest, site=site)
-class SupportRequestAdmin(admin.ModelAdmin):
+class SupportRequestAdmin(ExportMixin, admin.ModelAdmin):
     list_display = ('ticket_number', 'subject', 'name', 'email', 'request_type', 'status_display', 'assigned_to_display', 'created_at')
     list_filter = ('status', 'request_type', 'created_at', 'assigned_to')
     search_fields = ('ticket_number', 'subject', 'name', 'email', 'message')
@@ -261,8 +358,20 @@ class SupportRequestAdmin(admin.ModelAdmin):
     date_hierarchy = 'created_at'
     readonly_fields = ('ticket_number', 'created_at', 'updated_at', 'resolved_at')
     inlines = [SupportRequestHistoryInline]
-    actions = ['assign_to_me', 'mark_in_progress', 'mark_resolved', 'mark_closed']
+    actions = ['assign_to_me', 'mark_in_progress', 'mark_resolved', 'mark_closed', 'export_to_csv', 'export_to_xlsx']
     list_per_page = 20
+    export_filename = 'support_requests_export'
+    export_columns = [
+        ExportColumn('Ticket #', 'ticket_number'),
+        ExportColumn('Subject', 'subject'),
+        ExportColumn('Name', 'name'),
+        ExportColumn('Email', 'email'),
+        ExportColumn('Type', 'request_type', choice_label(SupportRequest, 'request_type')),
+        ExportColumn('Status', 'status', choice_label(SupportRequest, 'status')),
+        ExportColumn('Assigned To', 'assigned_to__username'),
+        ExportColumn('Created', 'created_at', format_datetime),
+        ExportColumn('Resolved', 'resolved_at', format_datetime),
+    ]
     
     fieldsets = (
         ('Ticket Information', {
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class ShippingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'shipping'
+
+    def ready(self):
+        # Register the Bill rollup signal handlers
+        from . import signals  # noqa: F401
+        from .tracking_numbers import get_generator
+
+        # Refuse to start without a worker id instead of issuing duplicate numbers
+        get_generator()
@@ -0,0 +1,216 @@
+"""
+QR and Code128 barcodes for shipping labels.
+
+Labels embed barcodes as ReportLab vector drawings, so nothing is encoded to
+PNG; the drawings are built once per value and kept in an in-process LRU.
+Where a raster image is needed (e.g. to show on a web page), ``barcode_png``
+serves PNGs from a size-bounded memory LRU backed by a size-bounded disk
+cache, so a barcode is only encoded the first time it is requested.
+
+Settings:
+    BARCODE_CACHE_DIR: where PNGs are kept (default MEDIA_ROOT/barcode_cache)
+    BARCODE_MEMORY_CACHE_BYTES: memory LRU budget (default 8 MB)
+    BARCODE_DISK_CACHE_BYTES: disk cache budget (default 64 MB)
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+
+BARCODE_KINDS = ('qr', 'code128')
+
+DRAWING_CACHE_SIZE = 4096
+
+# Pixels per Code128 module and bar height of rasterized barcodes
+CODE128_MODULE_PX = 2
+CODE128_HEIGHT_PX = 80
+CODE128_QUIET_ZONE = 10
+
+
+def tracking_qr_data(tracking_number):
+    """Return the text encoded in a label's QR code."""
+    return f'Tracking Number: {tracking_number}'
+
+
+@lru_cache(maxsize=DRAWING_CACHE_SIZE)
+def qr_drawing(value, size=100):
+    """Return a vector QR code drawing of ``size`` points square."""
+    from reportlab.graphics.barcode.qr import QrCodeWidget
+    from reportlab.graphics.shapes import Drawing
+
+    widget = QrCodeWidget(value, barBorder=4)
+    x1, y1, x2, y2 = widget.getBounds()
+    drawing = Drawing(size, size, transform=[size / (x2 - x1), 0, 0, size / (y2 - y1), 0, 0])
+    drawing.add(widget)
+    return drawing
+
+
+@lru_cache(maxsize=DRAWING_CACHE_SIZE)
+def code128_drawing(value, bar_height=50, bar_width=1.2):
+    """Return a vector Code128 drawing with the value printed underneath."""
+    from reportlab.graphics.barcode import createBarcodeDrawing
+
+    return createBarcodeDrawing('Code128', value=value, barHeight=bar_height, barWidth=bar_width,
+                                humanReadable=True)
+
+
+def draw_barcode(canvas, drawing, x, y):
+    """Draw a cached barcode drawing with its bottom-left corner at (x, y)."""
+    from reportlab.graphics import renderPDF
+
+    renderPDF.draw(drawing, canvas, x, y)
+
+
+def render_qr_png(value):
+    import qrcode
+
+    qr = qrcode.QRCode(version=1, box_size=4, border=4)
+    qr.add_data(value)
+    qr.make(fit=True)
+    buffer = BytesIO()
+    qr.make_image(fill_color='black', back_color='white').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def render_code128_png(value):
+    from PIL import Image, ImageDraw
+    from reportlab.graphics.barcode.code128 import Code128
+
+    barcode = Code128(value)
+    barcode.validate()
+    barcode.encode()
+    # Upper-case letters are bars and lower-case letters spaces, 'A'/'a' = 1 module
+    pattern = barcode.decompose()
+    modules = sum(ord(char.lower()) - ord('a') + 1 for char in pattern)
+    width = (modules + 2 * CODE128_QUIET_ZONE) * CODE128_MODULE_PX
+    image = Image.new('1', (width, CODE128_HEIGHT_PX), 1)
+    draw = ImageDraw.Draw(image)
+    x = CODE128_QUIET_ZONE * CODE128_MODULE_PX
+    for char in pattern:
+        run = (ord(char.lower()) - ord('a') + 1) * CODE128_MODULE_PX
+        if char.isupper():
+            draw.rectangle([x, 0, x + run - 1, CODE128_HEIGHT_PX - 1], fill=0)
+        x += run
+    buffer = BytesIO()
+    image.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+RENDERERS = {
+    'qr': render_qr_png,
+    'code128': render_code128_png,
+}
+
+
+class BarcodeImageCache:
+    """
+    Two-level PNG cache: an LRU in memory and files on disk, each bounded by total size.
+    """
+
+    def __init__(self, directory, memory_bytes, disk_bytes):
+        self.directory = Path(directory)
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._images = OrderedDict()
+        self._size = 0
+        self._disk_size = None
+        self._lock = threading.Lock()
+
+    def path(self, kind, value):
+        digest = hashlib.sha1(value.encode('utf-8')).hexdigest()
+        return self.directory / f'{kind}_{digest}.png'
+
+    def get(self, kind, value):
+        key = (kind, value)
+        with self._lock:
+            data = self._images.get(key)
+            if data is not None:
+                self._images.move_to_end(key)
+                return data
+
+        path = self.path(kind, value)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            data = RENDERERS[kind](value)
+            self._write(path, data)
+        self._remember(key, data)
+        return data
+
+    def _remember(self, key, data):
+        with self._lock:
+            if key in self._images:
+                return
+            self._images[key] = data
+            self._size += len(data)
+            while self._size > self.memory_bytes and self._images:
+                _, evicted = self._images.popitem(last=False)
+                self._size -= len(evicted)
+
+    def _write(self, path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # One temporary file per write: threads of a process may store the same image at once
+        with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f'{path.name}.', suffix='.tmp',
+                                         delete=False) as output:
+            output.write(data)
+        os.replace(output.name, path)
+        with self._lock:
+            if self._disk_size is None:
+                self._disk_size = sum(entry.stat().st_size for entry in self.directory.glob('*.png'))
+            else:
+                self._disk_size += len(data)
+            if self._disk_size > self.disk_bytes:
+                self._prune()
+
+    def _prune(self):
+        """Delete the least recently written files until the disk cache is under 90% of its budget."""
+        entries = sorted(
+            ((entry.stat().st_mtime, entry.stat().st_size, entry) for entry in self.directory.glob('*.png')),
+            key=lambda item: item[0],
+        )
+        total = sum(size for _, size, _ in entries)
+        target = self.disk_bytes * 0.9
+        for _, size, entry in entries:
+            if total <= target:
+                break
+            try:
+                entry.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._disk_size = total
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+            self._size = 0
+            self._disk_size = None
+
+
+_image_cache = None
+_image_cache_lock = threading.Lock()
+
+
+def get_image_cache():
+    global _image_cache
+    with _image_cache_lock:
+        if _image_cache is None:
+            _image_cache = BarcodeImageCache(
+                getattr(settings, 'BARCODE_CACHE_DIR', Path(settings.MEDIA_ROOT) / 'barcode_cache'),
+                getattr(settings, 'BARCODE_MEMORY_CACHE_BYTES', 8 * 1024 * 1024),
+                getattr(settings, 'BARCODE_DISK_CACHE_BYTES', 64 * 1024 * 1024),
+            )
+        return _image_cache
+
+
+def barcode_png(kind, value):
+    """Return a PNG of a QR (``'qr'``) or Code128 (``'code128'``) barcode, from cache when possible."""
+    if kind not in RENDERERS:
+        raise ValueError(f'kind must be one of {BARCODE_KINDS}')
+    return get_image_cache().get(kind, value)
@@ -0,0 +1,107 @@
+"""
+Billing KPI engine used by the admin dashboard.
+
+Totals are read from the BillDailyRollup table in one query; the overdue and
+customer counters need the due date and customer, so they come from a single
+conditional aggregate over the Bill table. One more small query loads the
+most recent bills. Results are memoized on the request so the admin index,
+``each_context`` and template tags share one computation per page load.
+"""
+import logging
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Bill
+from .rollups import PACIFIC_TZ, rollup_totals
+
+logger = logging.getLogger(__name__)
+
+# Attribute used to memoize the stats on the current request
+REQUEST_CACHE_ATTR = '_billing_stats'
+
+RECENT_BILLS_LIMIT = 10
+
+
+def empty_billing_stats(today=None):
+    """Default stats returned when there are no bills or the query fails."""
+    today = today or timezone.now().astimezone(PACIFIC_TZ).date()
+    return {
+        'todays_revenue': 0,
+        'total_revenue': 0,
+        'pending_bills': 0,
+        'overdue_bills': 0,
+        'revenue_change': 0,
+        'pending_percentage': 0,
+        'recent_bills': [],
+        'total_bills': 0,
+        'today': today.strftime('%b %d, %Y'),
+        'todays_orders': 0,
+        'total_customers': 0,
+        'unpaid_bills': 0,
+    }
+
+
+def compute_billing_stats():
+    """
+    Compute the billing KPIs without any caching.
+    """
+    today = timezone.now().astimezone(PACIFIC_TZ).date()
+    totals = rollup_totals(today)
+
+    overdue = Q(status='PENDING', due_date__lt=today) | Q(status='OVERDUE')
+    totals.update(Bill.objects.order_by().aggregate(
+        overdue_bills=Count('id', filter=overdue),
+        total_customers=Count('customer', distinct=True),
+    ))
+
+    total_bills = totals['total_bills']
+    if not total_bills:
+        return empty_billing_stats(today)
+
+    todays_revenue = totals['todays_revenue']
+    yesterdays_revenue = totals['yesterdays_revenue']
+    revenue_change = 0
+    if yesterdays_revenue > 0:
+        revenue_change = float((todays_revenue - yesterdays_revenue) / yesterdays_revenue * 100)
+
+    recent_bills = list(
+        Bill.objects.select_related('customer').order_by('-created_at')[:RECENT_BILLS_LIMIT]
+    )
+
+    return {
+        'todays_revenue': round(float(todays_revenue), 2),
+        'total_revenue': round(float(totals['total_revenue']), 2),
+        'pending_bills': totals['pending_bills'],
+        'overdue_bills': totals['overdue_bills'],
+        'revenue_change': round(revenue_change, 2),
+        'pending_percentage': round(totals['pending_bills'] / total_bills * 100, 2),
+        'recent_bills': recent_bills,
+        'total_bills': total_bills,
+        'today': today.strftime('%b %d, %Y'),
+        'todays_orders': totals['todays_orders'],
+        'total_customers': totals['total_customers'],
+        'unpaid_bills': totals['unpaid_bills'],
+    }
+
+
+def get_billing_stats(request=None):
+    """
+    Return the billing KPIs, computed at most once per request.
+
+    When ``request`` is None the stats are computed on every call.
+    """
+    if request is not None:
+        cached = getattr(request, REQUEST_CACHE_ATTR, None)
+        if cached is not None:
+            return cached
+
+    try:
+        stats = compute_billing_stats()
+    except Exception:
+        logger.exception('Error computing billing stats')
+        stats = empty_billing_stats()
+
+    if request is not None:
+        setattr(request, REQUEST_CACHE_ATTR, stats)
+    return stats
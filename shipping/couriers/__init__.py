@@ -0,0 +1,49 @@
+"""
+Courier tracking adapters and the tracking poller.
+
+Each courier we poll has a ``CourierAdapter`` that fetches a shipment's
+travel history with a session (a headless browser by default) and parses it
+into ``ScanEvent`` rows. Parsing is separate from fetching, so adapters are
+tested against saved pages.
+
+``poller.refresh_shipments`` schedules many shipments on an asyncio loop.
+Sessions come from a bounded ``SessionPool`` per courier and are reused
+across shipments; the blocking browser calls run in worker threads. Scans
+are stored through ``shipping.tracking_events.ingest_events``, which skips
+events already recorded and moves each shipment's status.
+
+Settings:
+    COURIER_ADAPTERS: {courier_service: dotted path of a CourierAdapter}
+        (default: FedEx only)
+    COURIER_POOL_SIZE: sessions per courier, i.e. shipments fetched at once
+        (default 4)
+    COURIER_PAGE_TIMEOUT: seconds to wait for a tracking page (default 30)
+"""
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .base import CourierAdapter, ScanEvent, TrackingError
+
+DEFAULT_ADAPTERS = {
+    'FEDEX': 'shipping.couriers.fedex.FedExAdapter',
+}
+
+_adapters = {}
+_adapters_lock = threading.Lock()
+
+
+def adapter_paths():
+    return getattr(settings, 'COURIER_ADAPTERS', DEFAULT_ADAPTERS)
+
+
+def get_adapter(courier):
+    """Return the adapter of a courier service, or None if it is not polled."""
+    path = adapter_paths().get(courier)
+    if path is None:
+        return None
+    with _adapters_lock:
+        if path not in _adapters:
+            _adapters[path] = import_string(path)()
+        return _adapters[path]
@@ -0,0 +1,92 @@
+from collections import namedtuple
+from datetime import datetime
+
+# One scan from a courier's travel history; ``timestamp`` is naive, in the scan's local time
+ScanEvent = namedtuple('ScanEvent', 'timestamp status location description')
+
+
+class TrackingError(Exception):
+    """
+    Raised when a courier has no usable tracking data for a number.
+
+    The browser session that raised it is still healthy and goes back to the
+    pool; any other exception discards the session.
+    """
+
+
+class CourierAdapter:
+    """
+    Fetches and parses the travel history of one courier.
+
+    ``fetch`` drives a session from the pool (a browser, or whatever
+    ``session_factory`` returns) and returns the raw travel-history markup;
+    ``parse`` turns that markup into ScanEvents without any I/O, so it can be
+    tested against saved pages. ``STATUSES`` maps words of the courier's
+    status text to Shipment statuses; the first match wins. Couriers repeat
+    early-stage scans late in a history (FedEx shows "Shipment information
+    sent" after "Picked up"), so ``track`` reports a scan whose status would
+    move the shipment backwards as a progress scan of the status already
+    reached.
+    """
+    courier = None
+    STATUSES = ()
+    DEFAULT_STATUS = 'shipped'
+
+    def session_factory(self):
+        from .sessions import chrome_session
+
+        return chrome_session()
+
+    def fetch(self, session, tracking_number):
+        raise NotImplementedError
+
+    def parse(self, markup):
+        raise NotImplementedError
+
+    def track(self, session, tracking_number):
+        """Return the ScanEvents of ``tracking_number``, oldest first. Blocking."""
+        events = self.parse(self.fetch(session, tracking_number))
+        if not events:
+            raise TrackingError(f'No travel history for {tracking_number}')
+        return progress_scans(sorted(events, key=lambda event: event.timestamp))
+
+    def status_for(self, text):
+        text = text.casefold()
+        for words, status in self.STATUSES:
+            if words in text:
+                return status
+        return self.DEFAULT_STATUS
+
+
+def progress_scans(events):
+    """Return time-ordered ScanEvents with backward status changes turned into progress scans."""
+    from ..lifecycle import can_transition
+
+    reached = None
+    scans = []
+    for event in events:
+        if reached is not None and not can_transition(reached, event.status):
+            event = event._replace(status=reached)
+        reached = event.status
+        scans.append(event)
+    return scans
+
+
+def parse_scan_time(day, time_of_day, day_formats, time_formats):
+    """Combine a courier's date and time strings, trying each format in turn. Raises ValueError."""
+    day_value = time_value = None
+    for day_format in day_formats:
+        try:
+            day_value = datetime.strptime(day.strip(), day_format).date()
+            break
+        except ValueError:
+            continue
+    for time_format in time_formats:
+        try:
+            time_value = datetime.strptime(time_of_day.strip().upper(), time_format).time()
+            break
+        except ValueError:
+            continue
+    if day_value is None or time_value is None:
+        raise ValueError(f'Unrecognized scan time: {day!r} {time_of_day!r}')
+    return datetime.combine(day_value, time_value)
@@ -0,0 +1,137 @@
+from html.parser import HTMLParser
+
+from django.conf import settings
+
+from .base import CourierAdapter, ScanEvent, TrackingError, parse_scan_time
+
+TRACKING_URL = 'https://www.fedex.com/fedextrack/?trknbr={}'
+
+# Opens the travel history inside the tracking result's shadow root and
+# returns its markup once the cards have rendered (null until then, a bare
+# comment when FedEx does not know the number)
+TRAVEL_HISTORY_SCRIPT = """
+const reject = document.querySelector('.fxg-gdpr__reject-all-btn');
+if (reject) reject.click();
+const host = document.querySelector('fx-tracking-result');
+if (!host || !host.shadowRoot) return null;
+const root = host.shadowRoot;
+if (root.querySelector('.travel-history-card')) return root.innerHTML;
+const notFound = root.querySelector('.notfound-container, [data-test-id="not-found"]');
+if (notFound) return '<!-- not found -->';
+const button = Array.from(root.querySelectorAll('button, span'))
+    .find(el => el.textContent.trim() === 'View travel history');
+if (button) button.click();
+return null;
+"""
+
+# Class names of the travel-history DOM and the ScanEvent part each one holds
+CARD_CLASS = 'travel-history-card'
+EVENT_CLASS = 'travel-history-card-event'
+TEXT_CLASSES = {
+    'travel-history-card-date': 'date',
+    'travel-history-event-time': 'time',
+    'travel-history-event-status': 'status',
+    'travel-history-event-location': 'location',
+}
+VOID_ELEMENTS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+
+DAY_FORMATS = ('%m/%d/%y', '%m/%d/%Y')
+TIME_FORMATS = ('%I:%M %p', '%I:%M:%S %p', '%H:%M')
+
+
+class TravelHistoryParser(HTMLParser):
+    """Collects the date, time, status and location texts of FedEx travel-history cards."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = []
+        self._date = ''
+        self._event = None
+        # Open elements as (field being captured or None, is the event element)
+        self._stack = []
+        self._field = None
+        self._text = []
+
+    def handle_starttag(self, tag, attrs):
+        classes = set((dict(attrs).get('class') or '').split())
+        field = next((TEXT_CLASSES[name] for name in classes if name in TEXT_CLASSES), None)
+        is_event = EVENT_CLASS in classes
+        if CARD_CLASS in classes:
+            self._date = ''
+        if is_event:
+            self._event = {'date': self._date}
+        if field and self._field is None:
+            self._field = field
+            self._text = []
+        else:
+            field = None
+        if tag not in VOID_ELEMENTS:
+            self._stack.append((field, is_event))
+
+    def handle_endtag(self, tag):
+        if tag in VOID_ELEMENTS or not self._stack:
+            return
+        field, is_event = self._stack.pop()
+        if field:
+            text = ' '.join(''.join(self._text).split())
+            if field == 'date':
+                self._date = text
+            elif self._event is not None:
+                self._event[field] = text
+            self._field = None
+        if is_event and self._event is not None:
+            self.rows.append(self._event)
+            self._event = None
+
+    def handle_data(self, data):
+        if self._field:
+            self._text.append(data)
+
+
+class FedExAdapter(CourierAdapter):
+    courier = 'FEDEX'
+    STATUSES = (
+        ('delivered', 'delivered'),
+        ('cancel', 'cancelled'),
+        ('information sent', 'pending'),
+        ('label created', 'pending'),
+        ('picked up', 'processing'),
+    )
+
+    def fetch(self, session, tracking_number):
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        session.get(TRACKING_URL.format(tracking_number))
+        try:
+            markup = WebDriverWait(session, getattr(settings, 'COURIER_PAGE_TIMEOUT', 30), poll_frequency=0.5).until(
+                lambda driver: driver.execute_script(TRAVEL_HISTORY_SCRIPT)
+            )
+        except TimeoutException:
+            raise TrackingError(f'FedEx did not show a travel history for {tracking_number}')
+        return markup
+
+    def parse(self, markup):
+        """Return the ScanEvents in the markup of a FedEx travel history."""
+        parser = TravelHistoryParser()
+        parser.feed(markup or '')
+        parser.close()
+
+        events = []
+        for row in parser.rows:
+            status_text = row.get('status', '')
+            if not status_text:
+                continue
+            # Dates read like "Monday, 6/2/25"
+            day = row['date'].rsplit(',', 1)[-1]
+            try:
+                timestamp = parse_scan_time(day, row.get('time', ''), DAY_FORMATS, TIME_FORMATS)
+            except ValueError:
+                continue
+            events.append(ScanEvent(
+                timestamp=timestamp,
+                status=self.status_for(status_text),
+                location=row.get('location') or 'FedEx',
+                description=status_text,
+            ))
+        return events
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+
+from django.conf import settings
+
+from ..lifecycle import FINAL_STATUSES
+from ..models import Shipment
+from ..tracking_events import IngestResult, ingest_events
+from . import adapter_paths, get_adapter
+from .base import TrackingError
+from .sessions import SessionPool
+
+logger = logging.getLogger(__name__)
+
+# Shipments fetched between two writes to the database
+CHUNK_SIZE = 200
+
+
+class PollResult:
+    """Outcome of a tracking refresh."""
+
+    def __init__(self):
+        self.tracked = 0
+        # (tracking number, message)
+        self.failed = []
+        self.events = IngestResult()
+
+
+def pollable_shipments(couriers=None):
+    """Shipments that are still moving and have a courier tracking number we can poll."""
+    return Shipment.objects.exclude(status__in=list(FINAL_STATUSES)).exclude(courier_tracking_number='').filter(
+        courier_service__in=list(couriers or adapter_paths())
+    )
+
+
+class TrackingPoller:
+    """
+    Fetches travel histories concurrently, one SessionPool per courier.
+
+    ``poll`` runs on an event loop and touches no database, so the caller
+    stores its results from synchronous code (see ``refresh_shipments``).
+    The pools live until ``close``, so sessions are reused across calls.
+    """
+
+    def __init__(self, pool_size=None):
+        self.pool_size = pool_size or getattr(settings, 'COURIER_POOL_SIZE', 4)
+        self.pools = {}
+
+    def pool_for(self, courier, adapter):
+        if courier not in self.pools:
+            self.pools[courier] = SessionPool(adapter.session_factory, self.pool_size)
+        return self.pools[courier]
+
+    async def track(self, target, result):
+        """Return the events of one (tracking number, courier, courier tracking number) target."""
+        tracking_number, courier, courier_tracking_number = target
+        adapter = get_adapter(courier)
+        if adapter is None:
+            result.failed.append((tracking_number, f'No tracking adapter for courier "{courier}"'))
+            return []
+        try:
+            async with self.pool_for(courier, adapter).session() as session:
+                scans = await asyncio.to_thread(adapter.track, session, courier_tracking_number)
+        except TrackingError as e:
+            result.failed.append((tracking_number, str(e)))
+            return []
+        except Exception as e:
+            logger.warning(f'Tracking {courier} {courier_tracking_number} failed', exc_info=True)
+            result.failed.append((tracking_number, f'{type(e).__name__}: {e}'))
+            return []
+
+        result.tracked += 1
+        return [
+            {
+                'tracking_number': tracking_number,
+                'status': scan.status,
+                'location': scan.location[:255],
+                'timestamp': scan.timestamp,
+                'description': scan.description,
+            }
+            for scan in scans
+        ]
+
+    async def poll(self, targets, result):
+        """Fetch all targets concurrently and return their events."""
+        batches = await asyncio.gather(*(self.track(target, result) for target in targets))
+        return [event for batch in batches for event in batch]
+
+    async def close(self):
+        pools, self.pools = self.pools, {}
+        for pool in pools.values():
+            await pool.close()
+
+
+def refresh_shipments(shipments, pool_size=None, chunk_size=CHUNK_SIZE):
+    """
+    Poll the couriers of ``shipments`` and store their scans as TrackingEvents.
+
+    Shipments are fetched ``chunk_size`` at a time on one event loop, so the
+    browser sessions survive between chunks while each chunk's events are
+    written as soon as it finishes. Returns a PollResult.
+    """
+    targets = [
+        (shipment.tracking_number, shipment.courier_service, shipment.courier_tracking_number)
+        for shipment in shipments
+    ]
+    result = PollResult()
+    poller = TrackingPoller(pool_size)
+    loop = asyncio.new_event_loop()
+    try:
+        for start in range(0, len(targets), chunk_size):
+            events = loop.run_until_complete(poller.poll(targets[start:start + chunk_size], result))
+            if events:
+                result.events.merge(ingest_events(events))
+    finally:
+        loop.run_until_complete(poller.close())
+        loop.close()
+    return result
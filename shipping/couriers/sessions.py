@@ -0,0 +1,84 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+
+from .base import TrackingError
+
+logger = logging.getLogger(__name__)
+
+
+def chrome_session():
+    """
+    Start a headless Chrome for scraping tracking pages.
+
+    Uses undetected_chromedriver when it is installed (courier sites block
+    plain automation less often) and selenium's driver otherwise.
+    """
+    try:
+        import undetected_chromedriver as webdriver
+    except ImportError:
+        from selenium import webdriver
+
+    options = webdriver.ChromeOptions()
+    options.add_argument('--headless=new')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--window-size=1280,1024')
+    options.add_argument('--blink-settings=imagesEnabled=false')
+    driver = webdriver.Chrome(options=options)
+    driver.set_page_load_timeout(getattr(settings, 'COURIER_PAGE_TIMEOUT', 30))
+    return driver
+
+
+def close_session(session):
+    try:
+        session.quit()
+    except Exception:
+        logger.warning('Could not close a courier session', exc_info=True)
+
+
+class SessionPool:
+    """
+    At most ``size`` sessions from ``factory``, shared by concurrent tasks.
+
+    Sessions are started on first use and reused afterwards; starting a
+    browser costs seconds, reusing one costs nothing. A session whose task
+    fails with anything but TrackingError is closed and replaced on demand.
+    Starting and closing sessions runs in worker threads, off the event loop.
+    """
+
+    def __init__(self, factory, size):
+        self.factory = factory
+        self.size = max(1, size)
+        self.started = 0
+        self._idle = []
+        self._all = []
+        self._slots = asyncio.Semaphore(self.size)
+
+    @asynccontextmanager
+    async def session(self):
+        async with self._slots:
+            if self._idle:
+                session = self._idle.pop()
+            else:
+                session = await asyncio.to_thread(self.factory)
+                self._all.append(session)
+                self.started += 1
+            try:
+                yield session
+            except TrackingError:
+                self._idle.append(session)
+                raise
+            except BaseException:
+                self._all.remove(session)
+                await asyncio.to_thread(close_session, session)
+                raise
+            else:
+                self._idle.append(session)
+
+    async def close(self):
+        sessions, self._all, self._idle = self._all, [], []
+        for session in sessions:
+            await asyncio.to_thread(close_session, session)
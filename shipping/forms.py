@@ -558,3 +558,25 @@ class BillFilterForm(forms.Form):
             raise forms.ValidationError("End date must be after start date.")
         
         return cleaned_data
+
+
+class ManifestImportForm(forms.Form):
+    """Upload form for the shipment manifest import in the admin."""
+    customer = forms.ModelChoiceField(
+        queryset=User.objects.filter(is_active=True).order_by('username'),
+        help_text=_('Owner of the sender addresses; invoices are billed to this customer.')
+    )
+    manifest = forms.FileField(
+        help_text=_('CSV or Excel (.xlsx) file with one shipment per row.')
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        help_text=_('Only validate and price the rows.')
+    )
+    create_invoices = forms.BooleanField(required=False, initial=True)
+
+    def clean_manifest(self):
+        manifest = self.cleaned_data['manifest']
+        if not manifest.name.lower().endswith(('.csv', '.xlsx', '.xlsm')):
+            raise forms.ValidationError(_('Manifests must be .csv or .xlsx files.'))
+        return manifest
@@ -0,0 +1,160 @@
+"""
+Currency exchange rates for quotes.
+
+Rates are fetched from a provider and kept in memory for ``FX_RATES_TTL``
+seconds, so quotes convert currencies without the client sending a rate and
+without a provider call per request. If a refresh fails the previous rates
+stay in use until the provider recovers.
+
+A provider is a callable returning ``(base_currency, {currency: rate})``,
+where ``rate`` is units of ``currency`` per one unit of the base. Built in:
+
+    'file': JSON at FX_RATES_FILE, e.g. {"base": "USD", "rates": {"INR": 83.2}}
+    'mock': FX_MOCK_RATES, a dict in the same shape (default USD -> INR 83)
+
+The mock rates are only used by default in DEBUG. Otherwise, with no
+provider configured, every lookup raises FxRateError (the quote API answers
+503 unless the client sends ``usd_rate``) instead of pricing at made-up rates.
+
+Settings:
+    FX_RATES_PROVIDER: 'file', 'mock' or a dotted path to a provider callable
+        (default 'file' when FX_RATES_FILE is set, otherwise 'mock' in DEBUG
+        and none outside it)
+    FX_RATES_FILE: path of the rates file
+    FX_RATES_TTL: seconds before rates are refreshed (default 3600)
+"""
+import json
+import logging
+import threading
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MOCK_RATES = {'base': 'USD', 'rates': {'INR': '83'}}
+
+
+class FxRateError(Exception):
+    """Raised when no exchange rate is available."""
+
+
+def parse_rates(payload):
+    """Return ``(base, rates)`` from a {"base": ..., "rates": {...}} mapping, with Decimal rates."""
+    try:
+        base = payload['base'].upper()
+        rates = {currency.upper(): Decimal(str(rate)) for currency, rate in payload['rates'].items()}
+    except (KeyError, TypeError, AttributeError, InvalidOperation) as e:
+        raise FxRateError(f'Malformed exchange rates: {e!r}')
+    if any(rate <= 0 for rate in rates.values()):
+        raise FxRateError('Exchange rates must be positive')
+    rates[base] = Decimal('1')
+    return base, rates
+
+
+def file_provider():
+    path = getattr(settings, 'FX_RATES_FILE', None)
+    if not path:
+        raise FxRateError('FX_RATES_FILE is not set')
+    try:
+        with open(path, encoding='utf-8') as handle:
+            payload = json.load(handle)
+    except (OSError, ValueError) as e:
+        raise FxRateError(f'Could not read {path}: {e}')
+    return parse_rates(payload)
+
+
+def mock_provider():
+    return parse_rates(getattr(settings, 'FX_MOCK_RATES', DEFAULT_MOCK_RATES))
+
+
+PROVIDERS = {
+    'file': file_provider,
+    'mock': mock_provider,
+}
+
+
+def unconfigured_provider():
+    raise FxRateError('No exchange rate provider is configured; set FX_RATES_PROVIDER or FX_RATES_FILE')
+
+
+def get_provider():
+    name = getattr(settings, 'FX_RATES_PROVIDER', None)
+    if name is None:
+        if getattr(settings, 'FX_RATES_FILE', None):
+            name = 'file'
+        elif settings.DEBUG:
+            name = 'mock'
+        else:
+            return unconfigured_provider
+    if name in PROVIDERS:
+        return PROVIDERS[name]
+    return import_string(name)
+
+
+class FxRateStore:
+    """Exchange rates from one provider, refreshed after ``ttl`` seconds."""
+
+    def __init__(self, provider, ttl):
+        self.provider = provider
+        self.ttl = ttl
+        self.base = None
+        self.rates = {}
+        self.fetched_at = None
+        self._lock = threading.Lock()
+
+    def is_stale(self):
+        return self.fetched_at is None or time.monotonic() - self.fetched_at >= self.ttl
+
+    def refresh(self):
+        """Fetch rates from the provider; keep the previous ones if that fails."""
+        with self._lock:
+            try:
+                base, rates = self.provider()
+            except FxRateError:
+                if not self.rates:
+                    raise
+                logger.warning('Exchange rate refresh failed, keeping rates from the last refresh', exc_info=True)
+                # Retry after another TTL rather than on every quote
+                self.fetched_at = time.monotonic()
+                return
+            self.base, self.rates, self.fetched_at = base, rates, time.monotonic()
+
+    def rate(self, from_currency, to_currency):
+        """Return units of ``to_currency`` per one unit of ``from_currency``."""
+        if self.is_stale():
+            self.refresh()
+        rates = self.rates
+        try:
+            return rates[to_currency.upper()] / rates[from_currency.upper()]
+        except KeyError as e:
+            raise FxRateError(f'No exchange rate for {e.args[0]}')
+
+    def convert(self, amount, from_currency, to_currency):
+        return Decimal(str(amount)) * self.rate(from_currency, to_currency)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_rate_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = FxRateStore(get_provider(), getattr(settings, 'FX_RATES_TTL', 3600))
+        return _store
+
+
+def reset_rate_store():
+    """Drop the store so the next call re-reads the provider settings."""
+    global _store
+    with _store_lock:
+        _store = None
+
+
+def get_rate(from_currency, to_currency):
+    """Return units of ``to_currency`` per one unit of ``from_currency``. Raises FxRateError."""
+    return get_rate_store().rate(from_currency, to_currency)
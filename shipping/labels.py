@@ -0,0 +1,246 @@
+"""
+Shipping label rendering, one label per page or several per sheet.
+
+Shipments are read as plain dicts with one joined ``values()`` query, so
+labels can be drawn in the PDF worker pool (``shipping.pdf_render``) without
+touching the database. Batches are split into chunks of sheets, the chunks
+are drawn in parallel and the resulting PDFs are concatenated into one
+document that is spooled to a temporary file and streamed to the client.
+"""
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.utils.dateparse import parse_date
+
+from .barcodes import barcode_png, code128_drawing, draw_barcode, qr_drawing, tracking_qr_data
+from .models import PACKAGE_TYPE_CHOICES, SHIPPING_STATUS_CHOICES, Shipment
+from .pdf_render import get_executor
+
+# Labels per sheet -> (columns, rows) on a US Letter page
+LABEL_LAYOUTS = {
+    1: (1, 1),
+    4: (2, 2),
+    6: (2, 3),
+}
+
+# Sheets drawn by one worker task
+SHEETS_PER_CHUNK = 25
+
+STREAM_BLOCK_SIZE = 64 * 1024
+
+LABEL_FIELDS = (
+    'id', 'tracking_number', 'package_type', 'weight', 'status',
+    'sender_address__user__first_name', 'sender_address__user__last_name',
+    'sender_address__address_line1', 'sender_address__address_line2',
+    'sender_address__city', 'sender_address__state', 'sender_address__postal_code',
+    'sender_address__country', 'sender_address__phone_number',
+    'recipient_address__address_line1', 'recipient_address__address_line2',
+    'recipient_address__city', 'recipient_address__state', 'recipient_address__postal_code',
+    'recipient_address__country', 'recipient_address__phone_number',
+)
+
+PACKAGE_TYPE_LABELS = dict(PACKAGE_TYPE_CHOICES)
+STATUS_LABELS = dict(SHIPPING_STATUS_CHOICES)
+
+
+# Upper bound on labels per request/command run
+MAX_BATCH_LABELS = 5000
+
+
+def parse_shipping_date(value):
+    """Return ``value`` (a ``YYYY-MM-DD`` string) as a date; raise ValueError if it is not one."""
+    try:
+        shipping_date = parse_date(value)
+    except ValueError:
+        shipping_date = None
+    if shipping_date is None:
+        raise ValueError(f'shipping_date must be a date in YYYY-MM-DD format, not {value!r}')
+    return shipping_date
+
+
+def select_label_shipments(ids=None, status=None, shipping_date=None, courier_service=None):
+    """
+    Return the shipments matching a list of ids and/or simple filters.
+
+    ``shipping_date`` may be a date or a ``YYYY-MM-DD`` string; any other
+    string raises ValueError.
+    """
+    if isinstance(shipping_date, str) and shipping_date:
+        shipping_date = parse_shipping_date(shipping_date)
+    shipments = Shipment.objects.all()
+    if ids:
+        shipments = shipments.filter(id__in=ids)
+    if status:
+        shipments = shipments.filter(status=status)
+    if shipping_date:
+        shipments = shipments.filter(shipping_date=shipping_date)
+    if courier_service:
+        shipments = shipments.filter(courier_service=courier_service)
+    return shipments
+
+
+def label_rows(queryset, limit=None):
+    """Return the label data of the shipments in ``queryset`` as plain dicts, in id order."""
+    rows = queryset.order_by('id').values(*LABEL_FIELDS)
+    if limit is not None:
+        rows = rows[:limit]
+    return list(rows)
+
+
+def _address_lines(row, prefix):
+    lines = [row[f'{prefix}__address_line1']]
+    if row[f'{prefix}__address_line2']:
+        lines.append(row[f'{prefix}__address_line2'])
+    lines.append(f"{row[f'{prefix}__city']}, {row[f'{prefix}__state']} {row[f'{prefix}__postal_code']}")
+    lines.append(str(row[f'{prefix}__country']))
+    if row[f'{prefix}__phone_number']:
+        lines.append(f"Phone: {row[f'{prefix}__phone_number']}")
+    return lines
+
+
+class LabelPainter:
+    """
+    Draws labels onto a ReportLab canvas.
+
+    Barcodes are embedded as cached vector drawings by default. With
+    ``LABEL_VECTOR_BARCODES = False`` they are placed as PNGs from the
+    barcode image cache instead; either way a reprint encodes no images.
+    """
+
+    def __init__(self, vector=None):
+        if vector is None:
+            vector = getattr(settings, 'LABEL_VECTOR_BARCODES', True)
+        self.vector = vector
+
+    def draw_qr(self, canvas, tracking_number, x, y, size):
+        from reportlab.lib.utils import ImageReader
+
+        data = tracking_qr_data(tracking_number)
+        if self.vector:
+            draw_barcode(canvas, qr_drawing(data, size), x, y)
+        else:
+            canvas.drawImage(ImageReader(BytesIO(barcode_png('qr', data))), x, y, width=size, height=size)
+
+    def draw_code128(self, canvas, tracking_number, x, y, width, height):
+        from reportlab.lib.utils import ImageReader
+
+        if self.vector:
+            drawing = code128_drawing(tracking_number)
+            canvas.saveState()
+            canvas.translate(x, y)
+            canvas.scale(min(1.0, width / drawing.width), height / drawing.height)
+            draw_barcode(canvas, drawing, 0, 0)
+            canvas.restoreState()
+        else:
+            image = ImageReader(BytesIO(barcode_png('code128', tracking_number)))
+            canvas.drawImage(image, x, y, width=width, height=height, preserveAspectRatio=True, anchor='sw')
+
+    def draw(self, canvas, row, x, y, width, height):
+        """Draw one label in the box whose top-left corner is (x, y)."""
+        # Everything is laid out for a full Letter page and scaled into the box
+        scale = min(width / 612.0, height / 792.0)
+        canvas.saveState()
+        canvas.translate(x, y)
+        canvas.scale(scale, scale)
+
+        page_width = 612.0
+        canvas.setFont('Helvetica-Bold', 14)
+        canvas.drawString(72, -72, 'SHIPPING LABEL')
+        canvas.line(72, -80, page_width - 72, -80)
+
+        line_y = -100
+        sender_name = ' '.join(filter(None, [
+            row['sender_address__user__first_name'], row['sender_address__user__last_name'],
+        ])) or 'Sender'
+        sections = [
+            ('FROM:', [sender_name] + _address_lines(row, 'sender_address')),
+            ('TO:', ['Recipient'] + _address_lines(row, 'recipient_address')),
+            ('SHIPMENT DETAILS:', [
+                f"Tracking #: {row['tracking_number']}",
+                f"Package Type: {PACKAGE_TYPE_LABELS.get(row['package_type'], row['package_type'])}",
+                f"Weight: {row['weight']} kg",
+                f"Status: {STATUS_LABELS.get(row['status'], row['status'])}",
+            ]),
+        ]
+        for index, (title, lines) in enumerate(sections):
+            if index:
+                line_y -= 40
+            canvas.setFont('Helvetica-Bold', 12)
+            canvas.drawString(72, line_y, title)
+            canvas.setFont('Helvetica', 10)
+            line_y -= 20
+            for position, text in enumerate(lines):
+                if position:
+                    line_y -= 15
+                canvas.drawString(72, line_y, text)
+
+        self.draw_qr(canvas, row['tracking_number'], page_width - 200, -200, 100)
+        self.draw_code128(canvas, row['tracking_number'], 72, line_y - 110, page_width - 144, 80)
+
+        canvas.restoreState()
+
+
+def render_label_sheets(rows, per_sheet=1):
+    """Draw ``rows`` onto sheets of ``per_sheet`` labels and return the PDF bytes."""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas as pdf_canvas
+
+    columns, rows_per_sheet = LABEL_LAYOUTS[per_sheet]
+    page_width, page_height = letter
+    cell_width = page_width / columns
+    cell_height = page_height / rows_per_sheet
+
+    buffer = BytesIO()
+    canvas = pdf_canvas.Canvas(buffer, pagesize=letter)
+    painter = LabelPainter()
+    for start in range(0, len(rows), per_sheet):
+        for slot, row in enumerate(rows[start:start + per_sheet]):
+            column, line = slot % columns, slot // columns
+            painter.draw(canvas, row, column * cell_width, page_height - line * cell_height,
+                         cell_width, cell_height)
+        canvas.showPage()
+    canvas.save()
+    return buffer.getvalue()
+
+
+def render_label_batch(rows, per_sheet=4):
+    """
+    Render a batch of labels into one PDF spooled to a temporary file.
+
+    Chunks of ``SHEETS_PER_CHUNK`` sheets are drawn in the PDF worker pool
+    (or in-process when ``PDF_RENDER_WORKERS`` is 0) and concatenated in
+    order. Returns the open file, positioned at the start.
+    """
+    from pypdf import PdfReader, PdfWriter
+
+    if per_sheet not in LABEL_LAYOUTS:
+        raise ValueError(f'per_sheet must be one of {sorted(LABEL_LAYOUTS)}')
+
+    chunk_size = per_sheet * SHEETS_PER_CHUNK
+    chunks = [rows[start:start + chunk_size] for start in range(0, len(rows), chunk_size)]
+    if getattr(settings, 'PDF_RENDER_WORKERS', 2) == 0 or len(chunks) < 2:
+        parts = [render_label_sheets(chunk, per_sheet) for chunk in chunks]
+    else:
+        futures = [get_executor().submit(render_label_sheets, chunk, per_sheet) for chunk in chunks]
+        parts = [future.result() for future in futures]
+
+    writer = PdfWriter()
+    for part in parts:
+        writer.append(PdfReader(BytesIO(part)))
+    output = tempfile.TemporaryFile()
+    writer.write(output)
+    output.seek(0)
+    return output
+
+
+def iter_file(handle, block_size=STREAM_BLOCK_SIZE):
+    """Yield a file in blocks and close it at the end."""
+    try:
+        while True:
+            block = handle.read(block_size)
+            if not block:
+                break
+            yield block
+    finally:
+        handle.close()
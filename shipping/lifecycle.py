@@ -0,0 +1,112 @@
+"""
+Shipment lifecycle.
+
+Every status change goes through here, together with the tracking event
+that records it. ``record_event`` locks the shipment, checks the transition
+against ``TRANSITIONS``, inserts the event and, in the same transaction,
+points ``Shipment.latest_event`` / ``latest_location`` at it and stamps
+``status_changed_at`` when the status moves. List and tracking pages read
+those fields instead of loading ``tracking_events``, and status and history
+can no longer drift apart.
+
+An event with the shipment's current status is a progress scan (a new
+location) and is always allowed. Events older than the latest one are
+history: they are stored but change nothing on the shipment.
+
+Bulk writers (``create_shipments``, ``tracking_events.ingest_events``)
+apply the same rules with ``check_transition``.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .models import SHIPPING_STATUS_CHOICES, Shipment, TrackingEvent
+
+STATUS_LABELS = dict(SHIPPING_STATUS_CHOICES)
+
+# Status -> statuses it may move to
+TRANSITIONS = {
+    'pending': {'processing', 'shipped', 'delivered', 'cancelled'},
+    'processing': {'shipped', 'delivered', 'cancelled'},
+    'shipped': {'delivered', 'cancelled'},
+    'delivered': set(),
+    'cancelled': set(),
+}
+
+FINAL_STATUSES = {status for status, following in TRANSITIONS.items() if not following}
+
+
+class InvalidTransition(ValueError):
+    """Raised when a shipment cannot move to the requested status."""
+
+
+def can_transition(current, new):
+    return new == current or new in TRANSITIONS.get(current, ())
+
+
+def check_transition(current, new):
+    if new not in STATUS_LABELS:
+        raise InvalidTransition(f'"{new}" is not a shipment status')
+    if not can_transition(current, new):
+        raise InvalidTransition(
+            f'Cannot change a {STATUS_LABELS.get(current, current).lower()} shipment to '
+            f'{STATUS_LABELS[new].lower()}'
+        )
+
+
+def record_event(shipment, status, location, description='', timestamp=None):
+    """
+    Append a tracking event to ``shipment`` and move its status.
+
+    Raises InvalidTransition if the event is the newest one and its status
+    cannot follow the shipment's. ``shipment`` is updated in place; the new
+    TrackingEvent is returned.
+    """
+    now = timezone.now()
+    timestamp = timestamp or now
+    with transaction.atomic():
+        current = Shipment.objects.select_for_update().get(pk=shipment.pk)
+        latest_timestamp = None
+        if current.latest_event_id:
+            latest_timestamp = TrackingEvent.objects.filter(pk=current.latest_event_id).values_list(
+                'timestamp', flat=True).first()
+        is_latest = latest_timestamp is None or timestamp >= latest_timestamp
+        if is_latest:
+            check_transition(current.status, status)
+
+        event = TrackingEvent.objects.create(
+            shipment=shipment, status=status, location=location, description=description, timestamp=timestamp,
+        )
+        fields = {}
+        if is_latest:
+            fields = {'latest_event': event, 'latest_location': location, 'updated_at': now}
+            if status != current.status:
+                fields.update(status=status, status_changed_at=timestamp)
+            Shipment.objects.filter(pk=shipment.pk).update(**fields)
+        for name, value in fields.items():
+            setattr(shipment, name, value)
+    return event
+
+
+def cancel(shipment, user=None, location=None):
+    """Cancel a shipment that is not delivered or already cancelled. Raises InvalidTransition."""
+    if location is None:
+        address = shipment.sender_address
+        location = f'{address.city}, {address.state}'
+    by = f' by {user.get_full_name() or user.username}' if user is not None else ''
+    return record_event(shipment, 'cancelled', location, description=f'Shipment cancelled{by}')
+
+
+def refresh_latest_event(shipment):
+    """
+    Re-point ``shipment`` at its newest event and take that event's status.
+
+    For edits that bypass ``record_event``, such as the admin's tracking
+    event inline.
+    """
+    event = shipment.tracking_events.order_by('-timestamp', '-id').first()
+    fields = {'latest_event': event, 'latest_location': event.location if event else ''}
+    if event is not None and event.status != shipment.status:
+        fields.update(status=event.status, status_changed_at=event.timestamp)
+    Shipment.objects.filter(pk=shipment.pk).update(**fields)
+    for name, value in fields.items():
+        setattr(shipment, name, value)
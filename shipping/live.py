@@ -0,0 +1,248 @@
+"""
+Live tracking updates over server-sent events and WebSockets.
+
+Clients subscribe to one tracking number instead of polling:
+
+- ``shipping:tracking_stream`` (``/shipping/tracking/<number>/stream/``)
+  answers with a ``text/event-stream``,
+- ``/ws/tracking/<number>/`` is a WebSocket, routed in ``pmb_hello/asgi.py``.
+
+Both first send a ``snapshot`` message (``tracking_cache.timeline`` of the
+shipment) and then one ``event`` message per new TrackingEvent, as JSON.
+Events are published when their transaction commits: by the TrackingEvent
+signal handler in ``shipping.signals`` and by
+``tracking_events.ingest_events`` for its bulk inserts.
+
+Messages fan out through a broker (``get_broker``). ``LocalBroker`` keeps
+subscribers in process memory, so it only reaches clients connected to the
+process that wrote the event. Deployments with several ASGI workers, or
+that ingest from management commands, plug in a shared broker with
+TRACKING_PUSH_BROKER. A subscriber that falls more than
+TRACKING_PUSH_QUEUE_SIZE messages behind is disconnected; clients resync
+from a new snapshot when they reconnect.
+
+Both endpoints hold a connection open per client and need an ASGI server;
+``entrypoint.sh`` serves ``pmb_hello.asgi:application`` with uvicorn. Under
+WSGI the SSE view answers 501 instead of tying up a worker thread. The
+tracking page (``shipping/tracking.html``) subscribes with an EventSource
+and updates itself in place.
+
+Settings:
+    TRACKING_PUSH_BROKER: dotted path of the broker class (default 'shipping.live.LocalBroker')
+    TRACKING_PUSH_QUEUE_SIZE: messages buffered per subscriber (default 100)
+    TRACKING_PUSH_KEEPALIVE: idle seconds between SSE keep-alive comments (default 15)
+"""
+import asyncio
+import json
+import re
+import threading
+from contextlib import asynccontextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+from . import tracking_cache
+
+DEFAULT_BROKER = 'shipping.live.LocalBroker'
+
+WEBSOCKET_PATH = re.compile(r'^/ws/tracking/(?P<tracking_number>[^/]+)/$')
+
+# WebSocket close codes
+CLOSE_NOT_FOUND = 4404
+CLOSE_TRY_AGAIN = 1013
+
+
+def queue_size():
+    return getattr(settings, 'TRACKING_PUSH_QUEUE_SIZE', 100)
+
+
+def keepalive():
+    return getattr(settings, 'TRACKING_PUSH_KEEPALIVE', 15)
+
+
+def encode(message):
+    return json.dumps(message, cls=DjangoJSONEncoder)
+
+
+class SubscriberOverflow(Exception):
+    """Raised to a subscriber that fell too far behind its channel."""
+
+
+class Subscription:
+    """Messages of one channel for one client, delivered on the client's event loop."""
+
+    def __init__(self, loop, size):
+        self.loop = loop
+        self.size = size
+        self.queue = asyncio.Queue()
+        self.overflowed = False
+
+    def deliver(self, message):
+        """Queue ``message``; must run on ``self.loop``."""
+        if self.overflowed:
+            return
+        if self.queue.qsize() >= self.size:
+            self.overflowed = True
+            # Wakes the reader, which then raises SubscriberOverflow
+            message = None
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout=None):
+        """Return the next message, or None after ``timeout`` idle seconds."""
+        try:
+            message = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if message is None:
+            raise SubscriberOverflow()
+        return message
+
+
+class Broker:
+    """
+    Fans messages out to the subscribers of a channel (a tracking number).
+
+    ``publish`` is called from synchronous code in any thread; ``subscribe``
+    from the subscriber's event loop. Messages are JSON strings.
+    """
+
+    def publish(self, channel, message):
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        """Return an async context manager yielding a Subscription."""
+        raise NotImplementedError
+
+
+class LocalBroker(Broker):
+    """In-process broker: subscribers of this process only."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.channels = {}
+
+    def publish(self, channel, message):
+        with self.lock:
+            subscriptions = list(self.channels.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+            except RuntimeError:
+                # The subscriber's loop is closed; it unsubscribes as it unwinds
+                pass
+        return len(subscriptions)
+
+    def subscribers(self, channel):
+        with self.lock:
+            return len(self.channels.get(channel, ()))
+
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        subscription = Subscription(asyncio.get_running_loop(), queue_size())
+        with self.lock:
+            self.channels.setdefault(channel, set()).add(subscription)
+        try:
+            yield subscription
+        finally:
+            with self.lock:
+                subscriptions = self.channels.get(channel, set())
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    self.channels.pop(channel, None)
+
+
+_brokers = {}
+_brokers_lock = threading.Lock()
+
+
+def get_broker():
+    """Return the process-wide broker configured by TRACKING_PUSH_BROKER."""
+    path = getattr(settings, 'TRACKING_PUSH_BROKER', DEFAULT_BROKER)
+    with _brokers_lock:
+        if path not in _brokers:
+            _brokers[path] = import_string(path)()
+        return _brokers[path]
+
+
+def event_message(tracking_number, event):
+    return {
+        'type': 'event',
+        'tracking_number': tracking_number,
+        'status': event.status,
+        'status_display': tracking_cache.STATUS_LABELS.get(event.status, event.status),
+        'location': event.location,
+        'description': event.description,
+        'timestamp': event.timestamp,
+    }
+
+
+def publish_events(events, tracking_numbers):
+    """
+    Publish TrackingEvents to the subscribers of their shipments.
+
+    ``tracking_numbers`` maps shipment ids to tracking numbers. Call once
+    the events are committed.
+    """
+    broker = get_broker()
+    for event in sorted(events, key=lambda event: event.timestamp):
+        tracking_number = tracking_numbers.get(event.shipment_id)
+        if tracking_number:
+            broker.publish(tracking_number, encode(event_message(tracking_number, event)))
+
+
+async def updates(tracking_number):
+    """
+    Yield the snapshot and then each new event of ``tracking_number`` as JSON.
+
+    Yields None after TRACKING_PUSH_KEEPALIVE idle seconds and stops if the
+    shipment does not exist or the subscriber falls behind.
+    """
+    async with get_broker().subscribe(tracking_number) as subscription:
+        # Subscribed before the snapshot is read, so no event falls in between
+        entry = await sync_to_async(tracking_cache.get_tracking)(tracking_number)
+        if entry is None:
+            return
+        yield encode({'type': 'snapshot', **tracking_cache.timeline(entry)})
+        while True:
+            try:
+                yield await subscription.get(keepalive())
+            except SubscriberOverflow:
+                return
+
+
+async def event_stream(tracking_number):
+    """Server-sent events body for ``tracking_number``."""
+    async for message in updates(tracking_number):
+        yield ': keepalive\n\n' if message is None else f'data: {message}\n\n'
+
+
+async def websocket_application(scope, receive, send):
+    """ASGI application for ``/ws/tracking/<number>/``; messages are sent as text frames."""
+    if (await receive())['type'] != 'websocket.connect':
+        return
+    match = WEBSOCKET_PATH.match(scope['path'])
+    if match is None or await sync_to_async(tracking_cache.get_tracking)(match['tracking_number']) is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+        return
+    await send({'type': 'websocket.accept'})
+
+    async def forward():
+        async for message in updates(match['tracking_number']):
+            if message is not None:
+                await send({'type': 'websocket.send', 'text': message})
+        # Fell behind: the client reconnects and starts from a new snapshot
+        await send({'type': 'websocket.close', 'code': CLOSE_TRY_AGAIN})
+
+    async def disconnected():
+        while (await receive())['type'] != 'websocket.disconnect':
+            pass
+
+    tasks = [asyncio.ensure_future(forward()), asyncio.ensure_future(disconnected())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
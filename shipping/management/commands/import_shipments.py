@@ -0,0 +1,64 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from shipping.manifests import ManifestError, default_batch_size, import_manifest
+
+User = get_user_model()
+
+MAX_REPORTED_ERRORS = 50
+
+
+def get_user(username, option):
+    try:
+        return User.objects.get(username=username)
+    except User.DoesNotExist:
+        raise CommandError(f'{option}: no user named "{username}"')
+
+
+class Command(BaseCommand):
+    help = 'Import shipments from a CSV or Excel (.xlsx) manifest'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path of the .csv or .xlsx manifest')
+        parser.add_argument('--customer', required=True,
+                          help='Username of the customer who owns the sender addresses and is billed')
+        parser.add_argument('--created-by', type=str,
+                          help='Username recorded as the creator (default: the customer)')
+        parser.add_argument('--batch-size', type=int, default=default_batch_size(),
+                          help='Number of shipments written per transaction (default: MANIFEST_IMPORT_BATCH_SIZE)')
+        parser.add_argument('--dry-run', action='store_true',
+                          help='Validate and price the manifest without creating anything')
+        parser.add_argument('--no-invoices', action='store_true',
+                          help='Do not generate invoices for the imported shipments')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        customer = get_user(options['customer'], '--customer')
+        created_by = get_user(options['created_by'], '--created-by') if options.get('created_by') else None
+
+        path = options['path']
+        try:
+            with open(path, 'rb') as handle:
+                result = import_manifest(
+                    handle, os.path.basename(path), customer, created_by=created_by,
+                    batch_size=options['batch_size'], dry_run=options['dry_run'],
+                    invoice=not options['no_invoices'],
+                )
+        except OSError as e:
+            raise CommandError(f'Could not read {path}: {e}')
+        except ManifestError as e:
+            raise CommandError(str(e))
+
+        for line, errors in result.errors[:MAX_REPORTED_ERRORS]:
+            messages = '; '.join(f'{column}: {" ".join(texts)}' for column, texts in errors.items())
+            self.stderr.write(f'Line {line}: {messages}')
+        if len(result.errors) > MAX_REPORTED_ERRORS:
+            self.stderr.write(f'... and {len(result.errors) - MAX_REPORTED_ERRORS} more row(s) with errors')
+
+        if result.dry_run:
+            self.stdout.write(f'{result.valid} of {result.rows} row(s) would be imported')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Imported {result.imported} of {result.rows} shipment(s)'))
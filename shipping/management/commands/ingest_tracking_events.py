@@ -0,0 +1,85 @@
+import json
+import sys
+from contextlib import nullcontext
+from itertools import chain
+
+from django.core.management.base import BaseCommand, CommandError
+
+from shipping.tracking_events import IngestResult, batch_size, ingest_events
+
+MAX_REPORTED_ERRORS = 50
+
+
+def read_json_lines(handle):
+    """Yield ``(line number, event)`` from a JSON array or a file with one JSON object per line."""
+    first = handle.read(1)
+    while first and first.isspace():
+        first = handle.read(1)
+    if first == '[':
+        try:
+            events = json.loads(first + handle.read())
+        except ValueError as e:
+            raise CommandError(f'Invalid JSON: {e}')
+        yield from enumerate(events, start=1)
+        return
+
+    for line_number, line in enumerate(chain([first + handle.readline()], handle), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            raise CommandError(f'Line {line_number}: invalid JSON: {e}')
+
+
+class Command(BaseCommand):
+    help = 'Ingest courier tracking events from a JSON array or JSON lines file ("-" reads stdin)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path of the events file, or - for standard input')
+        parser.add_argument('--batch-size', type=int, default=batch_size(),
+                          help='Number of events written per transaction (default: TRACKING_INGEST_BATCH_SIZE)')
+
+    def handle(self, *args, **options):
+        size = options['batch_size']
+        if size < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        path = options['path']
+        try:
+            source = nullcontext(sys.stdin) if path == '-' else open(path, encoding='utf-8')
+        except OSError as e:
+            raise CommandError(f'Could not read {path}: {e}')
+
+        result = IngestResult()
+        with source as handle:
+            batch = []
+            numbers = []
+            for line_number, event in read_json_lines(handle):
+                batch.append(event)
+                numbers.append(line_number)
+                if len(batch) >= size:
+                    self.ingest(batch, numbers, result)
+                    batch, numbers = [], []
+            if batch:
+                self.ingest(batch, numbers, result)
+
+        for line_number, errors in result.errors[:MAX_REPORTED_ERRORS]:
+            messages = '; '.join(f'{field}: {" ".join(texts)}' for field, texts in errors.items())
+            self.stderr.write(f'Event {line_number}: {messages}')
+        if len(result.errors) > MAX_REPORTED_ERRORS:
+            self.stderr.write(f'... and {len(result.errors) - MAX_REPORTED_ERRORS} more invalid event(s)')
+        if result.unknown:
+            self.stderr.write(f'{len(result.unknown)} unknown tracking number(s), e.g. {", ".join(result.unknown[:5])}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {result.created} of {result.received} event(s) ({result.duplicates} duplicate(s)), '
+            f'updated {result.updated_shipments} shipment(s)'
+        ))
+
+    def ingest(self, batch, numbers, result):
+        batch_result = ingest_events(batch, size=len(batch))
+        # Report errors by line number rather than position in the batch
+        batch_result.errors = [(numbers[position], errors) for position, errors in batch_result.errors]
+        result.merge(batch_result)
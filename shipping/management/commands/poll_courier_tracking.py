@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from shipping.couriers import adapter_paths
+from shipping.couriers.poller import pollable_shipments, refresh_shipments
+
+
+class Command(BaseCommand):
+    help = 'Fetch courier travel histories of shipments in transit and store them as tracking events'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--courier', action='append',
+                          help='Only poll this courier service (repeatable, default: every configured adapter)')
+        parser.add_argument('--tracking-number', action='append',
+                          help='Only poll this shipment, by our or the courier tracking number (repeatable)')
+        parser.add_argument('--limit', type=int,
+                          help='Poll at most this many shipments, least recently updated first')
+        parser.add_argument('--pool-size', type=int,
+                          help='Browser sessions per courier (default: COURIER_POOL_SIZE)')
+
+    def handle(self, *args, **options):
+        couriers = options.get('courier')
+        unknown = set(couriers or ()) - set(adapter_paths())
+        if unknown:
+            raise CommandError(f'No tracking adapter for: {", ".join(sorted(unknown))}')
+        if options.get('pool_size') is not None and options['pool_size'] < 1:
+            raise CommandError('--pool-size must be at least 1')
+
+        shipments = pollable_shipments(couriers).order_by('updated_at').only(
+            'tracking_number', 'courier_service', 'courier_tracking_number'
+        )
+        if options.get('tracking_number'):
+            numbers = options['tracking_number']
+            shipments = shipments.filter(Q(tracking_number__in=numbers) | Q(courier_tracking_number__in=numbers))
+        if options.get('limit'):
+            shipments = shipments[:options['limit']]
+        shipments = list(shipments)
+        if not shipments:
+            self.stdout.write('No shipments to poll')
+            return
+
+        result = refresh_shipments(shipments, pool_size=options.get('pool_size'))
+        for tracking_number, message in result.failed:
+            self.stderr.write(f'{tracking_number}: {message}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Tracked {result.tracked} of {len(shipments)} shipment(s): stored {result.events.created} new '
+            f'event(s), updated {result.events.updated_shipments} shipment status(es)'
+        ))
@@ -0,0 +1,48 @@
+import shutil
+
+from django.core.management.base import BaseCommand, CommandError
+
+from shipping.labels import LABEL_LAYOUTS, MAX_BATCH_LABELS, label_rows, render_label_batch, select_label_shipments
+
+
+class Command(BaseCommand):
+    help = 'Write the shipping labels of many shipments to one PDF, several labels per sheet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', type=str, help='Path of the PDF file to write')
+        parser.add_argument('--ids', type=str, help='Comma-separated shipment IDs')
+        parser.add_argument('--status', type=str, help='Only shipments with this status')
+        parser.add_argument('--shipping-date', type=str, help='Only shipments shipping on this date (YYYY-MM-DD)')
+        parser.add_argument('--courier-service', type=str, help='Only shipments with this courier service')
+        parser.add_argument('--per-sheet', type=int, default=4, choices=sorted(LABEL_LAYOUTS),
+                          help='Labels per sheet (default: 4)')
+        parser.add_argument('--limit', type=int, default=MAX_BATCH_LABELS,
+                          help=f'Maximum number of labels (default: {MAX_BATCH_LABELS})')
+
+    def handle(self, *args, **options):
+        try:
+            ids = [int(value) for value in (options.get('ids') or '').split(',') if value.strip()]
+        except ValueError:
+            raise CommandError('--ids must be a comma-separated list of integers')
+
+        filters = {
+            'status': options.get('status'),
+            'shipping_date': options.get('shipping_date'),
+            'courier_service': options.get('courier_service'),
+        }
+        if not ids and not any(filters.values()):
+            raise CommandError('Select shipments with --ids or at least one filter')
+
+        try:
+            shipments = select_label_shipments(ids=ids, **filters)
+        except ValueError:
+            raise CommandError('--shipping-date must be a date in YYYY-MM-DD format')
+        rows = label_rows(shipments, limit=options['limit'])
+        if not rows:
+            raise CommandError('No shipments matched')
+
+        pdf_file = render_label_batch(rows, per_sheet=options['per_sheet'])
+        with pdf_file, open(options['output'], 'wb') as output:
+            shutil.copyfileobj(pdf_file, output)
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(rows)} label(s) to {options['output']}"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from shipping.search import index_bills
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the bill search documents from the Bill, Shipment and User tables'
+
+    def handle(self, *args, **options):
+        written = index_bills()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {written} bill(s)'))
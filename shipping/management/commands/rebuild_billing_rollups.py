@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from shipping.rollups import rebuild_bill_rollups
+
+
+def parse_day(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD')
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the BillDailyRollup table from the Bill table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=str, help='First day to rebuild (YYYY-MM-DD, inclusive)')
+        parser.add_argument('--until', type=str, help='Last day to rebuild (YYYY-MM-DD, inclusive)')
+
+    def handle(self, *args, **options):
+        since = parse_day(options['since']) if options.get('since') else None
+        until = parse_day(options['until']) if options.get('until') else None
+        if since and until and since > until:
+            raise CommandError('--since must not be after --until')
+
+        rows = rebuild_bill_rollups(since=since, until=until)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} billing rollup row(s)'))
@@ -0,0 +1,75 @@
+from datetime import datetime
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from shipping.activity import ActivityHistory
+from shipping.models import Bill
+from shipping.rollups import update_bills
+
+SWEEP_ACTION = 'Bill marked as overdue (due date passed)'
+
+
+def parse_day(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD')
+
+
+class Command(BaseCommand):
+    help = 'Mark PENDING bills whose due date has passed as OVERDUE (run periodically, e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                          help='Number of bills updated per transaction (default: 500)')
+        parser.add_argument('--due-after', type=str,
+                          help='Only sweep bills due on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--due-before', type=str,
+                          help='Only sweep bills due before this date (YYYY-MM-DD, default: today)')
+        parser.add_argument('--dry-run', action='store_true',
+                          help='Report how many bills would be updated without changing anything')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        today = timezone.now().date()
+        due_before = parse_day(options['due_before']) if options.get('due_before') else today
+        if due_before > today:
+            raise CommandError('--due-before cannot be later than today')
+
+        candidates = Bill.objects.filter(status='PENDING', due_date__lt=due_before)
+        if options.get('due_after'):
+            candidates = candidates.filter(due_date__gte=parse_day(options['due_after']))
+
+        if options['dry_run']:
+            self.stdout.write(f'{candidates.count()} bill(s) would be marked as OVERDUE')
+            return
+
+        bill_type = ContentType.objects.get_for_model(Bill)
+        total = 0
+        last_pk = 0
+        while True:
+            # Walk the candidates in primary key order so each batch is an index range scan
+            pks = list(
+                candidates.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            last_pk = pks[-1]
+
+            with transaction.atomic():
+                batch = Bill.objects.filter(pk__in=pks, status='PENDING')
+                swept = list(batch.values_list('pk', flat=True))
+                update_bills(batch, status='OVERDUE', updated_at=timezone.now())
+                ActivityHistory.objects.bulk_create([
+                    ActivityHistory(user=None, action=SWEEP_ACTION, content_type=bill_type, object_id=pk)
+                    for pk in swept
+                ])
+            total += len(swept)
+
+        self.stdout.write(self.style.SUCCESS(f'Marked {total} bill(s) as OVERDUE'))
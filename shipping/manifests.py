@@ -0,0 +1,346 @@
+"""
+Shipment manifest imports.
+
+B2B customers send manifests of hundreds or thousands of shipments as CSV
+or Excel files, one shipment per row with the columns in
+``MANIFEST_COLUMNS``. ``import_manifest`` reads the file row by row (CSV
+through ``csv.reader``, XLSX through openpyxl's read-only mode), so a
+large manifest is never held in memory, and handles it in batches:
+
+- each row is checked on its own; choice columns accept the stored value or
+  the label in any case (``FedEx``, ``fedex``, ``FEDEX``),
+- tracking numbers given in the file are checked against the database with
+  one query per batch and against the rest of the file,
+- prices come from ``calculate_shipping_cost``, whose quotes are memoized,
+  so repeated package profiles are priced once,
+- valid rows are written by ``shipments.create_shipments``, which reuses
+  known addresses through the address hash index and inserts each table
+  with one ``bulk_create``, in one transaction per batch.
+
+Rows with errors are skipped and reported with their line number; the
+other rows are imported. A dry run validates and prices every row without
+writing anything.
+
+Settings:
+    MANIFEST_IMPORT_BATCH_SIZE: rows written per transaction (default 500)
+"""
+import csv
+import io
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+
+from . import pricing
+from .models import (ADDRESS_HASH_FIELDS, COURIER_SERVICES, PACKAGE_TYPE_CHOICES, Shipment, ShipmentItem,
+                     ShippingAddress)
+from .shipments import calculate_shipping_cost, create_shipments
+
+ADDRESS_COLUMNS = ADDRESS_HASH_FIELDS
+OPTIONAL_ADDRESS_FIELDS = {'address_line2'}
+
+MANIFEST_COLUMNS = (
+    tuple(f'sender_{field}' for field in ADDRESS_COLUMNS)
+    + tuple(f'recipient_{field}' for field in ADDRESS_COLUMNS)
+    + ('package_type', 'weight', 'length', 'width', 'height', 'shipping_date', 'courier_service',
+       'courier_tracking_number', 'tracking_number', 'item_name', 'item_quantity', 'item_description')
+)
+OPTIONAL_COLUMNS = (
+    {f'sender_{field}' for field in OPTIONAL_ADDRESS_FIELDS}
+    | {f'recipient_{field}' for field in OPTIONAL_ADDRESS_FIELDS}
+    | {'courier_service', 'courier_tracking_number', 'tracking_number', 'item_name', 'item_quantity',
+       'item_description'}
+)
+REQUIRED_COLUMNS = tuple(column for column in MANIFEST_COLUMNS if column not in OPTIONAL_COLUMNS)
+
+DIMENSION_FIELDS = ('weight', 'length', 'width', 'height')
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y')
+
+REQUIRED_MESSAGE = 'This field is required.'
+
+
+class ManifestError(ValueError):
+    """Raised when a manifest as a whole cannot be read."""
+
+
+class ImportResult:
+    """Outcome of a manifest import."""
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.rows = 0
+        self.imported = 0
+        # (line number, {column: [messages]})
+        self.errors = []
+
+    @property
+    def valid(self):
+        return self.rows - len(self.errors)
+
+    def __repr__(self):
+        return f'<ImportResult rows={self.rows} imported={self.imported} errors={len(self.errors)}>'
+
+
+def default_batch_size():
+    return getattr(settings, 'MANIFEST_IMPORT_BATCH_SIZE', 500)
+
+
+def _choice_map(choices):
+    mapping = {}
+    for value, label in choices:
+        if value:
+            mapping[str(label).casefold()] = value
+            mapping[value.casefold()] = value
+    return mapping
+
+
+PACKAGE_TYPES = _choice_map(PACKAGE_TYPE_CHOICES)
+COURIERS = _choice_map(COURIER_SERVICES)
+
+
+def _clean_header(header):
+    return [str(column or '').strip().lower().replace(' ', '_') for column in header]
+
+
+def _check_header(header):
+    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing:
+        raise ManifestError(f'The manifest is missing these columns: {", ".join(missing)}')
+
+
+def iter_csv(handle):
+    """Yield ``(line number, row dict)`` for each non-blank row of a CSV file opened in binary mode."""
+    text = io.TextIOWrapper(handle, encoding='utf-8-sig', newline='')
+    try:
+        reader = csv.reader(text)
+        header = next(reader, None)
+        if header is None:
+            raise ManifestError('The manifest is empty.')
+        header = _clean_header(header)
+        _check_header(header)
+        for values in reader:
+            if any(value.strip() for value in values):
+                yield reader.line_num, dict(zip(header, values))
+    except UnicodeDecodeError:
+        raise ManifestError('The CSV file must be UTF-8 encoded.')
+    except csv.Error as e:
+        raise ManifestError(f'Could not parse the CSV file: {e}')
+    finally:
+        text.detach()
+
+
+def iter_xlsx(handle):
+    """Yield ``(row number, row dict)`` for each non-blank row of the first sheet of an XLSX file."""
+    from openpyxl import load_workbook
+
+    try:
+        workbook = load_workbook(handle, read_only=True, data_only=True)
+    except Exception as e:
+        raise ManifestError(f'Could not open the Excel file: {e}')
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            raise ManifestError('The manifest is empty.')
+        header = _clean_header(header)
+        _check_header(header)
+        for number, values in enumerate(rows, start=2):
+            if any(value not in (None, '') for value in values):
+                yield number, dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def iter_manifest(handle, filename):
+    """Yield the rows of a manifest, choosing the reader from the file extension."""
+    name = filename.lower()
+    if name.endswith('.csv'):
+        return iter_csv(handle)
+    if name.endswith(('.xlsx', '.xlsm')):
+        return iter_xlsx(handle)
+    raise ManifestError('Manifests must be .csv or .xlsx files.')
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # Excel stores postal codes and phone numbers typed as numbers as floats
+        value = int(value)
+    return str(value).strip()
+
+
+def _decimal(value):
+    if isinstance(value, bool):
+        raise InvalidOperation
+    number = Decimal(_text(value))
+    if not number.is_finite():
+        raise InvalidOperation
+    return number
+
+
+def _date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(_text(value), date_format).date()
+        except ValueError:
+            continue
+    raise ValueError
+
+
+def clean_row(row):
+    """
+    Return ``(spec, errors)`` for one manifest row.
+
+    ``spec`` is a ``create_shipments`` spec, priced with
+    ``calculate_shipping_cost``; it is None when the row has errors.
+    """
+    spec = {}
+    errors = {}
+    for column in REQUIRED_COLUMNS:
+        if _text(row.get(column)) == '':
+            errors[column] = [REQUIRED_MESSAGE]
+
+    for role in ('sender', 'recipient'):
+        spec[f'{role}_address'] = {
+            field: _text(row.get(f'{role}_{field}')) for field in ADDRESS_COLUMNS
+        }
+        for field in ADDRESS_COLUMNS:
+            max_length = ShippingAddress._meta.get_field(field).max_length
+            if len(spec[f'{role}_address'][field]) > max_length:
+                errors[f'{role}_{field}'] = [f'Ensure this value has at most {max_length} characters.']
+
+    package_type = _text(row.get('package_type'))
+    if package_type:
+        if package_type.casefold() in PACKAGE_TYPES:
+            spec['package_type'] = PACKAGE_TYPES[package_type.casefold()]
+        else:
+            errors['package_type'] = [f'"{package_type}" is not a valid choice.']
+
+    courier_service = _text(row.get('courier_service'))
+    if courier_service.casefold() in COURIERS:
+        spec['courier_service'] = COURIERS[courier_service.casefold()]
+    elif courier_service:
+        errors['courier_service'] = [f'"{courier_service}" is not a valid choice.']
+
+    for field in DIMENSION_FIELDS:
+        if field in errors:
+            continue
+        try:
+            number = _decimal(row.get(field))
+        except InvalidOperation:
+            errors[field] = ['A valid number is required.']
+            continue
+        if number < 0 or (field == 'weight' and number == 0):
+            errors[field] = ['Ensure this value is greater than 0.' if field == 'weight'
+                             else 'Ensure this value is greater than or equal to 0.']
+        else:
+            spec[field] = number.quantize(Decimal('0.01'))
+
+    if 'shipping_date' not in errors:
+        try:
+            spec['shipping_date'] = _date(row.get('shipping_date'))
+        except ValueError:
+            errors['shipping_date'] = ['Enter a valid date (YYYY-MM-DD).']
+
+    for field in ('tracking_number', 'courier_tracking_number'):
+        value = _text(row.get(field))
+        max_length = Shipment._meta.get_field(field).max_length
+        if len(value) > max_length:
+            errors[field] = [f'Ensure this value has at most {max_length} characters.']
+        elif value:
+            spec[field] = value
+
+    spec['items'] = []
+    item_name = _text(row.get('item_name'))
+    max_length = ShipmentItem._meta.get_field('name').max_length
+    if len(item_name) > max_length:
+        errors['item_name'] = [f'Ensure this value has at most {max_length} characters.']
+    elif item_name:
+        try:
+            quantity = int(_decimal(row.get('item_quantity') or 1))
+            if quantity < 1:
+                raise InvalidOperation
+        except (InvalidOperation, ValueError):
+            errors['item_quantity'] = ['Ensure this value is a whole number of at least 1.']
+        else:
+            spec['items'].append({
+                'name': item_name, 'quantity': quantity, 'description': _text(row.get('item_description')),
+            })
+
+    if errors:
+        return None, errors
+    try:
+        spec['shipping_cost'] = calculate_shipping_cost(
+            spec['package_type'], spec['weight'], spec.get('courier_service', ''),
+            (spec['length'], spec['width'], spec['height']),
+        )
+    except pricing.NoRateError as e:
+        return None, {'non_field_errors': [str(e)]}
+    return spec, None
+
+
+def _check_tracking_numbers(batch, seen):
+    """Return errors for tracking numbers already used in the file or the database."""
+    errors = {}
+    numbers = {spec['tracking_number']: line for line, spec in batch if 'tracking_number' in spec}
+    taken = set(Shipment.objects.filter(tracking_number__in=list(numbers)).values_list('tracking_number', flat=True))
+    for line, spec in batch:
+        number = spec.get('tracking_number')
+        if number is None:
+            continue
+        if number in taken:
+            errors[line] = {'tracking_number': ['A shipment with this tracking number already exists.']}
+        elif number in seen:
+            errors[line] = {'tracking_number': [f'Duplicate of line {seen[number]}.']}
+        else:
+            seen[number] = line
+    return errors
+
+
+def _flush(batch, result, seen, customer, created_by, dry_run, invoice):
+    duplicates = _check_tracking_numbers(batch, seen)
+    specs = []
+    for line, spec in batch:
+        if line in duplicates:
+            result.errors.append((line, duplicates[line]))
+        else:
+            specs.append(spec)
+    if specs and not dry_run:
+        create_shipments(specs, created_by=created_by, invoice=invoice, owner=customer)
+        result.imported += len(specs)
+
+
+def import_manifest(handle, filename, customer, created_by=None, batch_size=None, dry_run=False, invoice=True):
+    """
+    Import the shipments of a manifest file and return an ``ImportResult``.
+
+    ``handle`` is a binary file object and ``filename`` decides the format.
+    Sender addresses belong to ``customer``, who is also billed; ``created_by``
+    (default ``customer``) is recorded as the creator. Raises ManifestError
+    if the file cannot be read at all.
+    """
+    size = batch_size or default_batch_size()
+    result = ImportResult(dry_run=dry_run)
+    seen = {}
+    batch = []
+    for line, row in iter_manifest(handle, filename):
+        result.rows += 1
+        spec, errors = clean_row(row)
+        if errors:
+            result.errors.append((line, errors))
+            continue
+        batch.append((line, spec))
+        if len(batch) >= size:
+            _flush(batch, result, seen, customer, created_by or customer, dry_run, invoice)
+            batch = []
+    if batch:
+        _flush(batch, result, seen, customer, created_by or customer, dry_run, invoice)
+    if not result.rows:
+        raise ManifestError('The manifest contains no shipments.')
+    result.errors.sort(key=lambda error: error[0])
+    return result
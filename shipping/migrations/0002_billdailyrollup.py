@@ -0,0 +1,66 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:11
+
+from collections import defaultdict
+from decimal import Decimal
+
+import pytz
+from django.db import migrations, models
+
+
+def backfill_rollups(apps, schema_editor):
+    Bill = apps.get_model('shipping', 'Bill')
+    BillDailyRollup = apps.get_model('shipping', 'BillDailyRollup')
+    pacific = pytz.timezone('America/Los_Angeles')
+
+    totals = defaultdict(lambda: [0, Decimal('0')])
+    rows = Bill.objects.order_by().values_list('created_at', 'status', 'payment_method', 'courier_service', 'amount')
+    for created_at, status, payment_method, courier_service, amount in rows.iterator(chunk_size=2000):
+        key = (created_at.astimezone(pacific).date(), status, payment_method or '', courier_service or '')
+        totals[key][0] += 1
+        totals[key][1] += amount or 0
+
+    BillDailyRollup.objects.bulk_create(
+        [
+            BillDailyRollup(
+                day=day,
+                status=status,
+                payment_method=payment_method,
+                courier_service=courier_service,
+                bill_count=count,
+                amount=amount,
+            )
+            for (day, status, payment_method, courier_service), (count, amount) in totals.items()
+        ],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BillDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Day')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('PAID', 'Paid'), ('OVERDUE', 'Unpaid'), ('CANCELLED', 'Cancelled')], max_length=10)),
+                ('payment_method', models.CharField(blank=True, default='', max_length=20)),
+                ('courier_service', models.CharField(blank=True, default='', max_length=100)),
+                ('bill_count', models.IntegerField(default=0, verbose_name='Bills')),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Amount')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Bill Daily Rollup',
+                'verbose_name_plural': 'Bill Daily Rollups',
+                'ordering': ['-day', 'status'],
+                'indexes': [models.Index(fields=['status', 'day'], name='shipping_bi_status_7585a8_idx')],
+                'unique_together': {('day', 'status', 'payment_method', 'courier_service')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SQLITE_FTS_SQL = [
+    "CREATE VIRTUAL TABLE shipping_billsearchdocument_fts USING fts5("
+    "document, content='shipping_billsearchdocument', content_rowid='bill_id')",
+    "CREATE TRIGGER shipping_billsearchdocument_ai AFTER INSERT ON shipping_billsearchdocument BEGIN "
+    "INSERT INTO shipping_billsearchdocument_fts(rowid, document) VALUES (new.bill_id, new.document); END",
+    "CREATE TRIGGER shipping_billsearchdocument_ad AFTER DELETE ON shipping_billsearchdocument BEGIN "
+    "INSERT INTO shipping_billsearchdocument_fts(shipping_billsearchdocument_fts, rowid, document) "
+    "VALUES ('delete', old.bill_id, old.document); END",
+    "CREATE TRIGGER shipping_billsearchdocument_au AFTER UPDATE ON shipping_billsearchdocument BEGIN "
+    "INSERT INTO shipping_billsearchdocument_fts(shipping_billsearchdocument_fts, rowid, document) "
+    "VALUES ('delete', old.bill_id, old.document); "
+    "INSERT INTO shipping_billsearchdocument_fts(rowid, document) VALUES (new.bill_id, new.document); END",
+]
+
+SQLITE_FTS_DROP_SQL = [
+    "DROP TRIGGER IF EXISTS shipping_billsearchdocument_au",
+    "DROP TRIGGER IF EXISTS shipping_billsearchdocument_ad",
+    "DROP TRIGGER IF EXISTS shipping_billsearchdocument_ai",
+    "DROP TABLE IF EXISTS shipping_billsearchdocument_fts",
+]
+
+
+def create_full_text_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute(
+            'ALTER TABLE shipping_billsearchdocument '
+            'ADD FULLTEXT INDEX shipping_billsearch_document_ft (document)'
+        )
+    elif vendor == 'sqlite':
+        for statement in SQLITE_FTS_SQL:
+            schema_editor.execute(statement)
+
+
+def drop_full_text_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute(
+            'ALTER TABLE shipping_billsearchdocument DROP INDEX shipping_billsearch_document_ft'
+        )
+    elif vendor == 'sqlite':
+        for statement in SQLITE_FTS_DROP_SQL:
+            schema_editor.execute(statement)
+
+
+def backfill_documents(apps, schema_editor):
+    Bill = apps.get_model('shipping', 'Bill')
+    BillSearchDocument = apps.get_model('shipping', 'BillSearchDocument')
+
+    rows = Bill.objects.order_by().values_list(
+        'id', 'description', 'shipment__tracking_number',
+        'customer__username', 'customer__first_name', 'customer__last_name', 'customer__email',
+    )
+    batch = []
+    for row in rows.iterator(chunk_size=1000):
+        batch.append(BillSearchDocument(
+            bill_id=row[0],
+            tracking_number=(row[2] or '').upper(),
+            document=' '.join(str(part) for part in row if part).lower(),
+        ))
+        if len(batch) >= 1000:
+            BillSearchDocument.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        BillSearchDocument.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0002_billdailyrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BillSearchDocument',
+            fields=[
+                ('bill', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='shipping.bill')),
+                ('tracking_number', models.CharField(blank=True, db_index=True, default='', max_length=50)),
+                ('document', models.TextField(blank=True, default='')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Bill Search Document',
+                'verbose_name_plural': 'Bill Search Documents',
+            },
+        ),
+        migrations.RunPython(create_full_text_index, drop_full_text_index),
+        migrations.RunPython(backfill_documents, migrations.RunPython.noop),
+    ]
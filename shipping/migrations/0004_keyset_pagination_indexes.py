@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0003_billsearchdocument'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['-created_at', '-id'], name='shipping_bill_created_id'),
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['customer', '-created_at', '-id'], name='shipping_bill_cust_created'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['-created_at', '-id'], name='shipping_invoice_created_id'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['customer', '-created_at', '-id'], name='shipping_invoice_cust_created'),
+        ),
+        migrations.AddIndex(
+            model_name='shipment',
+            index=models.Index(fields=['-created_at', '-id'], name='shipping_shipment_created_id'),
+        ),
+    ]
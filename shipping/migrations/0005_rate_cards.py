@@ -0,0 +1,109 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:26
+
+import django.core.validators
+import django.db.models.deletion
+from decimal import Decimal
+
+from django.db import migrations, models
+
+# Rates previously hardcoded in calculate_shipping_cost (web form, USD)
+DEFAULT_ZONE_RATES = {
+    'document': '5.00',
+    'parcel': '10.00',
+    'oversized': '25.00',
+    'liquid': '15.00',
+    'fragile': '20.00',
+}
+
+# Multipliers previously hardcoded in QuoteView (API, INR at 1000/kg)
+ROUTE_RATES = {
+    'india-to-usa': ('1.5', '10-15 business days'),
+    'usa-to-india': ('2.5', '7-10 business days'),
+}
+PACKAGE_MULTIPLIERS = {
+    'document': '1.0',
+    'package': '1.5',
+}
+
+
+def seed_rate_cards(apps, schema_editor):
+    RateCard = apps.get_model('shipping', 'RateCard')
+    cards = [
+        RateCard(name='Default (any package)', zone='default', package_type='', currency='USD',
+                 base_rate=Decimal('10.00'), per_kg_rate=Decimal('2.00'), priority=-1)
+    ]
+    cards += [
+        RateCard(name=f'Default {package_type}', zone='default', package_type=package_type, currency='USD',
+                 base_rate=Decimal(base_rate), per_kg_rate=Decimal('2.00'))
+        for package_type, base_rate in DEFAULT_ZONE_RATES.items()
+    ]
+    cards += [
+        RateCard(name=f'{zone} {package_type}', zone=zone, package_type=package_type, currency='INR',
+                 per_kg_rate=Decimal('1000'), multiplier=Decimal(route_multiplier) * Decimal(package_multiplier),
+                 volumetric_divisor=5000, rounding='ceil', transit_time=transit_time)
+        for zone, (route_multiplier, transit_time) in ROUTE_RATES.items()
+        for package_type, package_multiplier in PACKAGE_MULTIPLIERS.items()
+    ]
+    RateCard.objects.bulk_create(cards)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0004_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateCard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('zone', models.CharField(db_index=True, help_text='Route or zone code, e.g. india-to-usa', max_length=50)),
+                ('package_type', models.CharField(blank=True, default='', help_text='Blank matches any package type', max_length=20)),
+                ('courier_service', models.CharField(blank=True, choices=[('', '-- Select Courier --'), ('UPS', 'UPS'), ('FEDEX', 'FedEx'), ('DHL', 'DHL'), ('OTHER', 'Other')], default='', help_text='Blank matches any courier', max_length=20)),
+                ('currency', models.CharField(default='USD', max_length=3)),
+                ('base_rate', models.DecimalField(decimal_places=2, default=0, max_digits=10, validators=[django.core.validators.MinValueValidator(0)])),
+                ('per_kg_rate', models.DecimalField(decimal_places=2, default=0, max_digits=10, validators=[django.core.validators.MinValueValidator(0)])),
+                ('multiplier', models.DecimalField(decimal_places=3, default=1, max_digits=6, validators=[django.core.validators.MinValueValidator(0)])),
+                ('volumetric_divisor', models.PositiveIntegerField(blank=True, help_text='cm³ per kg for volumetric weight; blank to ignore dimensions', null=True)),
+                ('rounding', models.CharField(choices=[('cent', 'Nearest cent'), ('ceil', 'Up to whole unit')], default='cent', max_length=4)),
+                ('transit_time', models.CharField(blank=True, default='', max_length=50)),
+                ('priority', models.IntegerField(default=0)),
+                ('valid_from', models.DateTimeField(blank=True, null=True)),
+                ('valid_until', models.DateTimeField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Rate Card',
+                'verbose_name_plural': 'Rate Cards',
+                'ordering': ['zone', 'package_type', '-priority'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RateCardSurcharge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('courier_service', models.CharField(blank=True, choices=[('', '-- Select Courier --'), ('UPS', 'UPS'), ('FEDEX', 'FedEx'), ('DHL', 'DHL'), ('OTHER', 'Other')], default='', help_text='Blank applies to every courier', max_length=20)),
+                ('flat_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('percent', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('rate_card', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='surcharges', to='shipping.ratecard')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RateCardWeightBreak',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('min_weight', models.DecimalField(decimal_places=3, max_digits=8, validators=[django.core.validators.MinValueValidator(0)])),
+                ('per_kg_rate', models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(0)])),
+                ('rate_card', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weight_breaks', to='shipping.ratecard')),
+            ],
+            options={
+                'ordering': ['rate_card', 'min_weight'],
+                'unique_together': {('rate_card', 'min_weight')},
+            },
+        ),
+        migrations.RunPython(seed_rate_cards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:37
+
+from datetime import datetime
+
+from django.db import migrations, models
+
+
+def backfill_counters(apps, schema_editor):
+    SupportRequest = apps.get_model('shipping', 'SupportRequest')
+    TicketCounter = apps.get_model('shipping', 'TicketCounter')
+
+    last_values = {}
+    numbers = SupportRequest.objects.filter(ticket_number__startswith='TICKET-').values_list('ticket_number', flat=True)
+    for ticket_number in numbers.iterator(chunk_size=2000):
+        try:
+            _, day_str, value = ticket_number.split('-')
+            day = datetime.strptime(day_str, '%Y%m%d').date()
+            value = int(value)
+        except ValueError:
+            continue
+        last_values[day] = max(value, last_values.get(day, 0))
+
+    TicketCounter.objects.bulk_create(
+        [TicketCounter(day=day, last_value=value) for day, value in last_values.items()],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0005_rate_cards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketCounter',
+            fields=[
+                ('day', models.DateField(primary_key=True, serialize=False)),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Ticket Counter',
+                'verbose_name_plural': 'Ticket Counters',
+            },
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:43
+
+import hashlib
+
+from django.db import migrations, models
+
+# Frozen copies of shipping.models.ADDRESS_HASH_FIELDS and address_hash as of
+# this migration, so later changes to the model code cannot alter the backfill
+ADDRESS_HASH_FIELDS = (
+    'first_name', 'last_name', 'address_line1', 'address_line2', 'city', 'state',
+    'postal_code', 'country', 'phone_number',
+)
+
+
+def address_hash(user_id, values):
+    parts = [str(user_id or '')] + [
+        ' '.join(str(values.get(field) or '').split()).casefold() for field in ADDRESS_HASH_FIELDS
+    ]
+    return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+def backfill_address_hashes(apps, schema_editor):
+    ShippingAddress = apps.get_model('shipping', 'ShippingAddress')
+
+    batch = []
+    for address in ShippingAddress.objects.only('user_id', *ADDRESS_HASH_FIELDS).iterator(chunk_size=2000):
+        address.address_hash = address_hash(
+            address.user_id, {field: getattr(address, field) for field in ADDRESS_HASH_FIELDS}
+        )
+        batch.append(address)
+        if len(batch) >= 2000:
+            ShippingAddress.objects.bulk_update(batch, ['address_hash'])
+            batch = []
+    ShippingAddress.objects.bulk_update(batch, ['address_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0006_ticket_counter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shippingaddress',
+            name='address_hash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=40),
+        ),
+        migrations.RunPython(backfill_address_hashes, migrations.RunPython.noop),
+    ]
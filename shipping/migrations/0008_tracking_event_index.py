@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0007_shippingaddress_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trackingevent',
+            index=models.Index(fields=['shipment', 'timestamp', 'status'], name='shipping_event_shipment_ts'),
+        ),
+    ]
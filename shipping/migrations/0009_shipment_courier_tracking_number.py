@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0008_tracking_event_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shipment',
+            name='courier_tracking_number',
+            field=models.CharField(blank=True, db_index=True, default='', help_text="The courier's own tracking number, polled for tracking events", max_length=50),
+        ),
+    ]
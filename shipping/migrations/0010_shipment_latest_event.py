@@ -0,0 +1,45 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:53
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_latest_events(apps, schema_editor):
+    Shipment = apps.get_model('shipping', 'Shipment')
+    TrackingEvent = apps.get_model('shipping', 'TrackingEvent')
+
+    latest = TrackingEvent.objects.filter(shipment=OuterRef('pk')).order_by('-timestamp', '-id')
+    Shipment.objects.update(
+        latest_event=Subquery(latest.values('id')[:1]),
+        latest_location=Coalesce(Subquery(latest.values('location')[:1]), Value('')),
+        status_changed_at=Coalesce(Subquery(latest.values('timestamp')[:1]), F('created_at')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0009_shipment_courier_tracking_number'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shipment',
+            name='latest_event',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='shipping.trackingevent'),
+        ),
+        migrations.AddField(
+            model_name='shipment',
+            name='latest_location',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='shipment',
+            name='status_changed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.RunPython(backfill_latest_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:11
+
+from django.db import migrations, models
+
+
+def create_version_row(apps, schema_editor):
+    RateCardVersion = apps.get_model('shipping', 'RateCardVersion')
+    RateCardVersion.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipping', '0010_shipment_latest_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateCardVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_version_row, migrations.RunPython.noop),
+    ]
@@ -1,12 +1,15 @@
+import hashlib
 import re
 import logging
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.utils import timezone
 from django.conf import settings
 from django.core.validators import MinValueValidator, EmailValidator
 from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
+from .activity import ActivityHistory
 from .constants import BILL_STATUS_CHOICES
+from .tracking_numbers import generate_tracking_number
 User = get_user_model()
 
 # Status and choice constants
@@ -137,6 +140,26 @@ class Contact(models.Model):
         return self
 
 
+# Fields that identify an address for de-duplication
+ADDRESS_HASH_FIELDS = (
+    'first_name', 'last_name', 'address_line1', 'address_line2', 'city', 'state',
+    'postal_code', 'country', 'phone_number',
+)
+
+
+def address_hash(user_id, values):
+    """
+    Return the de-duplication key of an address owned by ``user_id``.
+
+    ``values`` maps ADDRESS_HASH_FIELDS to their values; case and runs of
+    whitespace are ignored.
+    """
+    parts = [str(user_id or '')] + [
+        ' '.join(str(values.get(field) or '').split()).casefold() for field in ADDRESS_HASH_FIELDS
+    ]
+    return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
 class ShippingAddress(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='shipping_addresses', null=True, blank=True)
     first_name = models.CharField(max_length=100, verbose_name='First Name')
@@ -149,6 +172,7 @@ class ShippingAddress(models.Model):
     postal_code = models.CharField(max_length=20, verbose_name='Postal/Zip Code')
     phone_number = models.CharField(max_length=20, verbose_name='Phone Number')
     is_default = models.BooleanField(default=False, help_text='Set as default shipping address')
+    address_hash = models.CharField(max_length=40, blank=True, default='', db_index=True, editable=False)
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}, {self.address_line1}, {self.city}, {self.state} {self.postal_code}"
@@ -160,9 +184,16 @@ class ShippingAddress(models.Model):
                 user=self.user,
                 is_default=True
             ).exclude(pk=self.pk).update(is_default=False)
+
+    def compute_address_hash(self):
+        return address_hash(self.user_id, {field: getattr(self, field) for field in ADDRESS_HASH_FIELDS})
     
     def save(self, *args, **kwargs):
         self.clean()
+        self.address_hash = self.compute_address_hash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'address_hash' not in update_fields:
+            kwargs['update_fields'] = list(update_fields) + ['address_hash']
         super().save(*args, **kwargs)
 
 class Invoice(models.Model):
@@ -279,6 +310,9 @@ class Invoice(models.Model):
             models.Index(fields=['status']),
             models.Index(fields=['due_date']),
             models.Index(fields=['customer']),
+            # Keyset pagination on (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='shipping_invoice_created_id'),
+            models.Index(fields=['customer', '-created_at', '-id'], name='shipping_invoice_cust_created'),
         ]
     
     def __str__(self):
@@ -339,11 +373,43 @@ class Shipment(models.Model):
         null=True,
         help_text='Courier service used for this shipment'
     )
+    courier_tracking_number = models.CharField(
+        max_length=50,
+        blank=True,
+        default='',
+        db_index=True,
+        help_text="The courier's own tracking number, polled for tracking events"
+    )
+    # Denormalized from the newest TrackingEvent by shipping.lifecycle
+    latest_event = models.ForeignKey(
+        'TrackingEvent', related_name='+', null=True, blank=True, on_delete=models.SET_NULL, editable=False
+    )
+    latest_location = models.CharField(max_length=255, blank=True, default='', editable=False)
+    status_changed_at = models.DateTimeField(default=timezone.now, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination on (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='shipping_shipment_created_id'),
+        ]
+
     def __str__(self):
         return f"Shipment #{self.id} - {self.tracking_number}"
+
+    def save(self, *args, **kwargs):
+        if self.tracking_number:
+            return super().save(*args, **kwargs)
+        # A number another process also issued fails the unique index; draw once more
+        for attempt in range(2):
+            self.tracking_number = generate_tracking_number()
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                if attempt or not Shipment.objects.filter(tracking_number=self.tracking_number).exists():
+                    raise
     
     def generate_invoice(self, created_by=None, request=None):
         """Generate an invoice for this shipment.
@@ -424,6 +490,12 @@ class TrackingEvent(models.Model):
     timestamp = models.DateTimeField(default=timezone.now)
     description = models.TextField()
 
+    class Meta:
+        indexes = [
+            # Latest event per shipment and ingestion de-duplication on (shipment, status, timestamp)
+            models.Index(fields=['shipment', 'timestamp', 'status'], name='shipping_event_shipment_ts'),
+        ]
+
     def __str__(self):
         return f"{self.get_status_display()} at {self.location} - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
 
@@ -518,18 +590,8 @@ class SupportRequest(models.Model):
     def save(self, *args, **kwargs):
         if not self.ticket_number:
             # Generate ticket number: TICKET-YYYYMMDD-XXXXX
-            date_str = timezone.now().strftime('%Y%m%d')
-            last_ticket = SupportRequest.objects.filter(
-                ticket_number__startswith=f'TICKET-{date_str}'
-            ).order_by('-ticket_number').first()
-            
-            if last_ticket:
-                last_num = int(last_ticket.ticket_number.split('-')[-1])
-                new_num = last_num + 1
-            else:
-                new_num = 1
-                
-            self.ticket_number = f'TICKET-{date_str}-{new_num:05d}'
+            from .ticket_numbers import next_ticket_number
+            self.ticket_number = next_ticket_number()
         
         # Update timestamps
         if self.status in ['resolved', 'closed'] and not self.resolved_at:
@@ -538,6 +600,25 @@ class SupportRequest(models.Model):
         super().save(*args, **kwargs)
 
 
+class TicketCounter(models.Model):
+    """
+    Last support ticket number handed out per day.
+
+    Advanced with atomic ``F()`` updates by ``shipping.ticket_numbers``;
+    processes reserve numbers in blocks, so the value can be ahead of the
+    highest ticket actually saved.
+    """
+    day = models.DateField(primary_key=True)
+    last_value = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Ticket Counter'
+        verbose_name_plural = 'Ticket Counters'
+
+    def __str__(self):
+        return f'{self.day}: {self.last_value}'
+
+
 class SupportRequestHistory(models.Model):
     """
     Tracks the history of changes to support requests
@@ -622,6 +703,9 @@ class Bill(models.Model):
             models.Index(fields=['status']),
             models.Index(fields=['due_date']),
             models.Index(fields=['customer']),
+            # Keyset pagination on (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='shipping_bill_created_id'),
+            models.Index(fields=['customer', '-created_at', '-id'], name='shipping_bill_cust_created'),
         ]
     
     def __str__(self):
@@ -681,3 +765,146 @@ class Bill(models.Model):
             return True
             
         return False
+
+
+class BillDailyRollup(models.Model):
+    """
+    Pre-aggregated bill counts and amounts per day.
+
+    One row per (day, status, payment_method, courier_service), where ``day``
+    is the Pacific calendar day the bill was created. Rows are maintained by
+    the Bill signal handlers in ``shipping.signals`` and can be rebuilt from
+    scratch with the ``rebuild_billing_rollups`` management command.
+    """
+    day = models.DateField(verbose_name='Day')
+    status = models.CharField(max_length=10, choices=BILL_STATUS_CHOICES)
+    payment_method = models.CharField(max_length=20, blank=True, default='')
+    courier_service = models.CharField(max_length=100, blank=True, default='')
+    bill_count = models.IntegerField(default=0, verbose_name='Bills')
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Amount')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-day', 'status']
+        verbose_name = 'Bill Daily Rollup'
+        verbose_name_plural = 'Bill Daily Rollups'
+        unique_together = ['day', 'status', 'payment_method', 'courier_service']
+        indexes = [
+            models.Index(fields=['status', 'day']),
+        ]
+
+    def __str__(self):
+        return f'{self.day} {self.status} - {self.bill_count} bill(s), ${self.amount:.2f}'
+
+
+class BillSearchDocument(models.Model):
+    """
+    Denormalized search text for a bill.
+
+    ``document`` holds the bill id, description, shipment tracking number and
+    the customer's username, name and email so bill search can hit a single
+    full-text index (MySQL FULLTEXT, or an FTS5 shadow table on SQLite)
+    instead of OR-ing ``icontains`` across joined tables. Rows are kept in
+    sync by the signal handlers in ``shipping.signals`` and can be rebuilt
+    with the ``rebuild_bill_search_index`` management command.
+    """
+    bill = models.OneToOneField(Bill, on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+    tracking_number = models.CharField(max_length=50, blank=True, default='', db_index=True)
+    document = models.TextField(blank=True, default='')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Bill Search Document'
+        verbose_name_plural = 'Bill Search Documents'
+
+    def __str__(self):
+        return f'Search document for bill #{self.bill_id}'
+
+
+class RateCard(models.Model):
+    """
+    Shipping price rule for a zone and package type.
+
+    A quote is ``(base_rate + chargeable_weight * per_kg_rate) * multiplier``
+    plus any matching surcharges, where the per-kg rate may be overridden by
+    a weight break and the chargeable weight is the larger of the actual and
+    volumetric weight when ``volumetric_divisor`` is set. Blank
+    ``package_type`` or ``courier_service`` match anything; when several
+    cards match, the most specific one with the highest priority wins.
+    Cards are loaded into the in-memory index in ``shipping.pricing``.
+    """
+    ROUNDING_CHOICES = [
+        ('cent', 'Nearest cent'),
+        ('ceil', 'Up to whole unit'),
+    ]
+
+    name = models.CharField(max_length=100)
+    zone = models.CharField(max_length=50, db_index=True, help_text='Route or zone code, e.g. india-to-usa')
+    package_type = models.CharField(max_length=20, blank=True, default='', help_text='Blank matches any package type')
+    courier_service = models.CharField(max_length=20, choices=COURIER_SERVICES, blank=True, default='',
+                                       help_text='Blank matches any courier')
+    currency = models.CharField(max_length=3, default='USD')
+    base_rate = models.DecimalField(max_digits=10, decimal_places=2, default=0, validators=[MinValueValidator(0)])
+    per_kg_rate = models.DecimalField(max_digits=10, decimal_places=2, default=0, validators=[MinValueValidator(0)])
+    multiplier = models.DecimalField(max_digits=6, decimal_places=3, default=1, validators=[MinValueValidator(0)])
+    volumetric_divisor = models.PositiveIntegerField(null=True, blank=True,
+                                                     help_text='cm³ per kg for volumetric weight; blank to ignore dimensions')
+    rounding = models.CharField(max_length=4, choices=ROUNDING_CHOICES, default='cent')
+    transit_time = models.CharField(max_length=50, blank=True, default='')
+    priority = models.IntegerField(default=0)
+    valid_from = models.DateTimeField(null=True, blank=True)
+    valid_until = models.DateTimeField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['zone', 'package_type', '-priority']
+        verbose_name = 'Rate Card'
+        verbose_name_plural = 'Rate Cards'
+
+    def __str__(self):
+        return f'{self.name} ({self.zone}/{self.package_type or "any"})'
+
+    def clean(self):
+        if self.valid_from and self.valid_until and self.valid_from >= self.valid_until:
+            raise ValidationError({'valid_until': 'Must be after the start of the validity window.'})
+
+
+class RateCardWeightBreak(models.Model):
+    """Per-kg rate that applies from ``min_weight`` kg of chargeable weight upwards."""
+    rate_card = models.ForeignKey(RateCard, related_name='weight_breaks', on_delete=models.CASCADE)
+    min_weight = models.DecimalField(max_digits=8, decimal_places=3, validators=[MinValueValidator(0)])
+    per_kg_rate = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
+
+    class Meta:
+        ordering = ['rate_card', 'min_weight']
+        unique_together = ['rate_card', 'min_weight']
+
+    def __str__(self):
+        return f'{self.rate_card.name}: from {self.min_weight} kg at {self.per_kg_rate}/kg'
+
+
+class RateCardSurcharge(models.Model):
+    """Flat and/or percentage surcharge, optionally limited to one courier."""
+    rate_card = models.ForeignKey(RateCard, related_name='surcharges', on_delete=models.CASCADE)
+    name = models.CharField(max_length=100)
+    courier_service = models.CharField(max_length=20, choices=COURIER_SERVICES, blank=True, default='',
+                                       help_text='Blank applies to every courier')
+    flat_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    percent = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f'{self.rate_card.name}: {self.name}'
+
+
+class RateCardVersion(models.Model):
+    """
+    Counter bumped on every rate card change.
+
+    A single row, shared by every process; ``shipping.pricing`` compares it
+    with the version of its in-memory index to notice changes made elsewhere.
+    """
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f'Rate cards v{self.version}'
@@ -0,0 +1,126 @@
+"""
+Keyset (cursor) pagination for the HTML list views.
+
+Pages are addressed by the (created_at, id) of the last row shown instead of
+a page number, so fetching an older page is an index range scan on
+(created_at, id) rather than an OFFSET that has to skip every earlier row.
+Links carry an opaque ``after`` (older rows) or ``before`` (newer rows)
+cursor; unknown or malformed cursors fall back to the first page.
+"""
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+AFTER_PARAM = 'after'
+BEFORE_PARAM = 'before'
+
+
+def encode_cursor(created_at, pk):
+    """Return an opaque cursor token for a row's (created_at, id)."""
+    raw = f'{created_at.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return the (created_at, id) encoded in a cursor token, or None if it is invalid."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        created_at, pk = raw.rsplit('|', 1)
+        created_at = parse_datetime(created_at)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if created_at is None:
+        return None
+    return created_at, pk
+
+
+class KeysetPage:
+    """One page of a keyset-paginated list, shaped like the parts of a Django Page the templates use."""
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        """Cursor for the page of older rows."""
+        if not self._has_next or not self.object_list:
+            return ''
+        last = self.object_list[-1]
+        return encode_cursor(last.created_at, last.pk)
+
+    @property
+    def previous_cursor(self):
+        """Cursor for the page of newer rows."""
+        if not self._has_previous or not self.object_list:
+            return ''
+        first = self.object_list[0]
+        return encode_cursor(first.created_at, first.pk)
+
+
+def keyset_paginate(queryset, page_size, after=None, before=None):
+    """
+    Return the KeysetPage of ``queryset`` (newest first) after or before a cursor.
+
+    One query fetches ``page_size + 1`` rows; the extra row only tells
+    whether another page exists in that direction.
+    """
+    after = decode_cursor(after)
+    before = decode_cursor(before) if after is None else None
+
+    if before is not None:
+        created_at, pk = before
+        rows = list(
+            queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk))
+            .order_by('created_at', 'pk')[:page_size + 1]
+        )
+        has_previous = len(rows) > page_size
+        rows = rows[:page_size]
+        rows.reverse()
+        return KeysetPage(rows, has_next=True, has_previous=has_previous)
+
+    queryset = queryset.order_by('-created_at', '-pk')
+    if after is not None:
+        created_at, pk = after
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+    rows = list(queryset[:page_size + 1])
+    return KeysetPage(rows[:page_size], has_next=len(rows) > page_size, has_previous=after is not None)
+
+
+class KeysetPaginationMixin:
+    """
+    ListView mixin that replaces OFFSET paging with keyset pagination on (created_at, id).
+
+    The context keeps the usual ``page_obj`` and ``is_paginated`` names;
+    ``paginator`` is None because no total count is computed.
+    """
+
+    def paginate_queryset(self, queryset, page_size):
+        page = keyset_paginate(
+            queryset,
+            page_size,
+            after=self.request.GET.get(AFTER_PARAM),
+            before=self.request.GET.get(BEFORE_PARAM),
+        )
+        return None, page, page.object_list, page.has_other_pages()
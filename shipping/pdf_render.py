@@ -0,0 +1,160 @@
+"""
+Background PDF rendering with a content-addressed disk cache.
+
+xhtml2pdf is CPU-bound, so documents are rendered by a small local process
+pool instead of in the request thread. Each PDF is stored under
+``PDF_CACHE_DIR`` as ``<kind>_<id>_<digest>.pdf``, where the digest hashes
+the rendered HTML, the stylesheet and ``PDF_TEMPLATE_VERSION``; any change
+to the object, its related data or the template yields a new file, and repeat
+downloads are served straight from disk. Saving or deleting a bill or
+invoice removes its cached files (see ``shipping.signals``).
+
+Settings:
+    PDF_CACHE_DIR: where rendered PDFs are kept (default MEDIA_ROOT/pdf_cache)
+    PDF_RENDER_WORKERS: worker processes; 0 renders in-process (default 2)
+    PDF_RENDER_TIMEOUT: seconds a request waits for a render (default 10)
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import partial
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Bump when the PDF templates or rendering options change
+PDF_TEMPLATE_VERSION = '1'
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+class PdfRenderError(Exception):
+    """Raised when xhtml2pdf reports errors for a document."""
+
+
+def cache_dir():
+    return Path(getattr(settings, 'PDF_CACHE_DIR', Path(settings.MEDIA_ROOT) / 'pdf_cache'))
+
+
+def pdf_digest(html, default_css=''):
+    """Return the content address of a document."""
+    digest = hashlib.sha256()
+    for part in (PDF_TEMPLATE_VERSION, default_css, html):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def cache_path(kind, obj_id, digest):
+    return cache_dir() / f'{kind}_{obj_id}_{digest}.pdf'
+
+
+def render_html_to_pdf(html, default_css, dest):
+    """
+    Render HTML to a PDF file at ``dest``.
+
+    Runs in a worker process, or in the request thread with
+    ``PDF_RENDER_WORKERS = 0``. The file is written to a temporary file of
+    its own, unique per call, and renamed so readers never see a partial
+    PDF and concurrent renders of one document never share a file.
+    """
+    from xhtml2pdf import pisa
+
+    dest = Path(dest)
+    with tempfile.NamedTemporaryFile(dir=dest.parent, prefix=f'{dest.name}.', suffix='.tmp',
+                                     delete=False) as output:
+        tmp_path = output.name
+        try:
+            status = pisa.CreatePDF(
+                html,
+                dest=output,
+                encoding='UTF-8',
+                show_error_as_pdf=False,
+                default_css=default_css or None,
+            )
+        except BaseException:
+            output.close()
+            os.remove(tmp_path)
+            raise
+    if status.err:
+        os.remove(tmp_path)
+        raise PdfRenderError(f'xhtml2pdf reported {status.err} error(s)')
+    os.replace(tmp_path, dest)
+    return str(dest)
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=getattr(settings, 'PDF_RENDER_WORKERS', 2))
+        return _executor
+
+
+def submit_render(html, default_css, dest):
+    """Queue a render, reusing the in-flight job for the same file."""
+    key = str(dest)
+    executor = get_executor()
+    with _pending_lock:
+        future = _pending.get(key)
+        if future is not None and not future.done():
+            return future
+        future = executor.submit(render_html_to_pdf, html, default_css, key)
+        _pending[key] = future
+    # Outside the lock: an already finished future runs the callback right away
+    future.add_done_callback(partial(_forget_render, key))
+    return future
+
+
+def _forget_render(key, future):
+    with _pending_lock:
+        if _pending.get(key) is future:
+            del _pending[key]
+
+
+def get_or_render_pdf(kind, obj_id, html, default_css='', timeout=None):
+    """
+    Return the path of the cached PDF for ``html``, rendering it if needed.
+
+    Returns None when the render is still running after ``timeout`` seconds;
+    the job keeps going in the background and a later call will find the
+    file. Raises PdfRenderError if the document cannot be rendered.
+    """
+    dest = cache_path(kind, obj_id, pdf_digest(html, default_css))
+    if dest.exists():
+        return dest
+    dest.parent.mkdir(parents=True, exist_ok=True)
+
+    if getattr(settings, 'PDF_RENDER_WORKERS', 2) == 0:
+        render_html_to_pdf(html, default_css, dest)
+        return dest
+
+    if timeout is None:
+        timeout = getattr(settings, 'PDF_RENDER_TIMEOUT', 10)
+    future = submit_render(html, default_css, dest)
+    try:
+        future.result(timeout=timeout)
+    except FutureTimeoutError:
+        logger.info(f'PDF render for {kind} {obj_id} still running after {timeout}s')
+        return None
+    return dest
+
+
+def invalidate_pdfs(kind, obj_id):
+    """Delete every cached PDF of an object."""
+    directory = cache_dir()
+    if not directory.is_dir():
+        return
+    for path in directory.glob(f'{kind}_{obj_id}_*.pdf'):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
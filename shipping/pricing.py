@@ -0,0 +1,416 @@
+"""
+Shipping price engine backed by RateCard rows.
+
+Active rate cards, their weight breaks and surcharges are loaded into an
+immutable in-memory index keyed by (zone, package_type); a quote is a dict
+lookup plus Decimal arithmetic with no database queries. Saving or deleting
+a rate card bumps the ``RateCardVersion`` row (see ``shipping.signals``).
+The process that saved it rebuilds its index on the next quote; every
+other process reads the version at most once per
+RATE_CARD_VERSION_CHECK_INTERVAL seconds and rebuilds when it moved, so
+quotes between two checks do no I/O at all.
+
+Quotes are memoized in a bounded LRU keyed on the normalized inputs. The
+LRU is emptied whenever the index is rebuilt or a rate card's validity
+window opens or closes, so a cached quote is always the one ``price()``
+would return.
+
+Settings:
+    QUOTE_CACHE_SIZE: quotes kept per process (default 4096; 0 disables)
+    RATE_CARD_VERSION_CHECK_INTERVAL: seconds between rate card version
+        checks (default 5), i.e. how long other processes may quote old prices
+"""
+import math
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from decimal import Decimal, ROUND_CEILING, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import RateCard, RateCardVersion
+
+# Zone used by the web shipment form
+DEFAULT_ZONE = 'default'
+
+# Primary key of the single RateCardVersion row
+VERSION_ROW = 1
+
+LB_TO_KG = Decimal('0.453592')
+CENT = Decimal('0.01')
+
+Rate = namedtuple('Rate', [
+    'id', 'name', 'zone', 'package_type', 'courier_service', 'currency', 'base_rate', 'per_kg_rate',
+    'multiplier', 'volumetric_divisor', 'rounding', 'transit_time', 'priority', 'valid_from',
+    'valid_until', 'weight_breaks', 'surcharges',
+])
+# weight_breaks: tuple of (min_weight, per_kg_rate) sorted by descending min_weight
+# surcharges: tuple of (name, courier_service, flat_amount, percent)
+
+Quote = namedtuple('Quote', [
+    'amount', 'currency', 'chargeable_weight', 'volumetric_weight', 'rate_card_id', 'transit_time',
+])
+
+
+class NoRateError(ValueError):
+    """Raised when no active rate card covers a shipment."""
+
+
+def to_decimal(value):
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def whole_amount(amount):
+    """Return a quoted amount as whole currency units, rounded up so the API never quotes below the price."""
+    return int(amount.to_integral_value(rounding=ROUND_CEILING))
+
+
+class RateIndex:
+    """Immutable lookup of rate cards by (zone, package_type)."""
+
+    def __init__(self, rates, version=None):
+        index = {}
+        for rate in rates:
+            index.setdefault((rate.zone, rate.package_type), []).append(rate)
+        # Most specific (courier-bound) and highest priority first
+        self._index = {
+            key: tuple(sorted(items, key=lambda rate: (not rate.courier_service, -rate.priority)))
+            for key, items in index.items()
+        }
+        self.version = version
+        self._boundaries = sorted({
+            moment for rate in rates for moment in (rate.valid_from, rate.valid_until) if moment
+        })
+
+    def next_change(self, at):
+        """Return the first time after ``at`` when a rate card becomes valid or expires, or None."""
+        for moment in self._boundaries:
+            if moment > at:
+                return moment
+        return None
+
+    def __len__(self):
+        return sum(len(rates) for rates in self._index.values())
+
+    def find(self, zone, package_type, courier_service='', at=None):
+        """Return the rate card that applies, or raise NoRateError."""
+        at = at or timezone.now()
+        for key in ((zone, package_type), (zone, '')):
+            for rate in self._index.get(key, ()):
+                if rate.courier_service and rate.courier_service != courier_service:
+                    continue
+                if rate.valid_from and at < rate.valid_from:
+                    continue
+                if rate.valid_until and at >= rate.valid_until:
+                    continue
+                return rate
+        raise NoRateError(f'No rate card for zone "{zone}" and package type "{package_type}"')
+
+    def quote(self, zone, package_type, weight, dimensions=None, courier_service='', weight_unit='kg', at=None):
+        """
+        Price a shipment.
+
+        ``weight`` is in ``weight_unit`` ('kg' or 'lb'); ``dimensions`` is an
+        optional (length, width, height) in cm.
+        """
+        rate = self.find(zone, package_type, courier_service or '', at)
+        return price(rate, weight, dimensions, courier_service or '', weight_unit)
+
+
+def price(rate, weight, dimensions=None, courier_service='', weight_unit='kg'):
+    """Apply a rate card's arithmetic to one shipment."""
+    weight = to_decimal(weight)
+    if weight_unit == 'lb':
+        weight *= LB_TO_KG
+
+    volumetric_weight = Decimal('0')
+    if rate.volumetric_divisor and dimensions:
+        length, width, height = (to_decimal(value) for value in dimensions)
+        volumetric_weight = length * width * height / rate.volumetric_divisor
+    chargeable_weight = max(weight, volumetric_weight)
+
+    per_kg_rate = rate.per_kg_rate
+    for min_weight, break_rate in rate.weight_breaks:
+        if chargeable_weight >= min_weight:
+            per_kg_rate = break_rate
+            break
+
+    amount = (rate.base_rate + chargeable_weight * per_kg_rate) * rate.multiplier
+    surcharge_total = Decimal('0')
+    for _, surcharge_courier, flat_amount, percent in rate.surcharges:
+        if surcharge_courier and surcharge_courier != courier_service:
+            continue
+        surcharge_total += flat_amount + amount * percent / 100
+    amount += surcharge_total
+
+    if rate.rounding == 'ceil':
+        amount = Decimal(math.ceil(amount))
+    else:
+        amount = amount.quantize(CENT, rounding=ROUND_HALF_UP)
+
+    return Quote(
+        amount=amount,
+        currency=rate.currency,
+        chargeable_weight=chargeable_weight,
+        volumetric_weight=volumetric_weight,
+        rate_card_id=rate.id,
+        transit_time=rate.transit_time,
+    )
+
+
+def load_rate_index(version=None):
+    """Build a RateIndex from the active rate cards."""
+    cards = RateCard.objects.filter(is_active=True).prefetch_related('weight_breaks', 'surcharges')
+    rates = []
+    for card in cards:
+        rates.append(Rate(
+            id=card.id,
+            name=card.name,
+            zone=card.zone,
+            package_type=card.package_type,
+            courier_service=card.courier_service or '',
+            currency=card.currency,
+            base_rate=card.base_rate,
+            per_kg_rate=card.per_kg_rate,
+            multiplier=card.multiplier,
+            volumetric_divisor=card.volumetric_divisor,
+            rounding=card.rounding,
+            transit_time=card.transit_time,
+            priority=card.priority,
+            valid_from=card.valid_from,
+            valid_until=card.valid_until,
+            weight_breaks=tuple(sorted(
+                ((item.min_weight, item.per_kg_rate) for item in card.weight_breaks.all()),
+                reverse=True,
+            )),
+            surcharges=tuple(
+                (item.name, item.courier_service or '', item.flat_amount, item.percent)
+                for item in card.surcharges.all()
+            ),
+        ))
+    return RateIndex(rates, version)
+
+
+def version_check_interval():
+    return getattr(settings, 'RATE_CARD_VERSION_CHECK_INTERVAL', 5)
+
+
+def current_version():
+    return RateCardVersion.objects.filter(pk=VERSION_ROW).values_list('version', flat=True).first() or 0
+
+
+_rate_index = None
+# time.monotonic() of the last version check
+_rate_index_checked = 0.0
+_rate_index_lock = threading.Lock()
+
+
+def get_rate_index():
+    """Return the current RateIndex, rebuilding it when the rate cards changed."""
+    global _rate_index, _rate_index_checked
+    index = _rate_index
+    if index is not None and time.monotonic() - _rate_index_checked < version_check_interval():
+        return index
+    with _rate_index_lock:
+        if _rate_index is None or time.monotonic() - _rate_index_checked >= version_check_interval():
+            # Read before the cards, so a change in between only causes one more rebuild
+            version = current_version()
+            if _rate_index is None or _rate_index.version != version:
+                _rate_index = load_rate_index(version)
+            _rate_index_checked = time.monotonic()
+        return _rate_index
+
+
+def invalidate_rate_index():
+    """Rebuild this process's index on the next quote and every other one's at its next check."""
+    global _rate_index
+    if not RateCardVersion.objects.filter(pk=VERSION_ROW).update(version=F('version') + 1):
+        RateCardVersion.objects.get_or_create(pk=VERSION_ROW, defaults={'version': 1})
+    with _rate_index_lock:
+        _rate_index = None
+
+
+class QuoteCache:
+    """Bounded LRU of quotes for one RateIndex, with hit/miss counters."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._quotes = OrderedDict()
+        self._index = None
+        self._expires_at = None
+        self._lock = threading.Lock()
+
+    def _sync(self, index, now):
+        if index is not self._index or (self._expires_at is not None and now >= self._expires_at):
+            self._quotes.clear()
+            self._index = index
+            self._expires_at = index.next_change(now)
+
+    def get(self, index, key, now):
+        """Return the cached quote for ``key`` or None."""
+        with self._lock:
+            self._sync(index, now)
+            result = self._quotes.get(key)
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._quotes.move_to_end(key)
+            return result
+
+    def put(self, index, key, result, now):
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._sync(index, now)
+            self._quotes[key] = result
+            self._quotes.move_to_end(key)
+            while len(self._quotes) > self.maxsize:
+                self._quotes.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._quotes.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'size': len(self._quotes),
+                'maxsize': self.maxsize,
+            }
+
+
+_quote_cache = None
+
+
+def get_quote_cache():
+    global _quote_cache
+    with _rate_index_lock:
+        if _quote_cache is None:
+            _quote_cache = QuoteCache(getattr(settings, 'QUOTE_CACHE_SIZE', 4096))
+        return _quote_cache
+
+
+def quote_key(zone, package_type, weight, dimensions=None, courier_service='', weight_unit='kg'):
+    """
+    Normalize quote inputs into a cache key.
+
+    Numbers are compared by value (2, 2.0 and '2.00' are the same weight) and
+    dimensions are sorted, since only their product is priced.
+    """
+    dims = tuple(sorted(to_decimal(value).normalize() for value in dimensions)) if dimensions else ()
+    return (zone, package_type, courier_service or '', weight_unit, to_decimal(weight).normalize(), dims)
+
+
+def quote(zone, package_type, weight, dimensions=None, courier_service='', weight_unit='kg', at=None):
+    """Price a shipment with the current rate cards. Raises NoRateError if none applies."""
+    index = get_rate_index()
+    if at is not None:
+        return index.quote(zone, package_type, weight, dimensions, courier_service, weight_unit, at)
+
+    now = timezone.now()
+    quote_cache = get_quote_cache()
+    key = quote_key(zone, package_type, weight, dimensions, courier_service, weight_unit)
+    result = quote_cache.get(index, key, now)
+    if result is None:
+        result = index.quote(zone, package_type, weight, dimensions, courier_service, weight_unit, now)
+        quote_cache.put(index, key, result, now)
+    return result
+
+
+def quote_cache_stats():
+    return get_quote_cache().stats()
+
+
+def quote_batch(packages, at=None):
+    """
+    Price many shipments at once.
+
+    ``packages`` is a sequence of dicts holding the keyword arguments of
+    ``quote()`` (zone, package_type, weight and optionally dimensions,
+    courier_service and weight_unit). Rows are grouped by the rate card that
+    applies and each group is priced with NumPy array arithmetic. Returns a
+    list in input order holding a Quote, or the NoRateError, for each row.
+    """
+    index = get_rate_index()
+    at = at or timezone.now()
+    results = [None] * len(packages)
+    rates = {}
+    groups = {}
+    for position, package in enumerate(packages):
+        key = (package['zone'], package['package_type'], package.get('courier_service') or '')
+        if key not in rates:
+            try:
+                rates[key] = index.find(*key, at)
+            except NoRateError as e:
+                rates[key] = e
+        rate = rates[key]
+        if isinstance(rate, NoRateError):
+            results[position] = rate
+        else:
+            groups.setdefault(rate.id, (rate, []))[1].append(position)
+
+    for rate, positions in groups.values():
+        quotes = price_many(rate, [packages[position] for position in positions])
+        for position, row_quote in zip(positions, quotes):
+            results[position] = row_quote
+    return results
+
+
+def price_many(rate, packages):
+    """Vectorized ``price()`` for packages sharing one rate card."""
+    import numpy as np
+
+    weight = np.array([float(package['weight']) for package in packages])
+    in_pounds = np.array([package.get('weight_unit', 'kg') == 'lb' for package in packages])
+    weight = np.where(in_pounds, weight * float(LB_TO_KG), weight)
+
+    volumetric_weight = np.zeros_like(weight)
+    if rate.volumetric_divisor:
+        dimensions = np.array([package.get('dimensions') or (0, 0, 0) for package in packages], dtype=float)
+        volumetric_weight = dimensions.prod(axis=1) / rate.volumetric_divisor
+    chargeable_weight = np.maximum(weight, volumetric_weight)
+
+    per_kg_rate = np.full_like(chargeable_weight, float(rate.per_kg_rate))
+    # Breaks are stored heaviest first; apply them lightest first so the heaviest match wins
+    for min_weight, break_rate in reversed(rate.weight_breaks):
+        per_kg_rate = np.where(chargeable_weight >= float(min_weight), float(break_rate), per_kg_rate)
+
+    amount = (float(rate.base_rate) + chargeable_weight * per_kg_rate) * float(rate.multiplier)
+    if rate.surcharges:
+        couriers = np.array([package.get('courier_service') or '' for package in packages], dtype=object)
+        surcharge_total = np.zeros_like(amount)
+        for _, surcharge_courier, flat_amount, percent in rate.surcharges:
+            applies = couriers == surcharge_courier if surcharge_courier else np.ones(len(packages), dtype=bool)
+            surcharge_total += np.where(applies, float(flat_amount) + amount * float(percent) / 100, 0.0)
+        amount = amount + surcharge_total
+
+    # Rounding to 4 places first drops binary float noise, so results match the Decimal path
+    if rate.rounding == 'ceil':
+        amounts = [Decimal(int(value)) for value in np.ceil(np.round(amount, 4)).tolist()]
+    else:
+        cents = np.floor(np.round(amount * 100, 4) + 0.5)
+        amounts = [Decimal(int(value)).scaleb(-2) for value in cents.tolist()]
+
+    return [
+        Quote(
+            amount=row_amount,
+            currency=rate.currency,
+            chargeable_weight=to_decimal(round(row_chargeable, 6)),
+            volumetric_weight=to_decimal(round(row_volumetric, 6)),
+            rate_card_id=rate.id,
+            transit_time=rate.transit_time,
+        )
+        for row_amount, row_chargeable, row_volumetric
+        in zip(amounts, chargeable_weight.tolist(), volumetric_weight.tolist())
+    ]
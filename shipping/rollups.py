@@ -0,0 +1,184 @@
+"""
+Maintenance of the BillDailyRollup table.
+
+The rollup stores bill counts and amounts per (day, status, payment_method,
+courier_service), so dashboards can read O(days) rows instead of scanning
+every bill. Individual saves and deletes are applied as deltas by the signal
+handlers in ``shipping.signals``; bulk ``QuerySet.update()`` calls bypass
+signals and must go through ``update_bills`` instead.
+"""
+from collections import defaultdict
+from datetime import datetime, time as datetime_time, timedelta
+from decimal import Decimal
+
+import pytz
+from django.db import IntegrityError, transaction
+from django.db.models import DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Bill, BillDailyRollup
+
+# Rollup days are Pacific calendar days (handles both PST and PDT)
+PACIFIC_TZ = pytz.timezone('America/Los_Angeles')
+
+REBUILD_CHUNK_SIZE = 2000
+
+
+def pacific_day(value):
+    """Return the Pacific calendar day of an aware datetime."""
+    return value.astimezone(PACIFIC_TZ).date()
+
+
+def day_bounds(day):
+    """Return the [start, end) datetimes of a Pacific calendar day."""
+    start = PACIFIC_TZ.localize(datetime.combine(day, datetime_time.min))
+    end = PACIFIC_TZ.localize(datetime.combine(day + timedelta(days=1), datetime_time.min))
+    return start, end
+
+
+def rollup_key(created_at, status, payment_method, courier_service):
+    """Return the rollup row key for a bill's field values."""
+    return (
+        pacific_day(created_at),
+        status,
+        payment_method or '',
+        courier_service or '',
+    )
+
+
+def bill_rollup_key(bill):
+    return rollup_key(bill.created_at, bill.status, bill.payment_method, bill.courier_service)
+
+
+def apply_delta(key, count, amount):
+    """Add ``count`` bills and ``amount`` to the rollup row for ``key``."""
+    if not count and not amount:
+        return
+    day, status, payment_method, courier_service = key
+    lookup = {
+        'day': day,
+        'status': status,
+        'payment_method': payment_method,
+        'courier_service': courier_service,
+    }
+    with transaction.atomic():
+        updated = BillDailyRollup.objects.filter(**lookup).update(
+            bill_count=F('bill_count') + count,
+            amount=F('amount') + amount,
+        )
+        if updated:
+            return
+        try:
+            with transaction.atomic():
+                BillDailyRollup.objects.create(bill_count=count, amount=amount, **lookup)
+        except IntegrityError:
+            # Another transaction created the row first
+            BillDailyRollup.objects.filter(**lookup).update(
+                bill_count=F('bill_count') + count,
+                amount=F('amount') + amount,
+            )
+
+
+def rebuild_bill_rollups(days=None, since=None, until=None):
+    """
+    Recompute rollup rows from the Bill table.
+
+    Args:
+        days: Optional iterable of Pacific days to rebuild.
+        since: Optional first day (inclusive) of a range to rebuild.
+        until: Optional last day (inclusive) of a range to rebuild.
+
+    With no arguments every rollup row is rebuilt. Returns the number of
+    rollup rows written.
+    """
+    bills = Bill.objects.order_by()
+    rollups = BillDailyRollup.objects.all()
+
+    if days is not None:
+        days = sorted(set(days))
+        if not days:
+            return 0
+        day_filter = Q()
+        for day in days:
+            start, end = day_bounds(day)
+            day_filter |= Q(created_at__gte=start, created_at__lt=end)
+        bills = bills.filter(day_filter)
+        rollups = rollups.filter(day__in=days)
+    if since is not None:
+        bills = bills.filter(created_at__gte=day_bounds(since)[0])
+        rollups = rollups.filter(day__gte=since)
+    if until is not None:
+        bills = bills.filter(created_at__lt=day_bounds(until)[1])
+        rollups = rollups.filter(day__lte=until)
+
+    totals = defaultdict(lambda: [0, Decimal('0')])
+    rows = bills.values_list('created_at', 'status', 'payment_method', 'courier_service', 'amount')
+    for created_at, status, payment_method, courier_service, amount in rows.iterator(chunk_size=REBUILD_CHUNK_SIZE):
+        entry = totals[rollup_key(created_at, status, payment_method, courier_service)]
+        entry[0] += 1
+        entry[1] += amount or 0
+
+    with transaction.atomic():
+        rollups.delete()
+        BillDailyRollup.objects.bulk_create(
+            [
+                BillDailyRollup(
+                    day=day,
+                    status=status,
+                    payment_method=payment_method,
+                    courier_service=courier_service,
+                    bill_count=count,
+                    amount=amount,
+                )
+                for (day, status, payment_method, courier_service), (count, amount) in totals.items()
+            ],
+            batch_size=REBUILD_CHUNK_SIZE,
+        )
+    return len(totals)
+
+
+def update_bills(queryset, **values):
+    """
+    ``QuerySet.update()`` for bills that keeps the rollup table in sync.
+
+    The days touched by the update are rebuilt in the same transaction.
+    Returns the number of bills updated.
+    """
+    with transaction.atomic():
+        pks = list(queryset.values_list('pk', flat=True))
+        if not pks:
+            return 0
+        updated = Bill.objects.filter(pk__in=pks).update(**values)
+        created = Bill.objects.filter(pk__in=pks).values_list('created_at', flat=True)
+        rebuild_bill_rollups(days={pacific_day(value) for value in created})
+    return updated
+
+
+def _money_sum(condition=None):
+    return Coalesce(
+        Sum('amount', filter=condition),
+        Value(Decimal('0')),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+
+
+def _count_sum(condition=None):
+    return Coalesce(Sum('bill_count', filter=condition), Value(0))
+
+
+def rollup_totals(today):
+    """
+    Read the dashboard totals from the rollup table in a single query.
+    """
+    yesterday = today - timedelta(days=1)
+    unpaid = Q(status__in=['PENDING', 'OVERDUE'])
+    return BillDailyRollup.objects.aggregate(
+        total_bills=_count_sum(),
+        total_revenue=_money_sum(),
+        todays_orders=_count_sum(Q(day=today)),
+        todays_revenue=_money_sum(Q(day=today)),
+        yesterdays_revenue=_money_sum(Q(day=yesterday)),
+        pending_bills=_count_sum(Q(status='PENDING')),
+        pending_amount=_money_sum(Q(status='PENDING')),
+        unpaid_bills=_count_sum(unpaid),
+    )
@@ -0,0 +1,124 @@
+"""
+Bill search backed by the BillSearchDocument table.
+
+Each bill has one denormalized search document. On MySQL the document column
+carries a FULLTEXT index and is queried with ``MATCH ... AGAINST`` in boolean
+mode; on SQLite (development) an FTS5 table mirrors the documents through
+triggers. Other backends fall back to ``icontains`` on the single document
+column. Bill ids and shipment tracking numbers are routed to exact,
+index-backed lookups before any full-text query runs.
+"""
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Bill, BillSearchDocument
+
+DOCUMENT_TABLE = 'shipping_billsearchdocument'
+FTS_TABLE = 'shipping_billsearchdocument_fts'
+MYSQL_FULLTEXT_INDEX = 'shipping_billsearch_document_ft'
+
+INDEX_CHUNK_SIZE = 1000
+
+# Search terms beyond this many words are ignored
+MAX_SEARCH_TOKENS = 8
+
+BILL_ID_RE = re.compile(r'^#?(\d{1,18})$')
+TRACKING_NUMBER_RE = re.compile(r'^[A-Z0-9]+(-[A-Z0-9]+)+$', re.IGNORECASE)
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def build_document(bill_id, description, tracking_number, username, first_name, last_name, email):
+    """Return the search text for a bill's field values."""
+    parts = [str(bill_id), description, tracking_number, username, first_name, last_name, email]
+    return ' '.join(part for part in parts if part).lower()
+
+
+def index_bills(queryset=None):
+    """
+    Create or refresh the search documents for the given bills.
+
+    Returns the number of documents written.
+    """
+    bills = queryset if queryset is not None else Bill.objects.all()
+    rows = bills.order_by().values_list(
+        'id', 'description', 'shipment__tracking_number',
+        'customer__username', 'customer__first_name', 'customer__last_name', 'customer__email',
+    )
+
+    written = 0
+    batch = []
+    for row in rows.iterator(chunk_size=INDEX_CHUNK_SIZE):
+        batch.append(BillSearchDocument(
+            bill_id=row[0],
+            tracking_number=(row[2] or '').upper(),
+            document=build_document(*row),
+        ))
+        if len(batch) >= INDEX_CHUNK_SIZE:
+            written += _write_documents(batch)
+            batch = []
+    if batch:
+        written += _write_documents(batch)
+    return written
+
+
+def _write_documents(documents):
+    BillSearchDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=['bill'],
+        update_fields=['tracking_number', 'document', 'updated_at'],
+    )
+    return len(documents)
+
+
+def search_tokens(term):
+    """Split a search term into lowercase words."""
+    return TOKEN_RE.findall(term.lower())[:MAX_SEARCH_TOKENS]
+
+
+def _full_text_ids(tokens):
+    """Subquery selecting the ids of bills whose document contains every token as a prefix."""
+    if connection.vendor == 'mysql':
+        query = ' '.join(f'+{token}*' for token in tokens)
+        return RawSQL(
+            f'SELECT bill_id FROM {DOCUMENT_TABLE} WHERE MATCH(document) AGAINST (%s IN BOOLEAN MODE)',
+            [query],
+        )
+    if connection.vendor == 'sqlite':
+        query = ' '.join(f'"{token}"*' for token in tokens)
+        return RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [query])
+
+    documents = BillSearchDocument.objects.all()
+    for token in tokens:
+        documents = documents.filter(document__icontains=token)
+    return documents.values('bill_id')
+
+
+def search_bills(queryset, term):
+    """
+    Filter a Bill queryset by a free-text search term.
+
+    A bill id (optionally prefixed with ``#``) or a tracking number that
+    matches a bill returns just that bill; anything else is matched word by
+    word against the search documents.
+    """
+    term = (term or '').strip()
+    if not term:
+        return queryset
+
+    match = BILL_ID_RE.match(term)
+    if match:
+        exact = queryset.filter(pk=int(match.group(1)))
+        if exact.exists():
+            return exact
+    elif TRACKING_NUMBER_RE.match(term):
+        exact = queryset.filter(search_document__tracking_number=term.upper())
+        if exact.exists():
+            return exact
+
+    tokens = search_tokens(term)
+    if not tokens:
+        return queryset.none()
+    return queryset.filter(pk__in=_full_text_ids(tokens))
@@ -0,0 +1,278 @@
+"""
+Shipment creation shared by the web form, the API serializer, the batch
+API endpoint and manifest imports (``shipping.manifests``).
+
+``create_shipments`` writes a batch of shipments together with their
+addresses, items, initial tracking event (also set as the shipment's
+``latest_event``, see ``shipping.lifecycle``), invoice and activity log
+entries using one bulk query per table, so the number of queries does not grow
+with the number of items. The shipments come back with their addresses,
+items, events and invoice already attached, so rendering or serializing
+them takes no further queries.
+
+``bulk_create`` skips ``save()`` and signals, so the work of
+``Shipment.save`` (tracking number), ``ShippingAddress.save`` (address
+hash) and ``Invoice.save`` (totals) is done here. On backends that cannot
+return primary keys from a bulk insert (MySQL), address ids, shipment ids,
+invoice ids and the items and events are read back with one query each.
+"""
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, transaction
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
+
+from . import pricing
+from .activity import ActivityHistory
+from .models import Invoice, Shipment, ShipmentItem, ShippingAddress, TrackingEvent
+from .tracking_numbers import generate_tracking_number
+
+logger = logging.getLogger(__name__)
+
+SHIPMENT_FIELDS = (
+    'package_type', 'weight', 'length', 'width', 'height', 'shipping_date', 'delivery_date',
+    'courier_service', 'courier_tracking_number', 'tracking_number', 'shipping_cost', 'status',
+)
+
+INITIAL_EVENT = {
+    'status': 'pending',
+    'location': 'Processing Center',
+    'description': 'Shipment created and awaiting processing',
+}
+
+INVOICE_TERM_DAYS = 15
+
+BULK_BATCH_SIZE = 500
+
+
+def _resolve_addresses(specs, owner):
+    """
+    Return (sender, recipient) pairs, resolving the addresses given as dicts.
+
+    A dict address that matches an existing ShippingAddress of the same owner
+    (see ``models.address_hash``) reuses that row, and identical dicts in the
+    batch share one new row, so a manifest that repeats the same sender
+    creates it once. The lookup is one indexed query for the whole batch.
+    """
+    pairs = []
+    new_addresses = {}
+    default_addresses = []
+    for spec in specs:
+        pair = []
+        for role, user in (('sender_address', owner), ('recipient_address', None)):
+            address = spec[role]
+            if isinstance(address, dict):
+                address = ShippingAddress(user=user, **address)
+                if address.is_default:
+                    # ShippingAddress.save clears the user's previous default address
+                    default_addresses.append(address)
+                else:
+                    address.address_hash = address.compute_address_hash()
+                    address = new_addresses.setdefault(address.address_hash, address)
+            pair.append(address)
+        pairs.append(pair)
+
+    for address in default_addresses:
+        address.save(force_insert=True)
+    if not new_addresses:
+        return pairs
+
+    existing = {}
+    for address in ShippingAddress.objects.filter(address_hash__in=list(new_addresses)).order_by('-id'):
+        existing[address.address_hash] = address
+    created = [address for key, address in new_addresses.items() if key not in existing]
+    ShippingAddress.objects.bulk_create(created, batch_size=BULK_BATCH_SIZE)
+    if created and created[0].pk is None:
+        ids = dict(ShippingAddress.objects.filter(
+            address_hash__in=[address.address_hash for address in created]
+        ).values_list('address_hash', 'id'))
+        for address in created:
+            address.pk = ids[address.address_hash]
+
+    # Swap the unsaved duplicates for the rows already in the database
+    replacements = {id(new_addresses[key]): address for key, address in existing.items()}
+    return [[replacements.get(id(address), address) for address in pair] for pair in pairs]
+
+
+def calculate_shipping_cost(package_type, weight, courier_service='', dimensions=None):
+    """
+    Calculate shipping cost based on package type and weight.
+    Rates come from the RateCard entries of the default zone (see shipping.pricing).
+    """
+    return pricing.quote(pricing.DEFAULT_ZONE, package_type, weight, dimensions=dimensions,
+                         courier_service=courier_service).amount
+
+
+def _cache_related(instance, name, objects):
+    """Store ``objects`` as the prefetched result of ``instance.<name>.all()``."""
+    queryset = getattr(instance, name).all()
+    queryset._result_cache = list(objects)
+    queryset._prefetch_done = True
+    if not hasattr(instance, '_prefetched_objects_cache'):
+        instance._prefetched_objects_cache = {}
+    instance._prefetched_objects_cache[name] = queryset
+
+
+def _activity(user, action, obj, content_type, request):
+    activity = ActivityHistory(user=user, action=action, content_type=content_type, object_id=obj.pk)
+    if request is not None:
+        activity.ip_address = request.META.get('REMOTE_ADDR')
+        activity.user_agent = request.META.get('HTTP_USER_AGENT', '')[:500]
+    return activity
+
+
+def _build_invoice(shipment, created_by, today):
+    customer = shipment.sender_address.user or created_by
+    if customer is None or not shipment.shipping_cost:
+        return None
+    tax_rate = Decimal('0')
+    tax_amount = (shipment.shipping_cost * tax_rate) / 100
+    return Invoice(
+        customer=customer,
+        created_by=created_by or customer,
+        shipment=shipment,
+        amount=shipment.shipping_cost,
+        tax_rate=tax_rate,
+        tax_amount=tax_amount,
+        total_amount=shipment.shipping_cost + tax_amount,
+        status='SENT',
+        payment_method='CASH',
+        description=f'Shipping charge for {shipment.tracking_number}',
+        due_date=today + timedelta(days=INVOICE_TERM_DAYS),
+        updated_at=timezone.now(),
+    )
+
+
+def _insert_shipments(shipments, generated):
+    """
+    Insert ``shipments``, retrying once if a tracking number is already taken.
+
+    Only the ``generated`` shipments, whose numbers came from
+    ``generate_tracking_number``, get new numbers for the retry; a taken
+    number from the caller's specs is an error.
+    """
+    try:
+        with transaction.atomic():
+            Shipment.objects.bulk_create(shipments, batch_size=BULK_BATCH_SIZE)
+        return
+    except IntegrityError:
+        numbers = [shipment.tracking_number for shipment in generated]
+        if not Shipment.objects.filter(tracking_number__in=numbers).exists():
+            raise
+    for shipment in shipments:
+        # Batches inserted before the failure were rolled back with the savepoint
+        shipment.pk = None
+        shipment._state.adding = True
+    for shipment in generated:
+        shipment.tracking_number = generate_tracking_number()
+    Shipment.objects.bulk_create(shipments, batch_size=BULK_BATCH_SIZE)
+
+
+def create_shipments(specs, created_by=None, request=None, invoice=True, owner=None):
+    """
+    Create shipments from a list of specs and return them in the same order.
+
+    A spec is a dict of Shipment fields. ``sender_address`` and
+    ``recipient_address`` are ShippingAddress instances or dicts of address
+    fields; a new sender address belongs to ``owner`` (default
+    ``created_by``) and known addresses are reused, see
+    ``_resolve_addresses``. ``items`` is an optional list of dicts with name,
+    quantity and description. Missing tracking numbers are generated and a
+    missing ``shipping_cost`` is priced from the default zone's rate cards.
+
+    With ``invoice`` set, each shipment whose sender (or ``created_by``) is
+    a user gets a SENT invoice due in ``INVOICE_TERM_DAYS`` days, available
+    as ``shipment.invoice``; for the others ``getattr(shipment, 'invoice',
+    None)`` is None without a query. Everything is written in one
+    transaction.
+    """
+    if not specs:
+        return []
+    now = timezone.now()
+    today = now.date()
+
+    with transaction.atomic():
+        pairs = _resolve_addresses(specs, owner or created_by)
+
+        shipments = []
+        generated = []
+        for spec, (sender, recipient) in zip(specs, pairs):
+            fields = {name: spec[name] for name in SHIPMENT_FIELDS if spec.get(name) not in (None, '')}
+            if 'tracking_number' not in fields:
+                fields['tracking_number'] = generate_tracking_number()
+                generated.append(len(shipments))
+            if 'shipping_cost' not in fields:
+                fields['shipping_cost'] = calculate_shipping_cost(
+                    spec['package_type'], spec['weight'], spec.get('courier_service') or '',
+                    (spec['length'], spec['width'], spec['height']),
+                )
+            shipments.append(Shipment(sender_address=sender, recipient_address=recipient, status_changed_at=now,
+                                      latest_location=INITIAL_EVENT['location'], **fields))
+        _insert_shipments(shipments, [shipments[index] for index in generated])
+        if shipments[0].pk is None:
+            ids = dict(Shipment.objects.filter(
+                tracking_number__in=[shipment.tracking_number for shipment in shipments]
+            ).values_list('tracking_number', 'id'))
+            for shipment in shipments:
+                shipment.pk = ids[shipment.tracking_number]
+
+        items = []
+        events = []
+        for spec, shipment in zip(specs, shipments):
+            shipment_items = [
+                ShipmentItem(shipment=shipment, name=item['name'], quantity=int(item['quantity']),
+                             description=item.get('description') or '')
+                for item in spec.get('items') or ()
+            ]
+            event = TrackingEvent(shipment=shipment, timestamp=now, **INITIAL_EVENT)
+            _cache_related(shipment, 'items', shipment_items)
+            _cache_related(shipment, 'tracking_events', [event])
+            items.extend(shipment_items)
+            events.append(event)
+        ShipmentItem.objects.bulk_create(items, batch_size=BULK_BATCH_SIZE)
+        TrackingEvent.objects.bulk_create(events, batch_size=BULK_BATCH_SIZE)
+        if events[0].pk is None:
+            # Read the rows back so the returned graph carries their ids
+            for shipment in shipments:
+                del shipment._prefetched_objects_cache
+            prefetch_related_objects(shipments, 'items', 'tracking_events')
+        for shipment in shipments:
+            shipment.latest_event = shipment.tracking_events.all()[0]
+        Shipment.objects.bulk_update(shipments, ['latest_event'], batch_size=BULK_BATCH_SIZE)
+
+        invoices = []
+        if invoice:
+            for shipment in shipments:
+                shipment_invoice = _build_invoice(shipment, created_by, today)
+                if shipment_invoice is None:
+                    logger.warning(f'No invoice for shipment {shipment.tracking_number}: no customer or shipping cost')
+                    Shipment.invoice.related.set_cached_value(shipment, None)
+                else:
+                    invoices.append(shipment_invoice)
+            Invoice.objects.bulk_create(invoices, batch_size=BULK_BATCH_SIZE)
+            if invoices and invoices[0].pk is None:
+                ids = dict(Invoice.objects.filter(
+                    shipment__in=[item.shipment_id for item in invoices]
+                ).values_list('shipment_id', 'id'))
+                for shipment_invoice in invoices:
+                    shipment_invoice.pk = ids[shipment_invoice.shipment_id]
+
+        shipment_type = ContentType.objects.get_for_model(Shipment)
+        invoice_type = ContentType.objects.get_for_model(Invoice)
+        activities = [
+            _activity(created_by, 'Created shipment', shipment, shipment_type, request) for shipment in shipments
+        ] + [
+            _activity(created_by or item.customer, 'Invoice Generated from Shipment', item, invoice_type, request)
+            for item in invoices
+        ]
+        ActivityHistory.objects.bulk_create(activities, batch_size=BULK_BATCH_SIZE)
+
+    return shipments
+
+
+def create_shipment(spec, created_by=None, request=None, invoice=True):
+    """Create one shipment; see ``create_shipments``."""
+    return create_shipments([spec], created_by=created_by, request=request, invoice=invoice)[0]
@@ -0,0 +1,139 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Bill, Invoice, RateCard, RateCardSurcharge, RateCardWeightBreak, Shipment, TrackingEvent
+from .live import publish_events
+from .pdf_render import invalidate_pdfs
+from .pricing import invalidate_rate_index
+from .rollups import apply_delta, bill_rollup_key, rollup_key
+from .search import index_bills
+
+User = get_user_model()
+
+# Fields whose changes move a bill between rollup rows
+ROLLUP_FIELDS = {'status', 'payment_method', 'courier_service', 'amount', 'created_at'}
+
+# Fields that feed the bill and customer search documents
+BILL_SEARCH_FIELDS = {'description', 'customer', 'shipment'}
+CUSTOMER_SEARCH_FIELDS = {'username', 'first_name', 'last_name', 'email'}
+
+
+@receiver(pre_save, sender=Bill)
+def remember_bill_rollup_state(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Capture the bill's stored rollup key before it is overwritten."""
+    instance._rollup_previous = None
+    if raw or instance._state.adding or not instance.pk:
+        return
+    if update_fields is not None and not ROLLUP_FIELDS.intersection(update_fields):
+        return
+    previous = Bill.objects.filter(pk=instance.pk).values_list(
+        'created_at', 'status', 'payment_method', 'courier_service', 'amount'
+    ).first()
+    if previous:
+        created_at, status, payment_method, courier_service, amount = previous
+        instance._rollup_previous = (rollup_key(created_at, status, payment_method, courier_service), amount)
+
+
+@receiver(post_save, sender=Bill)
+def update_bill_rollup_on_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Move the bill's count and amount to its current rollup row."""
+    if raw:
+        return
+    if not created and update_fields is not None and not ROLLUP_FIELDS.intersection(update_fields):
+        return
+
+    previous = getattr(instance, '_rollup_previous', None)
+    instance._rollup_previous = None
+    current_key = bill_rollup_key(instance)
+    current_amount = instance.amount or 0
+
+    with transaction.atomic():
+        if previous:
+            previous_key, previous_amount = previous
+            if previous_key == current_key:
+                apply_delta(current_key, 0, current_amount - (previous_amount or 0))
+                return
+            apply_delta(previous_key, -1, -(previous_amount or 0))
+        elif not created:
+            # Existing bill with no stored state (e.g. saved from a raw row)
+            return
+        apply_delta(current_key, 1, current_amount)
+
+
+@receiver(post_delete, sender=Bill)
+def update_bill_rollup_on_delete(sender, instance, **kwargs):
+    """Remove the deleted bill from its rollup row."""
+    if instance.created_at is None:
+        return
+    apply_delta(bill_rollup_key(instance), -1, -(instance.amount or 0))
+
+
+@receiver(post_save, sender=Bill)
+def update_bill_search_document(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Refresh the bill's search document."""
+    if raw:
+        return
+    if update_fields is not None and not BILL_SEARCH_FIELDS.intersection(update_fields):
+        return
+    index_bills(Bill.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=User)
+def update_customer_search_documents(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Refresh the search documents of a customer's bills after their details change."""
+    if raw or created:
+        return
+    if update_fields is not None and not CUSTOMER_SEARCH_FIELDS.intersection(update_fields):
+        return
+    index_bills(Bill.objects.filter(customer=instance))
+
+
+@receiver(post_save, sender=Bill)
+@receiver(post_delete, sender=Bill)
+def invalidate_bill_pdfs(sender, instance, raw=False, **kwargs):
+    """Drop the cached PDFs of a changed or deleted bill."""
+    if not raw:
+        invalidate_pdfs('bill', instance.pk)
+
+
+@receiver(post_save, sender=Invoice)
+@receiver(post_delete, sender=Invoice)
+def invalidate_invoice_pdfs(sender, instance, raw=False, **kwargs):
+    """Drop the cached PDFs of a changed or deleted invoice."""
+    if not raw:
+        invalidate_pdfs('invoice', instance.pk)
+
+
+@receiver(post_save, sender=RateCard)
+@receiver(post_delete, sender=RateCard)
+@receiver(post_save, sender=RateCardWeightBreak)
+@receiver(post_delete, sender=RateCardWeightBreak)
+@receiver(post_save, sender=RateCardSurcharge)
+@receiver(post_delete, sender=RateCardSurcharge)
+def reload_rate_cards(sender, **kwargs):
+    """Rebuild the in-memory pricing index after any rate card change."""
+    transaction.on_commit(invalidate_rate_index)
+
+
+@receiver(post_save, sender=TrackingEvent)
+@receiver(post_delete, sender=TrackingEvent)
+def tracking_event_changed(sender, instance, created=False, raw=False, **kwargs):
+    """Version the shipment's cached tracking page and push new events to live subscribers."""
+    if raw:
+        return
+    # shipping.tracking_cache serves an entry only while updated_at is unchanged
+    Shipment.objects.filter(pk=instance.shipment_id).update(updated_at=timezone.now())
+    if not created:
+        return
+    if TrackingEvent.shipment.is_cached(instance):
+        tracking_number = instance.shipment.tracking_number
+    else:
+        tracking_number = Shipment.objects.filter(pk=instance.shipment_id).values_list(
+            'tracking_number', flat=True).first()
+    if tracking_number:
+        transaction.on_commit(partial(publish_events, [instance], {instance.shipment_id: tracking_number}))
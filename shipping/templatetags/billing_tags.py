@@ -10,4 +10,4 @@ register = template.Library()
 @register.simple_tag(takes_context=True)
 def get_admin_billing_stats(context):
     logger.info("get_admin_billing_stats called")
-    return get_billing_stats()
+    return get_billing_stats(context.get('request'))
@@ -0,0 +1,80 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .. import lifecycle
+from ..models import Bill, Invoice, ShippingAddress
+from ..shipments import create_shipments
+
+User = get_user_model()
+
+# Rows created per endpoint; page sizes below and up to this are compared
+ROWS = 12
+PAGE_SIZES = (1, 5, ROWS)
+
+# Queries per list request: session and user lookups, then the endpoint's own
+AUTH_QUERIES = 2
+LIST_QUERIES = {
+    # shipments, items, tracking events
+    '/api/shipments/': 3,
+    '/api/bills/': 1,
+    '/api/invoices/': 1,
+}
+
+
+class ListQueryCountTestCase(TestCase):
+    """Every list endpoint costs a fixed number of queries, whatever the page size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='customer', password='testpass123')
+        address = ShippingAddress.objects.create(
+            user=cls.user, first_name='Sam', last_name='Sender', address_line1='1 Main St', city='Fremont',
+            state='CA', postal_code='94536', country='US', phone_number='5551234567',
+        )
+        spec = {
+            'sender_address': address, 'recipient_address': address, 'package_type': 'parcel',
+            'weight': Decimal('1'), 'length': Decimal('1'), 'width': Decimal('1'), 'height': Decimal('1'),
+            'shipping_date': timezone.now().date(),
+            'items': [{'name': 'Books', 'quantity': 2, 'description': 'Paperbacks'}],
+        }
+        shipments = create_shipments([dict(spec) for _ in range(ROWS)], created_by=cls.user, invoice=False)
+        for shipment in shipments:
+            lifecycle.record_event(shipment, 'processing', 'Fremont, CA')
+        due = timezone.now().date() + timedelta(days=10)
+        for shipment in shipments:
+            Bill.objects.create(customer=cls.user, created_by=cls.user, shipment=shipment, amount=Decimal('10'),
+                                due_date=due)
+            Invoice.objects.create(customer=cls.user, created_by=cls.user, shipment=shipment, amount=Decimal('10'),
+                                   due_date=due)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def assertListQueries(self, url, expected):
+        """Fetch ``url`` at every page size and assert each request runs ``expected`` queries."""
+        for page_size in PAGE_SIZES:
+            with self.subTest(url=url, page_size=page_size):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url, {'page_size': page_size})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()['results']), page_size)
+                self.assertEqual(len(queries), AUTH_QUERIES + expected,
+                                 '\n'.join(query['sql'] for query in queries.captured_queries))
+
+    def test_list_endpoints(self):
+        """Test the query count of each list endpoint"""
+        for url, expected in LIST_QUERIES.items():
+            self.assertListQueries(url, expected)
+
+    def test_shipment_events_are_ordered(self):
+        """Test that prefetched tracking events come back oldest first"""
+        shipment = self.client.get('/api/shipments/', {'page_size': 1}).json()['results'][0]
+        self.assertEqual([event['status'] for event in shipment['tracking_events']], ['pending', 'processing'])
+        self.assertEqual(shipment['items'][0]['name'], 'Books')
+        self.assertEqual(shipment['sender_address']['city'], 'Fremont')
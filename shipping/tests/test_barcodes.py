@@ -0,0 +1,61 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from .. import barcodes
+from ..labels import LABEL_FIELDS, render_label_sheets
+
+class BarcodeCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_png_rendered_once(self):
+        """Test that a barcode is encoded once and then served from memory and disk"""
+        cache = barcodes.BarcodeImageCache(self.directory, 10 ** 6, 10 ** 6)
+        with mock.patch.dict(barcodes.RENDERERS, {'qr': mock.Mock(return_value=b'png-bytes')}) as renderers:
+            self.assertEqual(cache.get('qr', 'PMB-1'), b'png-bytes')
+            self.assertEqual(cache.get('qr', 'PMB-1'), b'png-bytes')
+            cache.clear()
+            self.assertEqual(cache.get('qr', 'PMB-1'), b'png-bytes')
+            self.assertEqual(renderers['qr'].call_count, 1)
+
+    def test_memory_eviction_by_size(self):
+        """Test that the memory LRU evicts the least recently used images past its budget"""
+        cache = barcodes.BarcodeImageCache(self.directory, 250, 10 ** 6)
+        with mock.patch.dict(barcodes.RENDERERS, {'qr': lambda value: value.encode() * 100}):
+            cache.get('qr', 'a')
+            cache.get('qr', 'b')
+            cache.get('qr', 'a')
+            cache.get('qr', 'c')
+        self.assertEqual([value for _, value in cache._images], ['a', 'c'])
+
+    def test_disk_pruned_by_size(self):
+        """Test that the disk cache deletes old files past its budget"""
+        cache = barcodes.BarcodeImageCache(self.directory, 10 ** 6, 1000)
+        with mock.patch.dict(barcodes.RENDERERS, {'qr': lambda value: b'x' * 400}):
+            for value in ('a', 'b', 'c'):
+                cache.get('qr', value)
+        self.assertLessEqual(sum(path.stat().st_size for path in cache.directory.glob('*.png')), 1000)
+
+    def test_real_renderers(self):
+        """Test that QR and Code128 PNGs are produced"""
+        cache = barcodes.BarcodeImageCache(self.directory, 10 ** 6, 10 ** 6)
+        for kind in barcodes.BARCODE_KINDS:
+            self.assertTrue(cache.get(kind, 'PMB-20261018-ABC12').startswith(b'\x89PNG'))
+
+    def test_vector_drawings_cached(self):
+        """Test that vector drawings are built once per value"""
+        self.assertIs(barcodes.qr_drawing('PMB-1', 100), barcodes.qr_drawing('PMB-1', 100))
+        self.assertIs(barcodes.code128_drawing('PMB-1'), barcodes.code128_drawing('PMB-1'))
+
+    def test_vector_labels_embed_no_images(self):
+        """Test that labels with vector barcodes contain no raster images"""
+        row = {field: 'x' for field in LABEL_FIELDS}
+        row.update(tracking_number='PMB-20261018-ABC12', sender_address__address_line2='',
+                   recipient_address__address_line2='')
+        pdf = render_label_sheets([row] * 4, per_sheet=4)
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        self.assertNotIn(b'/Subtype /Image', pdf)
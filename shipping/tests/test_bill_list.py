@@ -0,0 +1,61 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, RequestFactory
+from django.utils import timezone
+
+from ..models import Bill
+from ..views_billing import BillListView
+
+User = get_user_model()
+
+class BillListSummaryTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.customer = User.objects.create_user(username='customer', password='testpass123')
+        self.other_customer = User.objects.create_user(username='other', password='testpass123')
+        today = timezone.now().date()
+
+        Bill.objects.create(customer=self.customer, amount=Decimal('100.00'), status='PAID',
+                            due_date=today + timedelta(days=10))
+        Bill.objects.create(customer=self.customer, amount=Decimal('50.00'), status='PENDING',
+                            due_date=today + timedelta(days=10))
+        Bill.objects.create(customer=self.other_customer, amount=Decimal('25.00'), status='PENDING',
+                            due_date=today - timedelta(days=3))
+        Bill.objects.create(customer=self.other_customer, amount=Decimal('10.00'), status='OVERDUE',
+                            due_date=today - timedelta(days=5))
+        self.factory = RequestFactory()
+
+    def get_summary(self, **params):
+        view = BillListView()
+        view.setup(self.factory.get('/shipping/bills/', params))
+        return view.get_summary()
+
+    def test_summary_values(self):
+        """Test that the summary totals come from one aggregate query"""
+        with self.assertNumQueries(1):
+            summary = self.get_summary()
+        self.assertEqual(summary['total_bills'], 4)
+        self.assertEqual(summary['total_amount'], Decimal('185.00'))
+        self.assertEqual(summary['pending_amount'], Decimal('75.00'))
+        self.assertEqual(summary['overdue_amount'], Decimal('35.00'))
+        self.assertEqual(summary['overdue_count'], 2)
+
+    def test_summary_cached_per_filter(self):
+        """Test that the summary is cached per combination of filters"""
+        self.get_summary()
+        with self.assertNumQueries(0):
+            self.get_summary()
+        with self.assertNumQueries(1):
+            summary = self.get_summary(customer=self.other_customer.pk)
+        self.assertEqual(summary['total_bills'], 2)
+        self.assertEqual(summary['overdue_amount'], Decimal('35.00'))
+
+    def test_summary_without_bills(self):
+        """Test that an empty list gives zero totals"""
+        Bill.objects.all().delete()
+        summary = self.get_summary()
+        self.assertEqual(summary['total_bills'], 0)
+        self.assertEqual(summary['overdue_amount'], Decimal('0'))
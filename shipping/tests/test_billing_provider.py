@@ -0,0 +1,43 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+
+from ..models import Bill
+from ..billing_provider import BillRecord, aggregate_bill_records, get_billing_dashboard_data
+
+User = get_user_model()
+
+class BillingProviderTestCase(TestCase):
+    def test_aggregate_bill_records(self):
+        """Test the single-pass aggregation of bill records"""
+        today = date(2025, 6, 20)
+        yesterday = today - timedelta(days=1)
+        records = [
+            BillRecord(1, 'pending', Decimal('10.00'), today, today - timedelta(days=1), 'CASH'),
+            BillRecord(2, 'paid', Decimal('20.00'), today, None, 'CASH'),
+            BillRecord(3, 'paid', Decimal('30.00'), yesterday, None, 'ZELLE'),
+            BillRecord(4, 'pending', Decimal('5.00'), yesterday, today + timedelta(days=3), 'CASH'),
+        ]
+        totals = aggregate_bill_records(records, today)
+        self.assertEqual(totals['total_bills'], 4)
+        self.assertEqual(totals['pending_bills'], 2)
+        self.assertEqual(totals['paid_bills'], 2)
+        self.assertEqual(totals['overdue_bills'], 1)
+        self.assertEqual(totals['today_orders'], 2)
+        self.assertEqual(totals['today_revenue'], Decimal('30.00'))
+        self.assertEqual(totals['yesterday_revenue'], Decimal('30.00'))
+        self.assertEqual(totals['total_revenue'], Decimal('65.00'))
+
+    def test_dashboard_data_from_database(self):
+        """Test that the dashboard context is built without HTTP calls"""
+        customer = User.objects.create_user(username='customer', password='testpass123')
+        Bill.objects.create(customer=customer, amount=Decimal('40.00'), status='PAID')
+        Bill.objects.create(customer=customer, amount=Decimal('60.00'), status='PENDING')
+        with self.assertNumQueries(2):
+            data = get_billing_dashboard_data()
+        self.assertEqual(data['total_bills'], 2)
+        self.assertEqual(data['today_orders'], 2)
+        self.assertEqual(data['total_revenue'], 100.0)
+        self.assertEqual(len(data['recent_bills']), 2)
@@ -0,0 +1,61 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase, RequestFactory
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from ..models import Bill
+from ..billing_stats import get_billing_stats, compute_billing_stats
+
+User = get_user_model()
+
+class BillingStatsTestCase(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='testpass123')
+        self.other_customer = User.objects.create_user(username='other', password='testpass123')
+        today = timezone.now().date()
+
+        Bill.objects.create(customer=self.customer, amount=Decimal('100.00'), status='PAID',
+                            due_date=today + timedelta(days=10))
+        Bill.objects.create(customer=self.customer, amount=Decimal('50.00'), status='PENDING',
+                            due_date=today + timedelta(days=10))
+        Bill.objects.create(customer=self.other_customer, amount=Decimal('25.00'), status='PENDING',
+                            due_date=today - timedelta(days=3))
+        Bill.objects.create(customer=self.other_customer, amount=Decimal('10.00'), status='OVERDUE',
+                            due_date=today - timedelta(days=5))
+        self.factory = RequestFactory()
+
+    def test_stats_values(self):
+        """Test that the KPIs match the bills in the database"""
+        stats = compute_billing_stats()
+        self.assertEqual(stats['total_bills'], 4)
+        self.assertEqual(stats['total_revenue'], 185.0)
+        self.assertEqual(stats['todays_orders'], 4)
+        self.assertEqual(stats['todays_revenue'], 185.0)
+        self.assertEqual(stats['pending_bills'], 2)
+        self.assertEqual(stats['overdue_bills'], 2)
+        self.assertEqual(stats['unpaid_bills'], 3)
+        self.assertEqual(stats['total_customers'], 2)
+        self.assertEqual(stats['pending_percentage'], 50.0)
+        self.assertEqual(len(stats['recent_bills']), 4)
+
+    def test_stats_query_count(self):
+        """Test that the stats take a fixed number of queries"""
+        with self.assertNumQueries(3):
+            compute_billing_stats()
+
+    def test_stats_memoized_per_request(self):
+        """Test that the stats are computed once per request"""
+        request = self.factory.get('/admin/')
+        with self.assertNumQueries(3):
+            first = get_billing_stats(request)
+            second = get_billing_stats(request)
+        self.assertIs(first, second)
+
+    def test_stats_without_bills(self):
+        """Test the defaults returned when there are no bills"""
+        Bill.objects.all().delete()
+        stats = compute_billing_stats()
+        self.assertEqual(stats['total_bills'], 0)
+        self.assertEqual(stats['recent_bills'], [])
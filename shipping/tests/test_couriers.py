@@ -0,0 +1,170 @@
+import io
+import os
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..couriers import ScanEvent, TrackingError, get_adapter
+from ..couriers.base import progress_scans
+from ..couriers.fedex import FedExAdapter
+from ..couriers.poller import pollable_shipments, refresh_shipments
+from ..models import Shipment, ShippingAddress, TrackingEvent
+from ..tracking_events import get_tracking_map
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'fedex_travel_history.html')
+
+
+def travel_history():
+    with open(FIXTURE, encoding='utf-8') as handle:
+        return handle.read()
+
+
+class FakeSession:
+    def __init__(self):
+        self.closed = False
+
+    def quit(self):
+        self.closed = True
+
+
+class FakeFedExAdapter(FedExAdapter):
+    """FedEx parsing with canned pages instead of a browser."""
+    sessions = []
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def session_factory(self):
+        session = FakeSession()
+        self.sessions.append(session)
+        return session
+
+    def fetch(self, session, tracking_number):
+        with self.lock:
+            type(self).active += 1
+            type(self).peak = max(self.peak, self.active)
+        try:
+            time.sleep(0.01)
+            if tracking_number == 'UNKNOWN':
+                raise TrackingError('No travel history for UNKNOWN')
+            if tracking_number == 'CRASH':
+                raise RuntimeError('browser crashed')
+            return travel_history()
+        finally:
+            with self.lock:
+                type(self).active -= 1
+
+
+@override_settings(COURIER_ADAPTERS={'FEDEX': 'shipping.tests.test_couriers.FakeFedExAdapter'})
+class CourierTrackingTestCase(TestCase):
+    def setUp(self):
+        get_tracking_map().clear()
+        FakeFedExAdapter.sessions = []
+        FakeFedExAdapter.peak = 0
+        self.address = ShippingAddress.objects.create(
+            first_name='Sam', last_name='Sender', address_line1='1 Main St', city='Fremont', state='CA',
+            postal_code='94536', country='US', phone_number='5551234567',
+        )
+
+    def shipment(self, courier_tracking_number, courier_service='FEDEX', status='pending'):
+        return Shipment.objects.create(
+            sender_address=self.address, recipient_address=self.address, package_type='parcel',
+            weight=Decimal('1'), length=Decimal('1'), width=Decimal('1'), height=Decimal('1'),
+            shipping_date=date(2026, 10, 18), shipping_cost=Decimal('10'), status=status,
+            courier_service=courier_service, courier_tracking_number=courier_tracking_number,
+        )
+
+    def test_parse_travel_history_fixture(self):
+        """Test that the FedEx parser reads every scan of a saved travel history"""
+        events = FedExAdapter().parse(travel_history())
+        self.assertEqual(len(events), 5)
+        self.assertEqual(events[0].timestamp, datetime(2025, 6, 2, 12, 27))
+        self.assertEqual((events[0].status, events[0].location), ('delivered', 'LATHROP, CA'))
+        self.assertEqual(events[2].description, 'In transit')
+        self.assertEqual([event.status for event in events],
+                         ['delivered', 'shipped', 'shipped', 'processing', 'pending'])
+        self.assertEqual(events[4].location, 'FedEx')
+
+    def test_parse_without_history(self):
+        """Test that a page without travel history yields no events"""
+        self.assertEqual(FedExAdapter().parse('<!-- not found -->'), [])
+        with self.assertRaises(TrackingError):
+            FakeFedExAdapter().track(FakeSession(), 'UNKNOWN')
+
+    def test_backward_scans_become_progress_scans(self):
+        """Test that an early-stage scan repeated after a later one keeps the status already reached"""
+        scans = [
+            ScanEvent(datetime(2025, 6, 1, hour), status, 'Fremont, CA', description)
+            for hour, status, description in (
+                (8, 'pending', 'Label created'), (9, 'processing', 'Picked up'), (10, 'shipped', 'In transit'),
+                (11, 'pending', 'Shipment information sent to FedEx'), (12, 'delivered', 'Delivered'),
+            )
+        ]
+        self.assertEqual([scan.status for scan in progress_scans(scans)],
+                         ['pending', 'processing', 'shipped', 'shipped', 'delivered'])
+        self.assertEqual(progress_scans(scans)[3].description, 'Shipment information sent to FedEx')
+
+    def test_scans_behind_the_shipment_are_stored_as_history(self):
+        """Test that scans the shipment already passed are stored once instead of failing every poll"""
+        shipment = self.shipment('881618932100', status='shipped')
+        result = refresh_shipments([shipment])
+        self.assertEqual((result.events.created, result.events.history, result.events.errors), (5, 2, []))
+        shipment.refresh_from_db()
+        self.assertEqual(shipment.status, 'delivered')
+
+        result = refresh_shipments([shipment])
+        self.assertEqual((result.events.duplicates, result.events.errors), (5, []))
+
+    def test_refresh_writes_events_with_a_bounded_pool(self):
+        """Test that shipments are polled concurrently through a reused, bounded session pool"""
+        shipments = [self.shipment(f'8816189321{n:02d}') for n in range(12)]
+        result = refresh_shipments(shipments, pool_size=3)
+        self.assertEqual((result.tracked, result.failed), (12, []))
+        self.assertEqual(result.events.created, 60)
+        self.assertLessEqual(len(FakeFedExAdapter.sessions), 3)
+        self.assertGreater(FakeFedExAdapter.peak, 1)
+        self.assertTrue(all(session.closed for session in FakeFedExAdapter.sessions))
+        self.assertEqual(Shipment.objects.filter(status='delivered').count(), 12)
+        self.assertFalse(pollable_shipments().exists())
+
+        # Polling again stores nothing new
+        result = refresh_shipments(shipments, pool_size=3)
+        self.assertEqual((result.events.created, result.events.duplicates), (0, 60))
+
+    def test_failures_are_reported(self):
+        """Test that unknown numbers and crashed sessions are reported without stopping the others"""
+        good = self.shipment('881618932162')
+        unknown = self.shipment('UNKNOWN')
+        crashed = self.shipment('CRASH')
+        with self.assertLogs('shipping.couriers.poller', 'WARNING'):
+            result = refresh_shipments([crashed, good, unknown], pool_size=1)
+        self.assertEqual(result.tracked, 1)
+        self.assertEqual({number for number, _ in result.failed}, {unknown.tracking_number, crashed.tracking_number})
+        # The crashed session was closed and replaced
+        self.assertEqual(len(FakeFedExAdapter.sessions), 2)
+        self.assertTrue(FakeFedExAdapter.sessions[0].closed)
+        self.assertEqual(TrackingEvent.objects.filter(shipment=good).count(), 5)
+
+    def test_pollable_shipments(self):
+        """Test that only moving shipments with a polled courier and a courier number are selected"""
+        polled = self.shipment('881618932162')
+        self.shipment('')
+        self.shipment('881618932163', courier_service='DHL')
+        self.shipment('881618932164', status='delivered')
+        self.assertEqual(list(pollable_shipments()), [polled])
+        self.assertIsInstance(get_adapter('FEDEX'), FakeFedExAdapter)
+        self.assertIsNone(get_adapter('DHL'))
+
+    def test_command(self):
+        """Test the poll_courier_tracking command"""
+        shipment = self.shipment('881618932162')
+        self.shipment('881618932163')
+        out = io.StringIO()
+        call_command('poll_courier_tracking', tracking_number=['881618932162'], stdout=out, stderr=io.StringIO())
+        self.assertIn('Tracked 1 of 1 shipment(s)', out.getvalue())
+        shipment.refresh_from_db()
+        self.assertEqual(shipment.status, 'delivered')
@@ -0,0 +1,55 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, RequestFactory
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from ..admin import BillAdmin, SupportRequestAdmin
+from ..admin_index import custom_admin_site
+from ..models import Bill, SupportRequest
+
+User = get_user_model()
+
+class AdminExportTestCase(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='testpass123')
+        due = timezone.now().date() + timedelta(days=10)
+        for amount in ('10.00', '20.50', '30.25'):
+            Bill.objects.create(customer=self.customer, amount=Decimal(amount), due_date=due)
+        self.request = RequestFactory().get('/admin/')
+        self.bill_admin = BillAdmin(Bill, custom_admin_site)
+
+    def test_bill_csv_streams_in_one_query(self):
+        """Test that the bill CSV export streams rows from a single query"""
+        response = self.bill_admin.export_to_csv(self.request, Bill.objects.order_by('pk'))
+        self.assertTrue(response.streaming)
+        with self.assertNumQueries(1):
+            content = b''.join(response.streaming_content).decode()
+        lines = content.strip().splitlines()
+        self.assertEqual(lines[0], 'Invoice #,Customer,Amount,Status,Created,Due Date,Paid')
+        self.assertEqual(len(lines), 4)
+        first = Bill.objects.order_by('pk').first()
+        self.assertTrue(lines[1].startswith(f'INV-{first.pk:06d},customer,$10.00,Pending,'))
+        self.assertTrue(lines[1].endswith(',No'))
+
+    def test_bill_xlsx_export(self):
+        """Test that the bill XLSX export contains a header and one row per bill"""
+        response = self.bill_admin.export_to_xlsx(self.request, Bill.objects.order_by('pk'))
+        workbook = load_workbook(BytesIO(b''.join(response.streaming_content)))
+        rows = list(workbook.active.values)
+        self.assertEqual(rows[0][0], 'Invoice #')
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[3][2], '$30.25')
+
+    def test_support_request_csv_export(self):
+        """Test that support requests export with choice labels"""
+        SupportRequest.objects.create(subject='Lost parcel', name='Dana', email='dana@example.com',
+                                      request_type='shipment', message='Where is it?')
+        admin_instance = SupportRequestAdmin(SupportRequest, custom_admin_site)
+        response = admin_instance.export_to_csv(self.request, SupportRequest.objects.all())
+        lines = b''.join(response.streaming_content).decode().strip().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('Lost parcel,Dana,dana@example.com,Shipment Issue,Open', lines[1])
@@ -0,0 +1,156 @@
+import json
+import os
+import tempfile
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from .. import fx, pricing
+
+User = get_user_model()
+
+
+class FxRateStoreTestCase(SimpleTestCase):
+    def setUp(self):
+        fx.reset_rate_store()
+        self.addCleanup(fx.reset_rate_store)
+
+    @override_settings(DEBUG=True)
+    def test_mock_provider(self):
+        """Test the default mock rates in DEBUG"""
+        self.assertEqual(fx.get_rate('USD', 'INR'), Decimal('83'))
+        self.assertEqual(fx.get_rate('INR', 'INR'), Decimal('1'))
+
+    def test_no_provider_outside_debug(self):
+        """Test that without a configured provider no made-up rate is used outside DEBUG"""
+        with self.assertRaises(fx.FxRateError):
+            fx.get_rate('USD', 'INR')
+        with override_settings(FX_RATES_PROVIDER='mock'):
+            fx.reset_rate_store()
+            self.assertEqual(fx.get_rate('USD', 'INR'), Decimal('83'))
+
+    def test_file_provider(self):
+        """Test loading rates from a JSON file"""
+        handle, path = tempfile.mkstemp(suffix='.json')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(handle, 'w') as output:
+            json.dump({'base': 'USD', 'rates': {'INR': 84.5, 'EUR': '0.5'}}, output)
+        with override_settings(FX_RATES_FILE=path):
+            fx.reset_rate_store()
+            self.assertEqual(fx.get_rate('USD', 'INR'), Decimal('84.5'))
+            self.assertEqual(fx.get_rate('EUR', 'INR'), Decimal('169'))
+            with self.assertRaises(fx.FxRateError):
+                fx.get_rate('USD', 'GBP')
+
+    def test_ttl_and_failed_refresh(self):
+        """Test that rates are cached for the TTL and kept when a refresh fails"""
+        provider = mock.Mock(return_value=fx.parse_rates({'base': 'USD', 'rates': {'INR': 80}}))
+        store = fx.FxRateStore(provider, ttl=60)
+        store.rate('USD', 'INR')
+        store.rate('USD', 'INR')
+        self.assertEqual(provider.call_count, 1)
+
+        store.fetched_at -= 61
+        provider.side_effect = fx.FxRateError('down')
+        with self.assertLogs('shipping.fx', 'WARNING'):
+            self.assertEqual(store.rate('USD', 'INR'), Decimal('80'))
+        self.assertEqual(provider.call_count, 2)
+
+    def test_no_rates(self):
+        """Test that a failing provider without earlier rates raises FxRateError"""
+        store = fx.FxRateStore(mock.Mock(side_effect=fx.FxRateError('down')), ttl=60)
+        with self.assertRaises(fx.FxRateError):
+            store.rate('USD', 'INR')
+
+
+@override_settings(FX_RATES_PROVIDER='mock')
+class QuoteCacheTestCase(TestCase):
+    payload = {
+        "shipping_route": "india-to-usa",
+        "type": "package",
+        "origin": "mumbai",
+        "destination": "new-york",
+        "weight": 2.3,
+        "weight_metric": "kg",
+        "dim_length": 30,
+        "dim_width": 20,
+        "dim_height": 25,
+    }
+
+    def setUp(self):
+        pricing.invalidate_rate_index()
+        pricing.get_quote_cache().clear()
+        fx.reset_rate_store()
+        self.addCleanup(fx.reset_rate_store)
+        self.addCleanup(pricing.invalidate_rate_index)
+
+    def post(self, payload):
+        return self.client.post('/api/quote/', json.dumps(payload), content_type='application/json')
+
+    def test_server_side_usd_rate(self):
+        """Test that QuoteView converts at the server-side rate when usd_rate is omitted"""
+        body = self.post(self.payload).json()
+        self.assertEqual(body['inr_price'], 6750)
+        self.assertEqual(body['usd_price'], 82)
+        self.assertEqual(body['usd_rate'], 83.0)
+
+        body = self.post(dict(self.payload, usd_rate=90)).json()
+        self.assertEqual(body['usd_price'], 75)
+
+        with override_settings(FX_RATES_PROVIDER=None):
+            fx.reset_rate_store()
+            self.assertEqual(self.post(self.payload).status_code, 503)
+            self.assertEqual(self.post(dict(self.payload, usd_rate=90)).status_code, 200)
+
+    def test_cent_rounded_card_is_not_truncated(self):
+        """Test that a price with paise is quoted rounded up, in the single and batch APIs alike"""
+        pricing.RateCard.objects.create(name='Paise', zone='india-to-usa', package_type='package', currency='INR',
+                                        base_rate=Decimal('100.25'), rounding='cent', priority=100)
+        pricing.invalidate_rate_index()
+        body = self.post(dict(self.payload, usd_rate=101)).json()
+        self.assertEqual((body['inr_price'], body['usd_price']), (101, 1))
+
+        packages = [dict(self.payload, usd_rate=101)]
+        response = self.client.post('/api/quote/batch/', json.dumps({'packages': packages}),
+                                    content_type='application/json')
+        self.assertEqual(response.json()['results'][0]['inr_price'], 101)
+
+    def test_normalized_keys_hit(self):
+        """Test that equivalent inputs share one cache entry"""
+        first = pricing.quote('india-to-usa', 'package', 2.3, dimensions=(30, 20, 25))
+        second = pricing.quote('india-to-usa', 'package', '2.30', dimensions=(25, 30, 20.0))
+        self.assertIs(first, second)
+        stats = pricing.quote_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']), (1, 1, 1))
+
+    def test_cleared_on_rate_change(self):
+        """Test that cached quotes are dropped when the rate cards change"""
+        self.assertEqual(pricing.quote('default', 'parcel', 1).amount, Decimal('12.00'))
+        pricing.RateCard.objects.filter(zone='default', package_type='parcel').update(base_rate=Decimal('20'))
+        pricing.invalidate_rate_index()
+        self.assertEqual(pricing.quote('default', 'parcel', 1).amount, Decimal('22.00'))
+
+    def test_bounded(self):
+        """Test that the least recently used quote is evicted"""
+        cache = pricing.QuoteCache(2)
+        index = pricing.get_rate_index()
+        now = timezone.now()
+        for key in ('a', 'b', 'a', 'c'):
+            if cache.get(index, key, now) is None:
+                cache.put(index, key, key.upper(), now)
+        self.assertIsNone(cache.get(index, 'b', now))
+        self.assertEqual(cache.get(index, 'a', now), 'A')
+        self.assertEqual(cache.stats()['size'], 2)
+
+    def test_stats_view(self):
+        """Test that staff can read the cache counters"""
+        self.post(self.payload)
+        self.post(self.payload)
+        self.assertEqual(self.client.get('/api/quote/stats/').status_code, 401)
+        self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+        body = self.client.get('/api/quote/stats/').json()
+        self.assertEqual(body['quote_cache']['hits'], 1)
+        self.assertEqual(body['fx']['rates']['INR'], 83.0)
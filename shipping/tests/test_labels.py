@@ -0,0 +1,90 @@
+import os
+import tempfile
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from pypdf import PdfReader
+
+from .. import labels
+from ..models import Shipment, ShippingAddress
+
+User = get_user_model()
+
+@override_settings(PDF_RENDER_WORKERS=0)
+class ShippingLabelTestCase(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='staff', password='testpass123', is_staff=True,
+                                              first_name='Sam', last_name='Sender')
+        address = ShippingAddress.objects.create(
+            user=self.staff, first_name='Sam', last_name='Sender', address_line1='1 Main St',
+            city='Austin', state='TX', country='US', postal_code='78701', phone_number='5550100',
+        )
+        self.shipments = [
+            Shipment.objects.create(
+                sender_address=address, recipient_address=address, package_type='parcel',
+                weight=Decimal('2.00'), length=10, width=10, height=10,
+                tracking_number=f'PMB-20261018-{index:05d}', shipping_date=timezone.now().date(),
+                shipping_cost=Decimal('10.00'), status='processing' if index % 2 else 'pending',
+            )
+            for index in range(7)
+        ]
+
+    def page_count(self, data):
+        return len(PdfReader(BytesIO(data)).pages)
+
+    def test_single_label(self):
+        """Test that the single label view still returns a one-page PDF"""
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('shipping:print_shipping_label', args=[self.shipments[0].pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.page_count(response.content), 1)
+
+    def test_batch_endpoint_by_ids(self):
+        """Test that the batch endpoint puts four labels on each sheet"""
+        self.client.force_login(self.staff)
+        ids = ','.join(str(shipment.pk) for shipment in self.shipments[:5])
+        response = self.client.get(reverse('shipping:print_shipping_labels'), {'ids': ids, 'per_sheet': 4})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(self.page_count(b''.join(response.streaming_content)), 2)
+
+    def test_batch_endpoint_validation(self):
+        """Test that the batch endpoint rejects bad parameters"""
+        self.client.force_login(self.staff)
+        url = reverse('shipping:print_shipping_labels')
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(self.client.get(url, {'ids': '1', 'per_sheet': 5}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'status': 'delivered'}).status_code, 404)
+        for shipping_date in ('tomorrow', '2026-02-30'):
+            self.assertEqual(self.client.get(url, {'shipping_date': shipping_date}).status_code, 400)
+
+    @override_settings(PDF_RENDER_WORKERS=2)
+    def test_batch_in_worker_pool(self):
+        """Test that chunks rendered in the worker pool are joined in order"""
+        rows = labels.label_rows(labels.select_label_shipments(status='pending'))
+        with mock.patch.object(labels, 'SHEETS_PER_CHUNK', 1):
+            pdf_file = labels.render_label_batch(rows, per_sheet=1)
+        reader = PdfReader(pdf_file)
+        self.assertEqual(len(reader.pages), 4)
+        self.assertIn(rows[-1]['tracking_number'], reader.pages[-1].extract_text())
+
+    def test_command(self):
+        """Test that the command writes six labels per sheet"""
+        handle, path = tempfile.mkstemp(suffix='.pdf')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        out = StringIO()
+        call_command('print_shipping_labels', path, '--shipping-date', str(timezone.now().date()),
+                     '--per-sheet', '6', stdout=out)
+        self.assertIn('Wrote 7 label(s)', out.getvalue())
+        with open(path, 'rb') as output:
+            self.assertEqual(self.page_count(output.read()), 2)
+
+        with self.assertRaises(CommandError):
+            call_command('print_shipping_labels', path, '--shipping-date', '18/10/2026')
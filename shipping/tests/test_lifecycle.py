@@ -0,0 +1,111 @@
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from .. import lifecycle
+from ..admin import ShipmentAdmin, site
+from ..models import Shipment, ShippingAddress, TrackingEvent
+from ..shipments import create_shipments
+from ..tracking_events import get_tracking_map, ingest_events
+
+User = get_user_model()
+
+START = datetime(2026, 10, 18, 9, 0, tzinfo=dt_timezone.utc)
+
+
+class ShipmentLifecycleTestCase(TestCase):
+    def setUp(self):
+        get_tracking_map().clear()
+        self.user = User.objects.create_user(username='sender', password='testpass123')
+        self.address = ShippingAddress.objects.create(
+            user=self.user, first_name='Sam', last_name='Sender', address_line1='1 Main St', city='Fremont',
+            state='CA', postal_code='94536', country='US', phone_number='5551234567',
+        )
+
+    def shipment(self, status='pending'):
+        return Shipment.objects.create(
+            sender_address=self.address, recipient_address=self.address, package_type='parcel',
+            weight=Decimal('1'), length=Decimal('1'), width=Decimal('1'), height=Decimal('1'),
+            shipping_date=date(2026, 10, 18), shipping_cost=Decimal('10'), status=status,
+        )
+
+    def test_transitions(self):
+        """Test which status changes are allowed"""
+        self.assertTrue(lifecycle.can_transition('pending', 'shipped'))
+        self.assertTrue(lifecycle.can_transition('shipped', 'shipped'))
+        self.assertTrue(lifecycle.can_transition('shipped', 'cancelled'))
+        self.assertFalse(lifecycle.can_transition('cancelled', 'shipped'))
+        self.assertFalse(lifecycle.can_transition('delivered', 'shipped'))
+        self.assertEqual(lifecycle.FINAL_STATUSES, {'delivered', 'cancelled'})
+        with self.assertRaises(lifecycle.InvalidTransition):
+            lifecycle.check_transition('pending', 'lost')
+
+    def test_record_event_updates_latest_fields(self):
+        """Test that recording an event moves the status and the latest-event pointer together"""
+        shipment = self.shipment()
+        event = lifecycle.record_event(shipment, 'shipped', 'Oakland, CA', timestamp=START)
+        lifecycle.record_event(shipment, 'shipped', 'Reno, NV', timestamp=START + timedelta(hours=1))
+        shipment.refresh_from_db()
+        self.assertEqual(shipment.status, 'shipped')
+        self.assertEqual(shipment.latest_location, 'Reno, NV')
+        self.assertEqual(shipment.status_changed_at, event.timestamp)
+
+        # Late events are kept as history only
+        lifecycle.record_event(shipment, 'processing', 'Fremont, CA', timestamp=START - timedelta(hours=1))
+        shipment.refresh_from_db()
+        self.assertEqual((shipment.status, shipment.latest_location), ('shipped', 'Reno, NV'))
+        self.assertEqual(shipment.tracking_events.count(), 3)
+
+    def test_invalid_transition_is_rejected(self):
+        """Test that a newest event with an impossible status is refused and not stored"""
+        shipment = self.shipment('delivered')
+        with self.assertRaises(lifecycle.InvalidTransition):
+            lifecycle.record_event(shipment, 'shipped', 'Oakland, CA')
+        self.assertFalse(shipment.tracking_events.exists())
+
+    def test_ingest_keeps_invalid_transition_as_history(self):
+        """Test that an ingested event the status cannot move to is stored without changing the shipment"""
+        shipment = self.shipment('delivered')
+        result = ingest_events([
+            {'tracking_number': shipment.tracking_number, 'status': 'shipped', 'location': 'Oakland, CA',
+             'timestamp': START.isoformat()},
+        ])
+        self.assertEqual((result.created, result.history, result.errors), (1, 1, []))
+        shipment.refresh_from_db()
+        self.assertEqual((shipment.status, shipment.latest_event), ('delivered', None))
+
+    def test_cancel_view(self):
+        """Test that cancelling records the event and refuses delivered shipments"""
+        shipped = self.shipment('shipped')
+        delivered = self.shipment('delivered')
+        self.client.login(username='sender', password='testpass123')
+        self.client.post(reverse('shipping:cancel_shipment', args=[shipped.pk]))
+        self.client.post(reverse('shipping:cancel_shipment', args=[delivered.pk]))
+        shipped.refresh_from_db()
+        delivered.refresh_from_db()
+        self.assertEqual(shipped.status, 'cancelled')
+        self.assertEqual(shipped.latest_event.status, 'cancelled')
+        self.assertEqual(delivered.status, 'delivered')
+        self.assertFalse(TrackingEvent.objects.filter(shipment=delivered).exists())
+
+    def test_admin_status_is_read_only(self):
+        """Test that the shipment admin form cannot set the status outside the lifecycle"""
+        request = RequestFactory().get('/')
+        request.user = User.objects.create_superuser(username='admin', password='testpass123')
+        readonly_fields = ShipmentAdmin(Shipment, site).get_readonly_fields(request, self.shipment())
+        self.assertIn('status', readonly_fields)
+
+    def test_create_shipments_sets_latest_event(self):
+        """Test that new shipments point at their initial tracking event"""
+        spec = {
+            'sender_address': self.address, 'recipient_address': self.address, 'package_type': 'parcel',
+            'weight': Decimal('1'), 'length': Decimal('1'), 'width': Decimal('1'), 'height': Decimal('1'),
+            'shipping_date': date(2026, 10, 18),
+        }
+        shipments = create_shipments([spec, dict(spec)], created_by=self.user, invoice=False)
+        for shipment in Shipment.objects.filter(pk__in=[s.pk for s in shipments]).select_related('latest_event'):
+            self.assertEqual(shipment.latest_event.shipment_id, shipment.pk)
+            self.assertEqual(shipment.latest_location, shipment.latest_event.location)
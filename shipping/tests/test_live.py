@@ -0,0 +1,135 @@
+import asyncio
+import json
+import threading
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import lifecycle, live
+from ..models import Shipment, ShippingAddress
+from ..tracking_events import get_tracking_map, ingest_events
+
+START = datetime(2026, 10, 18, 9, 0, tzinfo=dt_timezone.utc)
+
+
+class LiveTrackingTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        get_tracking_map().clear()
+        address = ShippingAddress.objects.create(
+            first_name='Sam', last_name='Sender', address_line1='1 Main St', city='Fremont', state='CA',
+            postal_code='94536', country='US', phone_number='5551234567',
+        )
+        self.shipment = Shipment.objects.create(
+            sender_address=address, recipient_address=address, package_type='parcel',
+            weight=Decimal('1'), length=Decimal('1'), width=Decimal('1'), height=Decimal('1'),
+            shipping_date=date(2026, 10, 18), shipping_cost=Decimal('10'),
+        )
+        self.number = self.shipment.tracking_number
+
+    def record(self, status, location, hour):
+        with self.captureOnCommitCallbacks(execute=True):
+            lifecycle.record_event(self.shipment, status, location, timestamp=START.replace(hour=hour))
+
+    def ingest(self, status, location, hour):
+        with self.captureOnCommitCallbacks(execute=True):
+            ingest_events([{'tracking_number': self.number, 'status': status, 'location': location,
+                            'timestamp': START.replace(hour=hour).isoformat()}])
+
+    async def test_updates_send_snapshot_then_events(self):
+        """Test that subscribers get the current timeline and then each committed event"""
+        stream = live.updates(self.number)
+        try:
+            snapshot = json.loads(await anext(stream))
+            self.assertEqual((snapshot['type'], snapshot['status']), ('snapshot', 'pending'))
+
+            await sync_to_async(self.record)('processing', 'Fremont, CA', 10)
+            message = json.loads(await asyncio.wait_for(anext(stream), 5))
+            self.assertEqual((message['type'], message['status'], message['location']),
+                             ('event', 'processing', 'Fremont, CA'))
+
+            # Bulk ingestion publishes too
+            await sync_to_async(self.ingest)('shipped', 'Oakland, CA', 11)
+            message = json.loads(await asyncio.wait_for(anext(stream), 5))
+            self.assertEqual((message['status'], message['location']), ('shipped', 'Oakland, CA'))
+        finally:
+            await stream.aclose()
+        self.assertEqual(live.get_broker().subscribers(self.number), 0)
+
+    async def test_slow_subscriber_is_dropped(self):
+        """Test that a subscriber that falls behind is disconnected instead of buffering forever"""
+        broker = live.LocalBroker()
+        with override_settings(TRACKING_PUSH_QUEUE_SIZE=2):
+            async with broker.subscribe('PMB-1') as subscription:
+                for n in range(3):
+                    await asyncio.to_thread(broker.publish, 'PMB-1', str(n))
+                await asyncio.sleep(0)
+                self.assertEqual([await subscription.get(), await subscription.get()], ['0', '1'])
+                with self.assertRaises(live.SubscriberOverflow):
+                    await subscription.get()
+        self.assertEqual(broker.subscribers('PMB-1'), 0)
+
+    async def test_websocket(self):
+        """Test the WebSocket channel routed by the ASGI application"""
+        from pmb_hello.asgi import application
+
+        incoming = asyncio.Queue()
+        sent = asyncio.Queue()
+        scope = {'type': 'websocket', 'path': f'/ws/tracking/{self.number}/'}
+        await incoming.put({'type': 'websocket.connect'})
+        task = asyncio.ensure_future(application(scope, incoming.get, sent.put))
+
+        self.assertEqual((await asyncio.wait_for(sent.get(), 5))['type'], 'websocket.accept')
+        snapshot = json.loads((await asyncio.wait_for(sent.get(), 5))['text'])
+        self.assertEqual(snapshot['tracking_number'], self.number)
+
+        await sync_to_async(self.record)('processing', 'Fremont, CA', 10)
+        message = json.loads((await asyncio.wait_for(sent.get(), 5))['text'])
+        self.assertEqual(message['location'], 'Fremont, CA')
+
+        await incoming.put({'type': 'websocket.disconnect', 'code': 1000})
+        await asyncio.wait_for(task, 5)
+        self.assertEqual(live.get_broker().subscribers(self.number), 0)
+
+        # Unknown numbers are refused
+        await incoming.put({'type': 'websocket.connect'})
+        await application({'type': 'websocket', 'path': '/ws/tracking/NOPE/'}, incoming.get, sent.put)
+        self.assertEqual((await sent.get())['code'], live.CLOSE_NOT_FOUND)
+
+    async def test_event_stream_view(self):
+        """Test the server-sent events endpoint"""
+        response = await self.async_client.get(reverse('shipping:tracking_stream', args=[self.number]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        first = await anext(chunks)
+        self.assertTrue(first.startswith(b'data: '))
+        self.assertEqual(json.loads(first[6:])['type'], 'snapshot')
+        await chunks.aclose()
+
+        response = await self.async_client.get(reverse('shipping:tracking_stream', args=['NOPE']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_event_stream_needs_asgi(self):
+        """Test that the stream refuses WSGI requests and the tracking page subscribes to it"""
+        url = reverse('shipping:tracking_stream', args=[self.number])
+        self.assertEqual(self.client.get(url).status_code, 501)
+        self.assertContains(self.client.get(reverse('shipping:tracking', args=[self.number])), url)
+
+    def test_publish_from_another_thread(self):
+        """Test that publishing from a worker thread reaches a subscriber on an event loop"""
+        broker = live.LocalBroker()
+
+        async def listen():
+            async with broker.subscribe('PMB-1') as subscription:
+                thread = threading.Thread(target=broker.publish, args=('PMB-1', 'hello'))
+                thread.start()
+                message = await subscription.get(5)
+                thread.join()
+                return message
+
+        self.assertEqual(asyncio.run(listen()), 'hello')
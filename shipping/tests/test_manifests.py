@@ -0,0 +1,168 @@
+import csv
+import io
+import os
+import tempfile
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+from openpyxl import Workbook
+
+from .. import pricing
+from ..manifests import MANIFEST_COLUMNS, ManifestError, import_manifest
+from ..models import Invoice, Shipment, ShipmentItem, ShippingAddress
+
+User = get_user_model()
+
+
+def manifest_row(**overrides):
+    row = {
+        'sender_first_name': 'Sam', 'sender_last_name': 'Sender', 'sender_address_line1': '1 Main St',
+        'sender_city': 'Fremont', 'sender_state': 'CA', 'sender_postal_code': '94536', 'sender_country': 'US',
+        'sender_phone_number': '5551234567',
+        'recipient_first_name': 'Rita', 'recipient_last_name': 'Recipient', 'recipient_address_line1': '9 Elm St',
+        'recipient_city': 'Austin', 'recipient_state': 'TX', 'recipient_postal_code': '73301',
+        'recipient_country': 'US', 'recipient_phone_number': '5559876543',
+        'package_type': 'Parcel', 'weight': '2', 'length': '10', 'width': '10', 'height': '10',
+        'shipping_date': '2026-10-18', 'courier_service': 'fedex',
+        'item_name': 'Books', 'item_quantity': '3', 'item_description': 'Paperbacks',
+    }
+    row.update(overrides)
+    return row
+
+
+def csv_manifest(rows):
+    text = io.StringIO()
+    writer = csv.DictWriter(text, fieldnames=MANIFEST_COLUMNS)
+    writer.writeheader()
+    writer.writerows(rows)
+    return io.BytesIO(text.getvalue().encode('utf-8'))
+
+
+def xlsx_manifest(rows):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(list(MANIFEST_COLUMNS))
+    for row in rows:
+        sheet.append([row.get(column) for column in MANIFEST_COLUMNS])
+    handle = io.BytesIO()
+    workbook.save(handle)
+    handle.seek(0)
+    return handle
+
+
+class ManifestImportTestCase(TestCase):
+    def setUp(self):
+        pricing.invalidate_rate_index()
+        self.customer = User.objects.create_user(username='acme', password='testpass123')
+        self.staff = User.objects.create_user(username='staff', password='testpass123', is_staff=True)
+
+    def test_csv_import(self):
+        """Test that a CSV manifest creates priced shipments, items and invoices"""
+        rows = [manifest_row(recipient_first_name=f'Rita {n}') for n in range(5)]
+        result = import_manifest(csv_manifest(rows), 'manifest.csv', self.customer, created_by=self.staff)
+        self.assertEqual((result.rows, result.imported, result.errors), (5, 5, []))
+
+        shipment = Shipment.objects.select_related('sender_address').first()
+        expected_cost = pricing.quote(pricing.DEFAULT_ZONE, 'parcel', Decimal('2'),
+                                      dimensions=(10, 10, 10), courier_service='FEDEX').amount
+        self.assertEqual(shipment.shipping_cost, expected_cost)
+        self.assertEqual((shipment.package_type, shipment.courier_service), ('parcel', 'FEDEX'))
+        self.assertEqual(shipment.shipping_date, date(2026, 10, 18))
+        self.assertEqual(shipment.sender_address.user, self.customer)
+        self.assertEqual(ShipmentItem.objects.get(shipment=shipment).quantity, 3)
+        self.assertEqual(Invoice.objects.filter(customer=self.customer, created_by=self.staff).count(), 5)
+
+    def test_xlsx_import(self):
+        """Test that an Excel manifest with numeric cells and date cells imports"""
+        rows = [manifest_row(weight=2.5, sender_postal_code=94536, shipping_date=date(2026, 10, 19))]
+        result = import_manifest(xlsx_manifest(rows), 'manifest.xlsx', self.customer)
+        self.assertEqual(result.imported, 1)
+        shipment = Shipment.objects.select_related('sender_address').get()
+        self.assertEqual(shipment.weight, Decimal('2.50'))
+        self.assertEqual(shipment.sender_address.postal_code, '94536')
+        self.assertEqual(shipment.shipping_date, date(2026, 10, 19))
+
+    def test_addresses_are_deduplicated(self):
+        """Test that repeated and already known addresses are stored once"""
+        existing = ShippingAddress.objects.create(
+            user=self.customer, first_name='Sam', last_name='Sender', address_line1='1 Main St', city='Fremont',
+            state='CA', postal_code='94536', country='US', phone_number='5551234567',
+        )
+        rows = [manifest_row(sender_city='FREMONT') for _ in range(4)]
+        import_manifest(csv_manifest(rows), 'manifest.csv', self.customer, batch_size=3)
+        self.assertEqual(set(Shipment.objects.values_list('sender_address', flat=True)), {existing.pk})
+        self.assertEqual(ShippingAddress.objects.filter(city='Austin').count(), 1)
+
+    def test_invalid_rows_are_reported(self):
+        """Test that rows with errors are skipped and reported with their line numbers"""
+        rows = [
+            manifest_row(tracking_number='ACME-1'),
+            manifest_row(weight='heavy', package_type='crate'),
+            manifest_row(tracking_number='ACME-1'),
+            manifest_row(recipient_city=''),
+        ]
+        result = import_manifest(csv_manifest(rows), 'manifest.csv', self.customer)
+        self.assertEqual(result.imported, 1)
+        errors = dict(result.errors)
+        self.assertEqual(set(errors), {3, 4, 5})
+        self.assertEqual(set(errors[3]), {'weight', 'package_type'})
+        self.assertIn('Duplicate of line 2', errors[4]['tracking_number'][0])
+        self.assertEqual(errors[5], {'recipient_city': ['This field is required.']})
+
+        # Importing again finds the tracking number in the database
+        result = import_manifest(csv_manifest(rows[:1]), 'manifest.csv', self.customer)
+        self.assertEqual(result.imported, 0)
+        self.assertIn('already exists', result.errors[0][1]['tracking_number'][0])
+
+    def test_dry_run(self):
+        """Test that a dry run validates without writing"""
+        result = import_manifest(csv_manifest([manifest_row()] * 3), 'manifest.csv', self.customer, dry_run=True)
+        self.assertEqual((result.rows, result.valid, result.imported), (3, 3, 0))
+        self.assertFalse(Shipment.objects.exists())
+        self.assertFalse(ShippingAddress.objects.exists())
+
+    def test_unreadable_manifests(self):
+        """Test that missing columns and unknown formats are rejected"""
+        with self.assertRaises(ManifestError):
+            import_manifest(io.BytesIO(b'name,weight\nSam,2\n'), 'manifest.csv', self.customer)
+        with self.assertRaises(ManifestError):
+            import_manifest(io.BytesIO(b''), 'manifest.txt', self.customer)
+
+    def test_command(self):
+        """Test the import_shipments management command"""
+        path = self.tmp_manifest([manifest_row(), manifest_row(weight='-1')])
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_shipments', path, customer='acme', created_by='staff', stdout=out, stderr=err)
+        self.assertIn('Imported 1 of 2 shipment(s)', out.getvalue())
+        self.assertIn('Line 3: weight', err.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('import_shipments', path, customer='nobody', stdout=out, stderr=err)
+
+    def tmp_manifest(self, rows):
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'wb') as manifest:
+            manifest.write(csv_manifest(rows).getvalue())
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_admin_upload(self):
+        """Test uploading a manifest through the shipment admin"""
+        admin_user = User.objects.create_superuser(username='admin', password='testpass123')
+        self.client.force_login(admin_user)
+        url = reverse('admin:shipping_shipment_import')
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        upload = SimpleUploadedFile('manifest.csv', csv_manifest([manifest_row()] * 2).getvalue())
+        response = self.client.post(url, {'customer': self.customer.pk, 'manifest': upload,
+                                          'create_invoices': 'on'})
+        self.assertRedirects(response, reverse('admin:shipping_shipment_changelist'), fetch_redirect_response=False)
+        self.assertEqual(Shipment.objects.count(), 2)
+        self.assertEqual(Invoice.objects.filter(created_by=admin_user).count(), 2)
+
+        self.client.force_login(self.staff)
+        self.assertNotEqual(self.client.get(url).status_code, 200)
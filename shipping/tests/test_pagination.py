@@ -0,0 +1,67 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Bill
+from ..pagination import decode_cursor, encode_cursor, keyset_paginate
+
+User = get_user_model()
+
+class KeysetPaginationTestCase(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='testpass123')
+        due = timezone.now().date() + timedelta(days=10)
+        for amount in range(5):
+            Bill.objects.create(customer=self.customer, amount=Decimal(amount + 1), due_date=due)
+        # Two bills share a timestamp so the id tie-break is exercised
+        Bill.objects.filter(pk__in=Bill.objects.order_by('pk').values('pk')[:2]).update(
+            created_at=timezone.now() - timedelta(days=1))
+        self.expected = list(Bill.objects.order_by('-created_at', '-pk'))
+
+    def test_cursor_round_trip(self):
+        """Test that cursors decode to the values they encode and bad cursors are ignored"""
+        bill = self.expected[0]
+        self.assertEqual(decode_cursor(encode_cursor(bill.created_at, bill.pk)), (bill.created_at, bill.pk))
+        self.assertIsNone(decode_cursor('not-a-cursor'))
+        self.assertIsNone(decode_cursor(''))
+
+    def test_walk_forward_and_back(self):
+        """Test that older and newer pages cover every bill exactly once"""
+        seen = []
+        page = keyset_paginate(Bill.objects.all(), 2)
+        self.assertFalse(page.has_previous())
+        pages = [page]
+        while page.has_next():
+            with self.assertNumQueries(1):
+                page = keyset_paginate(Bill.objects.all(), 2, after=page.next_cursor)
+            pages.append(page)
+        for page in pages:
+            seen.extend(page.object_list)
+        self.assertEqual(seen, self.expected)
+
+        back = keyset_paginate(Bill.objects.all(), 2, before=pages[-1].previous_cursor)
+        self.assertEqual(back.object_list, pages[-2].object_list)
+
+    def test_bill_list_view(self):
+        """Test that the bill list pages by cursor"""
+        self.client.force_login(self.customer)
+        url = reverse('shipping:bill_list')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['bills']), self.expected)
+        self.assertIsNone(response.context['paginator'])
+
+    def test_bill_api_cursor_pagination(self):
+        """Test that the bill API returns cursor links instead of page numbers"""
+        self.client.force_login(self.customer)
+        response = self.client.get('/api/bills/', {'page_size': 4})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([bill['id'] for bill in data['results']], [bill.pk for bill in self.expected[:4]])
+        self.assertIn('cursor=', data['next'])
+        older = self.client.get(data['next']).json()
+        self.assertEqual([bill['id'] for bill in older['results']], [bill.pk for bill in self.expected[4:]])
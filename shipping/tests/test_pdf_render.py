@@ -0,0 +1,74 @@
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Bill
+from ..pdf_render import cache_dir, get_or_render_pdf, pdf_digest
+
+User = get_user_model()
+
+class PdfRenderTestCase(TestCase):
+    def setUp(self):
+        self.pdf_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.pdf_dir, ignore_errors=True)
+        settings_override = override_settings(PDF_CACHE_DIR=self.pdf_dir, PDF_RENDER_WORKERS=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.staff = User.objects.create_user(username='staff', password='testpass123', is_staff=True)
+        self.bill = Bill.objects.create(customer=self.staff, amount=Decimal('42.00'),
+                                        due_date=timezone.now().date() + timedelta(days=10))
+
+    def cached_files(self):
+        return sorted(path.name for path in cache_dir().glob('*.pdf'))
+
+    def test_digest_depends_on_content(self):
+        """Test that the content address changes with the HTML and stylesheet"""
+        self.assertEqual(pdf_digest('<p>a</p>'), pdf_digest('<p>a</p>'))
+        self.assertNotEqual(pdf_digest('<p>a</p>'), pdf_digest('<p>b</p>'))
+        self.assertNotEqual(pdf_digest('<p>a</p>'), pdf_digest('<p>a</p>', 'p {color: red}'))
+
+    def test_bill_pdf_cached_and_invalidated(self):
+        """Test that bill PDFs are rendered once and dropped when the bill is saved"""
+        self.client.force_login(self.staff)
+        url = reverse('shipping:export_bill_pdf', args=[self.bill.id])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+        files = self.cached_files()
+        self.assertEqual(len(files), 1)
+        self.assertTrue(files[0].startswith(f'bill_{self.bill.id}_'))
+
+        self.client.get(url)
+        self.assertEqual(self.cached_files(), files)
+
+        self.bill.amount = Decimal('50.00')
+        self.bill.save()
+        self.assertEqual(self.cached_files(), [])
+
+    @override_settings(PDF_RENDER_WORKERS=1)
+    def test_render_in_worker_pool(self):
+        """Test that documents render in the worker pool"""
+        path = get_or_render_pdf('test', 1, '<html><body><p>Hello</p></body></html>', timeout=60)
+        self.assertIsNotNone(path)
+        self.assertTrue(path.read_bytes().startswith(b'%PDF'))
+
+    def test_concurrent_in_process_renders(self):
+        """Test that request threads rendering the same document never share a temporary file"""
+        html = '<html><body>' + '<p>Line</p>' * 200 + '</body></html>'
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            paths = list(pool.map(lambda _: get_or_render_pdf('test', 2, html), range(4)))
+        self.assertEqual(len(set(paths)), 1)
+        data = paths[0].read_bytes()
+        self.assertTrue(data.startswith(b'%PDF'))
+        self.assertTrue(data.rstrip().endswith(b'%%EOF'))
+        self.assertEqual(list(cache_dir().glob('*.tmp')), [])
@@ -0,0 +1,83 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import F
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import pricing
+from ..models import RateCard, RateCardSurcharge, RateCardVersion, RateCardWeightBreak
+from ..views import calculate_shipping_cost
+
+
+class PricingEngineTestCase(TestCase):
+    def setUp(self):
+        pricing.invalidate_rate_index()
+        self.addCleanup(pricing.invalidate_rate_index)
+
+    def test_seeded_default_zone(self):
+        """Test that the seeded default rates match the previous web form prices"""
+        self.assertEqual(calculate_shipping_cost('document', 1), Decimal('7.00'))
+        self.assertEqual(calculate_shipping_cost('fragile', Decimal('2.5')), Decimal('25.00'))
+        self.assertEqual(calculate_shipping_cost('medicine', 1), Decimal('12.00'))
+
+    def test_seeded_routes(self):
+        """Test that the seeded route rates match the previous API quote math"""
+        quote = pricing.quote('india-to-usa', 'package', 2.3, dimensions=(30, 20, 25))
+        self.assertEqual(quote.amount, Decimal('6750'))
+        self.assertEqual(quote.currency, 'INR')
+        self.assertEqual(quote.chargeable_weight, Decimal('3'))
+        self.assertEqual(quote.transit_time, '10-15 business days')
+
+        quote = pricing.quote('usa-to-india', 'document', 3, dimensions=(10, 10, 10), weight_unit='lb')
+        self.assertEqual(quote.amount, Decimal('3402'))
+
+    def test_quote_uses_no_queries(self):
+        """Test that quotes are served from the in-memory index"""
+        pricing.quote('default', 'parcel', 1)
+        with self.assertNumQueries(0):
+            for weight in range(1, 50):
+                pricing.quote('default', 'parcel', weight)
+
+    def test_weight_breaks_surcharges_and_validity(self):
+        """Test weight breaks, courier surcharges and validity windows"""
+        now = timezone.now()
+        card = RateCard.objects.create(name='Express', zone='express', per_kg_rate=Decimal('10.00'),
+                                       base_rate=Decimal('5.00'))
+        RateCardWeightBreak.objects.create(rate_card=card, min_weight=Decimal('10'), per_kg_rate=Decimal('8.00'))
+        RateCardSurcharge.objects.create(rate_card=card, name='Fuel', percent=Decimal('10'))
+        RateCardSurcharge.objects.create(rate_card=card, name='DHL handling', courier_service='DHL',
+                                         flat_amount=Decimal('3.00'))
+        promo = RateCard.objects.create(name='Promo', zone='express', per_kg_rate=Decimal('1.00'), priority=5,
+                                        valid_from=now + timedelta(days=1))
+
+        self.assertEqual(pricing.quote('express', 'parcel', 2).amount, Decimal('27.50'))
+        self.assertEqual(pricing.quote('express', 'parcel', 10).amount, Decimal('93.50'))
+        self.assertEqual(pricing.quote('express', 'parcel', 2, courier_service='DHL').amount, Decimal('30.50'))
+        self.assertEqual(pricing.quote('express', 'parcel', 2, at=now + timedelta(days=2)).rate_card_id, promo.id)
+
+    def test_index_reloads_on_change(self):
+        """Test that editing a rate card is picked up by the next quote"""
+        self.assertEqual(pricing.quote('default', 'parcel', 1).amount, Decimal('12.00'))
+        card = RateCard.objects.get(zone='default', package_type='parcel')
+        card.base_rate = Decimal('11.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            card.save()
+        self.assertEqual(pricing.quote('default', 'parcel', 1).amount, Decimal('13.00'))
+
+    def test_other_process_change_is_seen_at_next_check(self):
+        """Test that a version bump made elsewhere is picked up once the check interval passes"""
+        index = pricing.get_rate_index()
+        # Another process changed a card and bumped the shared version
+        RateCard.objects.filter(zone='default', package_type='parcel').update(base_rate=Decimal('11.00'))
+        RateCardVersion.objects.filter(pk=pricing.VERSION_ROW).update(version=F('version') + 1)
+        with self.assertNumQueries(0):
+            self.assertIs(pricing.get_rate_index(), index)
+        with self.settings(RATE_CARD_VERSION_CHECK_INTERVAL=0):
+            self.assertIsNot(pricing.get_rate_index(), index)
+        self.assertEqual(pricing.quote('default', 'parcel', 1).amount, Decimal('13.00'))
+
+    def test_missing_zone(self):
+        """Test that unknown zones raise NoRateError"""
+        with self.assertRaises(pricing.NoRateError):
+            pricing.quote('mars', 'parcel', 1)
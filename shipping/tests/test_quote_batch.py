@@ -0,0 +1,113 @@
+import json
+import math
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from .. import fx, pricing
+
+PACKAGE = {
+    "shipping_route": "india-to-usa",
+    "type": "package",
+    "origin": "mumbai",
+    "destination": "new-york",
+    "weight": 2.3,
+    "weight_metric": "kg",
+    "dim_length": 30,
+    "dim_width": 20,
+    "dim_height": 25,
+    "usd_rate": 83.2,
+}
+
+
+class QuoteBatchTestCase(TestCase):
+    url = '/api/quote/batch/'
+
+    def setUp(self):
+        pricing.invalidate_rate_index()
+        self.addCleanup(pricing.invalidate_rate_index)
+
+    def post_json(self, payload):
+        return self.client.post(self.url, json.dumps(payload), content_type='application/json')
+
+    def single_quote(self, package):
+        return self.client.post('/api/quote/', json.dumps(package), content_type='application/json').json()
+
+    def test_matches_single_quotes(self):
+        """Test that every batch row is priced exactly like QuoteView"""
+        packages = [
+            PACKAGE,
+            dict(PACKAGE, type="document", weight=0.4, dim_length=10, dim_width=10, dim_height=2),
+            dict(PACKAGE, shipping_route="usa-to-india", origin="chicago", destination="delhi",
+                 weight=3, weight_metric="lb", usd_rate=82.5),
+            dict(PACKAGE, weight=17.35, dim_length=61, dim_width=47, dim_height=33),
+        ]
+        response = self.post_json(packages)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body['count'], body['priced'], body['failed']), (4, 4, 0))
+        for index, (package, result) in enumerate(zip(packages, body['results'])):
+            expected = self.single_quote(package)
+            self.assertEqual(result, dict(expected, index=index))
+
+    def test_price_many_matches_price(self):
+        """Test that the vectorized pricing agrees with the Decimal pricing"""
+        rate = pricing.get_rate_index().find('default', 'parcel')
+        packages = [{'weight': weight / 7, 'weight_unit': unit}
+                    for weight in range(1, 200) for unit in ('kg', 'lb')]
+        for package, quote in zip(packages, pricing.price_many(rate, packages)):
+            expected = pricing.price(rate, package['weight'], weight_unit=package['weight_unit'])
+            self.assertEqual(quote.amount, expected.amount)
+
+    def test_row_errors_keep_input_order(self):
+        """Test that invalid rows report errors without failing the batch"""
+        packages = [
+            dict(PACKAGE, weight="heavy"),
+            PACKAGE,
+            dict(PACKAGE, origin="chicago"),
+            {key: value for key, value in PACKAGE.items() if key != "dim_width"},
+            "not a package",
+        ]
+        response = self.post_json({"packages": packages})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([result['index'] for result in results], [0, 1, 2, 3, 4])
+        self.assertEqual(results[0]['errors'], {"weight": ["A valid number is required."]})
+        self.assertIn('inr_price', results[1])
+        self.assertIn('origin', results[2]['errors'])
+        self.assertEqual(results[3]['errors'], {"dim_width": ["This field is required."]})
+        self.assertIn('non_field_errors', results[4]['errors'])
+
+    def test_csv_upload(self):
+        """Test pricing a CSV manifest"""
+        header = ','.join(PACKAGE)
+        line = ','.join(str(value) for value in PACKAGE.values())
+        upload = SimpleUploadedFile('manifest.csv', f'{header}\n{line}\n\n{line}\n'.encode(), content_type='text/csv')
+        response = self.client.post(self.url, {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]['inr_price'], 6750)
+        self.assertEqual(results[0]['usd_price'], math.ceil(6750 / 83.2))
+
+    @override_settings(QUOTE_BATCH_MAX_ROWS=2)
+    def test_rejects_bad_batches(self):
+        """Test that oversized, empty and non-list payloads are rejected"""
+        self.assertEqual(self.post_json([PACKAGE] * 3).status_code, 400)
+        self.assertEqual(self.post_json([]).status_code, 400)
+        self.assertEqual(self.post_json(PACKAGE).status_code, 400)
+
+    def test_batch_query_count(self):
+        """Test that a batch is priced from the rate index without per-row queries"""
+        self.post_json([PACKAGE])
+        with self.assertNumQueries(0):
+            self.post_json([PACKAGE] * 200)
+
+    @override_settings(FX_RATES_PROVIDER='mock')
+    def test_server_side_usd_rate(self):
+        """Test that rows without usd_rate use the server-side exchange rate"""
+        fx.reset_rate_store()
+        self.addCleanup(fx.reset_rate_store)
+        package = {key: value for key, value in PACKAGE.items() if key != "usd_rate"}
+        result = self.post_json([package])
+        self.assertEqual(result.json()['results'][0]['usd_rate'], 83.0)
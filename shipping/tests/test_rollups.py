@@ -0,0 +1,99 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils import timezone
+
+from ..models import Bill, BillDailyRollup
+from ..rollups import pacific_day, rebuild_bill_rollups, update_bills
+
+User = get_user_model()
+
+class BillRollupTestCase(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='testpass123')
+        self.today = pacific_day(timezone.now())
+
+    def create_bill(self, amount, status='PENDING', **kwargs):
+        return Bill.objects.create(
+            customer=self.customer,
+            amount=Decimal(amount),
+            status=status,
+            due_date=timezone.now().date() + timedelta(days=10),
+            **kwargs
+        )
+
+    def rollup(self, status, payment_method='CASH', courier_service=''):
+        return BillDailyRollup.objects.get(
+            day=self.today, status=status,
+            payment_method=payment_method, courier_service=courier_service
+        )
+
+    def snapshot(self):
+        return sorted(BillDailyRollup.objects.filter(bill_count__gt=0).values_list(
+            'day', 'status', 'payment_method', 'courier_service', 'bill_count', 'amount'
+        ))
+
+    def test_create_updates_rollup(self):
+        """Test that creating bills adds them to the rollup"""
+        self.create_bill('100.00')
+        self.create_bill('50.00')
+        rollup = self.rollup('PENDING')
+        self.assertEqual(rollup.bill_count, 2)
+        self.assertEqual(rollup.amount, Decimal('150.00'))
+
+    def test_status_change_moves_bill(self):
+        """Test that a status change moves the bill between rollup rows"""
+        bill = self.create_bill('100.00')
+        bill.mark_as_paid()
+        self.assertEqual(self.rollup('PENDING').bill_count, 0)
+        self.assertEqual(self.rollup('PAID').bill_count, 1)
+        self.assertEqual(self.rollup('PAID').amount, Decimal('100.00'))
+
+    def test_amount_change_updates_rollup(self):
+        """Test that editing the amount adjusts the rollup total"""
+        bill = self.create_bill('100.00')
+        bill.amount = Decimal('80.00')
+        bill.save()
+        rollup = self.rollup('PENDING')
+        self.assertEqual(rollup.bill_count, 1)
+        self.assertEqual(rollup.amount, Decimal('80.00'))
+
+    def test_delete_updates_rollup(self):
+        """Test that deleting a bill removes it from the rollup"""
+        bill = self.create_bill('100.00', courier_service='UPS')
+        bill.delete()
+        rollup = self.rollup('PENDING', courier_service='UPS')
+        self.assertEqual(rollup.bill_count, 0)
+        self.assertEqual(rollup.amount, Decimal('0.00'))
+
+    def test_bulk_update_keeps_rollup_in_sync(self):
+        """Test that update_bills rebuilds the affected days"""
+        self.create_bill('100.00')
+        self.create_bill('20.00', status='PAID')
+        updated = update_bills(Bill.objects.filter(status='PENDING'), status='OVERDUE')
+        self.assertEqual(updated, 1)
+        self.assertEqual(self.rollup('OVERDUE').bill_count, 1)
+        self.assertFalse(BillDailyRollup.objects.filter(status='PENDING').exists())
+
+    def test_rebuild_matches_incremental(self):
+        """Test that a full rebuild matches the incrementally maintained rows"""
+        self.create_bill('100.00')
+        paid = self.create_bill('30.00', payment_method='ZELLE')
+        paid.mark_as_paid()
+        self.create_bill('12.50', courier_service='DHL').delete()
+        incremental = self.snapshot()
+
+        BillDailyRollup.objects.all().delete()
+        rebuild_bill_rollups()
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_rebuild_command(self):
+        """Test the rebuild_billing_rollups management command"""
+        self.create_bill('100.00')
+        BillDailyRollup.objects.all().delete()
+        call_command('rebuild_billing_rollups', since=str(self.today), until=str(self.today), stdout=StringIO())
+        self.assertEqual(self.rollup('PENDING').bill_count, 1)
@@ -0,0 +1,79 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import Bill, BillSearchDocument, Shipment, ShippingAddress
+from ..search import search_bills
+
+User = get_user_model()
+
+class BillSearchTestCase(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='testpass123', first_name='Alice',
+                                              last_name='Walker', email='alice@example.com')
+        self.bob = User.objects.create_user(username='bob', password='testpass123', first_name='Bob',
+                                            last_name='Stone', email='bob@example.org')
+        due = timezone.now().date() + timedelta(days=10)
+        address = ShippingAddress.objects.create(
+            user=self.alice, first_name='Alice', last_name='Walker', address_line1='1 Main St',
+            city='Austin', state='TX', country='US', postal_code='78701', phone_number='5550100',
+        )
+        self.shipment = Shipment.objects.create(
+            sender_address=address, recipient_address=address, package_type='parcel',
+            weight=Decimal('2.00'), length=10, width=10, height=10,
+            tracking_number='PMB-20261018-ABC12', shipping_date=timezone.now().date(),
+            shipping_cost=Decimal('10.00'),
+        )
+        self.alice_bill = Bill.objects.create(customer=self.alice, amount=Decimal('10.00'),
+                                              description='Electronics shipment', due_date=due,
+                                              shipment=self.shipment)
+        self.bob_bill = Bill.objects.create(customer=self.bob, amount=Decimal('20.00'),
+                                            description='Spices and clothes', due_date=due)
+
+    def search(self, term):
+        return list(search_bills(Bill.objects.order_by('pk'), term))
+
+    def test_documents_created_on_save(self):
+        """Test that saving a bill writes its search document"""
+        document = BillSearchDocument.objects.get(bill=self.alice_bill)
+        self.assertEqual(document.tracking_number, 'PMB-20261018-ABC12')
+        self.assertIn('electronics', document.document)
+        self.assertIn('alice@example.com', document.document)
+
+    def test_full_text_search(self):
+        """Test word and prefix matching across bill and customer fields"""
+        self.assertEqual(self.search('electronics'), [self.alice_bill])
+        self.assertEqual(self.search('Stone spic'), [self.bob_bill])
+        self.assertEqual(self.search('example'), [self.alice_bill, self.bob_bill])
+        self.assertEqual(self.search('nothing here'), [])
+
+    def test_exact_id_and_tracking_number(self):
+        """Test that bill ids and tracking numbers are looked up exactly"""
+        self.assertEqual(self.search(str(self.bob_bill.pk)), [self.bob_bill])
+        self.assertEqual(self.search(f'#{self.alice_bill.pk}'), [self.alice_bill])
+        self.assertEqual(self.search('pmb-20261018-abc12'), [self.alice_bill])
+
+    def test_customer_change_reindexes_bills(self):
+        """Test that renaming a customer updates their bills' documents"""
+        self.bob.last_name = 'Rivers'
+        self.bob.save()
+        self.assertEqual(self.search('rivers'), [self.bob_bill])
+        self.assertEqual(self.search('stone'), [])
+
+    def test_deleted_bill_not_found(self):
+        """Test that deleted bills drop out of the index"""
+        self.bob_bill.delete()
+        self.assertEqual(self.search('spices'), [])
+
+    def test_rebuild_command(self):
+        """Test that the rebuild command re-creates missing documents"""
+        BillSearchDocument.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_bill_search_index', stdout=out)
+        self.assertIn('Indexed 2 bill(s)', out.getvalue())
+        self.assertEqual(self.search('clothes'), [self.bob_bill])
@@ -0,0 +1,159 @@
+import json
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+
+from .. import pricing
+from ..activity import ActivityHistory
+from ..models import Invoice, Shipment, ShipmentItem, ShippingAddress, TrackingEvent
+from ..shipments import create_shipment, create_shipments
+from ..tracking_numbers import is_valid_tracking_number
+
+User = get_user_model()
+
+ADDRESS = {
+    'first_name': 'Sam', 'last_name': 'Sender', 'address_line1': '1 Main St', 'city': 'Fremont',
+    'state': 'CA', 'postal_code': '94536', 'country': 'US', 'phone_number': '5551234567',
+}
+
+
+class ShipmentServiceTestCase(TestCase):
+    def setUp(self):
+        pricing.invalidate_rate_index()
+        self.user = User.objects.create_user(username='sender', password='testpass123')
+        self.sender = ShippingAddress.objects.create(user=self.user, **ADDRESS)
+        self.recipient = ShippingAddress.objects.create(**dict(ADDRESS, first_name='Rita'))
+
+    def spec(self, items=0, **kwargs):
+        spec = {
+            'sender_address': self.sender, 'recipient_address': self.recipient, 'package_type': 'parcel',
+            'weight': Decimal('2.00'), 'length': Decimal('10'), 'width': Decimal('10'), 'height': Decimal('10'),
+            'shipping_date': date(2026, 10, 18), 'courier_service': 'DHL',
+            'items': [{'name': f'Item {n}', 'quantity': n + 1, 'description': 'Books'} for n in range(items)],
+        }
+        spec.update(kwargs)
+        return spec
+
+    def count_queries(self, spec):
+        with CaptureQueriesContext(connection) as context:
+            create_shipment(spec, created_by=self.user)
+        return len(context.captured_queries)
+
+    def test_full_graph(self):
+        """Test that the shipment comes back with items, event and invoice attached"""
+        shipment = create_shipment(self.spec(items=3), created_by=self.user)
+        self.assertTrue(is_valid_tracking_number(shipment.tracking_number))
+        self.assertEqual(shipment.shipping_cost, Decimal('14.00'))
+        with self.assertNumQueries(0):
+            self.assertEqual([item.quantity for item in shipment.items.all()], [1, 2, 3])
+            self.assertEqual([event.status for event in shipment.tracking_events.all()], ['pending'])
+            self.assertEqual(shipment.invoice.total_amount, Decimal('14.00'))
+            self.assertEqual(shipment.sender_address.user, self.user)
+
+        self.assertEqual(ShipmentItem.objects.filter(shipment=shipment).count(), 3)
+        self.assertEqual(TrackingEvent.objects.filter(shipment=shipment).count(), 1)
+        invoice = Invoice.objects.get(shipment=shipment)
+        self.assertEqual((invoice.customer, invoice.status), (self.user, 'SENT'))
+        self.assertEqual(
+            set(ActivityHistory.objects.values_list('action', flat=True)),
+            {'Created shipment', 'Invoice Generated from Shipment'},
+        )
+
+    def test_constant_queries(self):
+        """Test that the number of queries does not depend on the number of items"""
+        self.count_queries(self.spec(items=1))
+        self.assertEqual(self.count_queries(self.spec(items=1)), self.count_queries(self.spec(items=200)))
+
+    def test_batch_with_new_addresses(self):
+        """Test creating several shipments with inline addresses"""
+        specs = [self.spec(sender_address=dict(ADDRESS), recipient_address=dict(ADDRESS, city='Austin'), items=2)
+                 for _ in range(3)]
+        shipments = create_shipments(specs, created_by=self.user)
+        self.assertEqual(len({shipment.tracking_number for shipment in shipments}), 3)
+        self.assertEqual(ShippingAddress.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(ShippingAddress.objects.filter(city='Austin', user=None).count(), 1)
+        self.assertEqual({shipment.sender_address.pk for shipment in shipments}, {self.sender.pk})
+        self.assertEqual(len({shipment.recipient_address.pk for shipment in shipments}), 1)
+        self.assertEqual(Invoice.objects.count(), 3)
+
+    def test_address_dedupe_ignores_case_and_owner(self):
+        """Test that addresses are matched ignoring case and whitespace, but only for the same owner"""
+        other = User.objects.create_user(username='other', password='testpass123')
+        messy = dict(ADDRESS, first_name=' SAM ', address_line1='1  main st')
+        mine = create_shipment(self.spec(sender_address=messy), created_by=self.user)
+        theirs = create_shipment(self.spec(sender_address=messy), created_by=other)
+        self.assertEqual(mine.sender_address.pk, self.sender.pk)
+        self.assertNotEqual(theirs.sender_address.pk, self.sender.pk)
+        self.assertEqual(theirs.sender_address.user, other)
+
+    def test_no_customer(self):
+        """Test that shipments without a customer are created without an invoice"""
+        shipment = create_shipment(self.spec(sender_address=self.recipient))
+        with self.assertNumQueries(0):
+            self.assertIsNone(getattr(shipment, 'invoice', None))
+        self.assertFalse(Invoice.objects.exists())
+
+
+class ShipmentCreationViewsTestCase(TestCase):
+    def setUp(self):
+        pricing.invalidate_rate_index()
+        self.user = User.objects.create_user(username='sender', password='testpass123')
+        self.sender = ShippingAddress.objects.create(user=self.user, **ADDRESS)
+        self.recipient = ShippingAddress.objects.create(user=self.user, **dict(ADDRESS, first_name='Rita'))
+        self.client.force_login(self.user)
+
+    def payload(self, **kwargs):
+        payload = {
+            'sender_address': ADDRESS, 'recipient_address': dict(ADDRESS, city='Austin'),
+            'package_type': 'parcel', 'weight': '1.00', 'length': '1.00', 'width': '1.00', 'height': '1.00',
+            'shipping_date': '2026-10-18',
+            'items': [{'name': 'Shoes', 'quantity': 2, 'description': 'Sneakers'}],
+        }
+        payload.update(kwargs)
+        return payload
+
+    def test_web_form(self):
+        """Test that the web form creates the shipment, its items and its invoice"""
+        response = self.client.post(reverse('shipping:create_shipment'), {
+            'sender_address': self.sender.pk, 'recipient_address': self.recipient.pk, 'package_type': 'document',
+            'weight': '1.0', 'length': '10', 'width': '10', 'height': '1', 'shipping_date': '2026-10-18',
+            'courier_service': 'DHL',
+            'item_name': ['Letters', ''], 'item_quantity': ['2', '1'], 'item_description': ['Legal', 'x'],
+        })
+        shipment = Shipment.objects.get()
+        self.assertRedirects(response, reverse('shipping:shipment_detail', args=[shipment.pk]),
+                             fetch_redirect_response=False)
+        self.assertEqual(shipment.shipping_cost, Decimal('7.00'))
+        self.assertEqual(list(shipment.items.values_list('name', 'quantity')), [('Letters', 2)])
+        self.assertTrue(Invoice.objects.filter(shipment=shipment).exists())
+
+    def test_api_create(self):
+        """Test that shipments created through the API get a tracking number, items and addresses"""
+        response = self.client.post('/api/shipments/', json.dumps(self.payload()), content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content)
+        body = response.json()
+        self.assertTrue(is_valid_tracking_number(body['tracking_number']))
+        self.assertEqual(body['items'][0]['name'], 'Shoes')
+        self.assertEqual(body['sender_address']['user'], self.user.pk)
+        self.assertEqual(len(body['tracking_events']), 1)
+
+    def test_api_batch(self):
+        """Test that the batch endpoint creates all shipments or none"""
+        url = '/api/shipments/batch/'
+        response = self.client.post(url, json.dumps([self.payload(), self.payload(weight='abc')]),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()[0], {})
+        self.assertIn('weight', response.json()[1])
+        self.assertFalse(Shipment.objects.exists())
+
+        response = self.client.post(url, json.dumps([self.payload() for _ in range(3)]),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(len({shipment['tracking_number'] for shipment in response.json()}), 3)
+        self.assertEqual(ShipmentItem.objects.count(), 3)
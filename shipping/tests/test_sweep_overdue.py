@@ -0,0 +1,72 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..activity import ActivityHistory
+from ..models import Bill, BillDailyRollup
+
+User = get_user_model()
+
+class SweepOverdueBillsTestCase(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='testpass123')
+        today = timezone.now().date()
+        self.late = Bill.objects.create(customer=self.customer, amount=Decimal('25.00'), status='PENDING',
+                                        due_date=today - timedelta(days=3))
+        self.very_late = Bill.objects.create(customer=self.customer, amount=Decimal('40.00'), status='PENDING',
+                                             due_date=today - timedelta(days=30))
+        self.current = Bill.objects.create(customer=self.customer, amount=Decimal('50.00'), status='PENDING',
+                                           due_date=today + timedelta(days=10))
+        self.paid = Bill.objects.create(customer=self.customer, amount=Decimal('10.00'), status='PAID',
+                                        due_date=today - timedelta(days=5))
+
+    def sweep(self, *args):
+        out = StringIO()
+        call_command('sweep_overdue_bills', *args, stdout=out)
+        return out.getvalue()
+
+    def test_sweep_marks_past_due_bills(self):
+        """Test that only pending bills past their due date become overdue"""
+        output = self.sweep('--batch-size', '1')
+        self.assertIn('Marked 2 bill(s)', output)
+        statuses = dict(Bill.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[self.late.pk], 'OVERDUE')
+        self.assertEqual(statuses[self.very_late.pk], 'OVERDUE')
+        self.assertEqual(statuses[self.current.pk], 'PENDING')
+        self.assertEqual(statuses[self.paid.pk], 'PAID')
+
+    def test_sweep_logs_activity_and_updates_rollups(self):
+        """Test that the sweep records activity and keeps the rollups in sync"""
+        self.sweep()
+        bill_type = ContentType.objects.get_for_model(Bill)
+        logged = ActivityHistory.objects.filter(content_type=bill_type).values_list('object_id', flat=True)
+        self.assertEqual(sorted(logged), sorted([self.late.pk, self.very_late.pk]))
+        overdue = BillDailyRollup.objects.filter(status='OVERDUE')
+        self.assertEqual(sum(row.bill_count for row in overdue), 2)
+
+    def test_sweep_due_date_range(self):
+        """Test that --due-after limits the sweep to a due-date range"""
+        since = (timezone.now().date() - timedelta(days=7)).strftime('%Y-%m-%d')
+        self.sweep('--due-after', since)
+        self.assertEqual(Bill.objects.get(pk=self.late.pk).status, 'OVERDUE')
+        self.assertEqual(Bill.objects.get(pk=self.very_late.pk).status, 'PENDING')
+
+    def test_dry_run_changes_nothing(self):
+        """Test that --dry-run only reports the number of bills"""
+        output = self.sweep('--dry-run')
+        self.assertIn('2 bill(s) would be marked', output)
+        self.assertFalse(Bill.objects.filter(status='OVERDUE').exists())
+
+    def test_bill_list_does_not_write(self):
+        """Test that viewing the bill list no longer updates bill statuses"""
+        self.client.force_login(self.customer)
+        response = self.client.get(reverse('shipping:bill_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Bill.objects.filter(status='OVERDUE').exists())
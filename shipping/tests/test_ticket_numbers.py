@@ -0,0 +1,58 @@
+from datetime import date
+from unittest import mock
+
+from django.test import TestCase, TransactionTestCase
+
+from .. import ticket_numbers
+from ..models import SupportRequest, TicketCounter
+from ..ticket_numbers import TicketNumberAllocator, next_ticket_number
+
+
+def create_ticket(**kwargs):
+    fields = dict(subject='Where is my parcel?', name='Pat', email='pat@example.com', message='Hello')
+    fields.update(kwargs)
+    return SupportRequest.objects.create(**fields)
+
+
+class TicketNumberTestCase(TestCase):
+    def test_sequential_numbers(self):
+        """Test that tickets are numbered per day from the counter table"""
+        day = date(2026, 10, 18)
+        TicketCounter.objects.create(day=day, last_value=41)
+        self.assertEqual(next_ticket_number(day), 'TICKET-20261018-00042')
+        self.assertEqual(next_ticket_number(day), 'TICKET-20261018-00043')
+        self.assertEqual(next_ticket_number(date(2026, 10, 19)), 'TICKET-20261019-00001')
+        self.assertEqual(TicketCounter.objects.get(day=day).last_value, 43)
+
+    def test_save_assigns_number(self):
+        """Test that SupportRequest.save assigns distinct ticket numbers"""
+        first, second = create_ticket(), create_ticket()
+        self.assertTrue(first.ticket_number.startswith('TICKET-'))
+        self.assertNotEqual(first.ticket_number, second.ticket_number)
+        self.assertEqual(int(second.ticket_number[-5:]), int(first.ticket_number[-5:]) + 1)
+
+    def test_keeps_existing_number(self):
+        """Test that an explicit ticket number is left alone"""
+        self.assertEqual(create_ticket(ticket_number='TICKET-LEGACY-1').ticket_number, 'TICKET-LEGACY-1')
+
+
+class TicketNumberBlockTestCase(TransactionTestCase):
+    def test_block_reservation(self):
+        """Test that saves outside a transaction reuse a reserved block"""
+        with mock.patch.object(ticket_numbers, '_allocator', TicketNumberAllocator(5)):
+            create_ticket()
+            counter = TicketCounter.objects.get()
+            self.assertEqual(counter.last_value, 5)
+            for _ in range(4):
+                with self.assertNumQueries(1):
+                    create_ticket()
+            create_ticket()
+            self.assertEqual(TicketCounter.objects.get().last_value, 10)
+
+    def test_workers_share_counter(self):
+        """Test that two workers reserving interleaved blocks never repeat a number"""
+        day = date(2026, 10, 18)
+        workers = [TicketNumberAllocator(3), TicketNumberAllocator(4)]
+        values = [workers[step % 2].next(day) for step in range(40)]
+        self.assertEqual(len(set(values)), 40)
+        self.assertGreaterEqual(TicketCounter.objects.get(day=day).last_value, max(values))
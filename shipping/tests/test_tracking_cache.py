@@ -0,0 +1,179 @@
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import lifecycle
+from ..models import Shipment, ShippingAddress
+from ..tracking_cache import TrackingLookupError, get_tracking, get_trackings, parse_tracking_numbers
+from ..tracking_events import get_tracking_map, ingest_events
+
+START = datetime(2026, 10, 18, 9, 0, tzinfo=dt_timezone.utc)
+
+
+class TrackingCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        get_tracking_map().clear()
+        address = ShippingAddress.objects.create(
+            first_name='Sam', last_name='Sender', address_line1='1 Main St', city='Fremont', state='CA',
+            postal_code='94536', country='US', phone_number='5551234567',
+        )
+        self.shipment = Shipment.objects.create(
+            sender_address=address, recipient_address=address, package_type='parcel',
+            weight=Decimal('1'), length=Decimal('1'), width=Decimal('1'), height=Decimal('1'),
+            shipping_date=date(2026, 10, 18), shipping_cost=Decimal('10'),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            lifecycle.record_event(self.shipment, 'processing', 'Fremont, CA', timestamp=START)
+        self.url = reverse('shipping:tracking', args=[self.shipment.tracking_number])
+        self.api_url = reverse('tracking-lookup', args=[self.shipment.tracking_number])
+
+    def test_page_is_cached_and_revalidated(self):
+        """Test that the tracking page carries validators and a matching poll gets 304 after one version check"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Fremont, CA')
+        etag = response.headers['ETag']
+        self.assertIn('Last-Modified', response.headers)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], etag)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_new_event_invalidates(self):
+        """Test that recording or ingesting an event replaces the cached entry"""
+        etag = self.client.get(self.url).headers['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            lifecycle.record_event(self.shipment, 'shipped', 'Oakland, CA', timestamp=START.replace(hour=10))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Oakland, CA')
+
+        etag = response.headers['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            ingest_events([{'tracking_number': self.shipment.tracking_number, 'status': 'delivered',
+                            'location': 'Reno, NV', 'timestamp': START.replace(hour=11).isoformat()}])
+        self.assertEqual(get_tracking(self.shipment.tracking_number).data['status'], 'delivered')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_change_from_another_process_is_seen(self):
+        """Test that an entry is rebuilt when the shipment moved without this process hearing of it"""
+        etag = self.client.get(self.url).headers['ETag']
+        # No signals and no cache access, as in another worker with its own cache
+        Shipment.objects.filter(pk=self.shipment.pk).update(status='shipped', updated_at=timezone.now())
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['shipment']['status'], 'shipped')
+
+    def test_history_only_event_is_seen(self):
+        """Test that a late event that changes no status still replaces the cached entry"""
+        lifecycle.record_event(self.shipment, 'shipped', 'Oakland, CA', timestamp=START.replace(hour=10))
+        get_tracking(self.shipment.tracking_number)
+        ingest_events([{'tracking_number': self.shipment.tracking_number, 'status': 'processing',
+                        'location': 'Hayward, CA', 'timestamp': START.replace(minute=30).isoformat()}])
+        events = get_tracking(self.shipment.tracking_number).data['events']
+        self.assertEqual([event['location'] for event in events], ['Fremont, CA', 'Hayward, CA', 'Oakland, CA'])
+
+        # Deleting an event, as from the admin
+        self.shipment.tracking_events.get(location='Hayward, CA').delete()
+        self.assertEqual(len(get_tracking(self.shipment.tracking_number).data['events']), 2)
+
+    def test_shipment_save_invalidates(self):
+        """Test that saving the shipment replaces the cached entry"""
+        get_tracking(self.shipment.tracking_number)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.shipment.delivery_date = date(2026, 10, 20)
+            self.shipment.save()
+        self.assertEqual(get_tracking(self.shipment.tracking_number).data['delivery_date'], date(2026, 10, 20))
+
+    def test_api_lookup(self):
+        """Test the public JSON lookup and its conditional GET"""
+        response = self.client.get(self.api_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'processing')
+        self.assertEqual(response.json()['events'][0]['location'], 'Fremont, CA')
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.api_url, HTTP_IF_NONE_MATCH=response.headers['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        self.assertEqual(self.client.get(reverse('tracking-lookup', args=['NOPE'])).status_code, 404)
+
+    def test_unknown_tracking_number(self):
+        """Test that an unknown tracking number still redirects home"""
+        response = self.client.get(reverse('shipping:tracking', args=['NOPE']))
+        self.assertRedirects(response, reverse('shipping:shipping_home'), fetch_redirect_response=False)
+
+
+class TrackingBatchLookupTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        address = ShippingAddress.objects.create(
+            first_name='Sam', last_name='Sender', address_line1='1 Main St', city='Fremont', state='CA',
+            postal_code='94536', country='US', phone_number='5551234567',
+        )
+        self.shipments = []
+        for _ in range(5):
+            shipment = Shipment.objects.create(
+                sender_address=address, recipient_address=address, package_type='parcel',
+                weight=Decimal('1'), length=Decimal('1'), width=Decimal('1'), height=Decimal('1'),
+                shipping_date=date(2026, 10, 18), shipping_cost=Decimal('10'),
+            )
+            lifecycle.record_event(shipment, 'processing', 'Fremont, CA', timestamp=START)
+            lifecycle.record_event(shipment, 'shipped', 'Oakland, CA', timestamp=START.replace(hour=10))
+            self.shipments.append(shipment)
+        self.numbers = [shipment.tracking_number for shipment in self.shipments]
+
+    def test_parse_tracking_numbers(self):
+        """Test that pasted numbers are split, normalized and deduplicated in order"""
+        self.assertEqual(parse_tracking_numbers(' pmb-1, PMB-2\nPMB-1;pmb-3 '), ['PMB-1', 'PMB-2', 'PMB-3'])
+        with self.assertRaises(TrackingLookupError):
+            parse_tracking_numbers(' , ')
+        with self.assertRaises(TrackingLookupError):
+            parse_tracking_numbers([f'PMB-{n}' for n in range(51)])
+
+    def test_lookup_queries_are_fixed(self):
+        """Test that a batch is built with one shipment query and one events query, then checked with one"""
+        with self.assertNumQueries(2):
+            entries = get_trackings(self.numbers + ['NOPE'])
+        self.assertEqual(set(entries), set(self.numbers))
+        self.assertEqual([event['location'] for event in entries[self.numbers[0]].data['events']],
+                         ['Fremont, CA', 'Oakland, CA'])
+        with self.assertNumQueries(1):
+            get_trackings(self.numbers)
+
+    def test_api(self):
+        """Test the batch lookup API"""
+        url = reverse('tracking-batch-lookup')
+        response = self.client.post(url, {'tracking_numbers': [self.numbers[1], 'NOPE', self.numbers[0]]},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['count'], data['found'], data['not_found']), (3, 2, ['NOPE']))
+        self.assertEqual([result['tracking_number'] for result in data['results']], self.numbers[1::-1])
+        self.assertEqual(data['results'][0]['status'], 'shipped')
+        self.assertEqual(len(data['results'][0]['events']), 2)
+
+        response = self.client.post(url, {'tracking_numbers': []}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_page(self):
+        """Test the batch tracking page and the redirect from the single-number form"""
+        text = '\n'.join(self.numbers[:2] + ['NOPE'])
+        response = self.client.get(reverse('shipping:tracking_batch'), {'numbers': text})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.numbers[0])
+        self.assertContains(response, 'Not found:')
+        self.assertEqual(len(response.context['results']), 2)
+
+        response = self.client.post(reverse('shipping:tracking_input_page'), {'tracking_number': text})
+        self.assertTrue(response.url.startswith(reverse('shipping:tracking_batch')))
@@ -0,0 +1,140 @@
+import io
+import json
+import os
+import tempfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Shipment, ShippingAddress, TrackingEvent
+from ..tracking_events import get_tracking_map, ingest_events
+
+User = get_user_model()
+
+START = datetime(2026, 10, 18, 9, 0, tzinfo=dt_timezone.utc)
+
+
+class TrackingEventIngestTestCase(TestCase):
+    def setUp(self):
+        get_tracking_map().clear()
+        address = ShippingAddress.objects.create(
+            first_name='Sam', last_name='Sender', address_line1='1 Main St', city='Fremont', state='CA',
+            postal_code='94536', country='US', phone_number='5551234567',
+        )
+        self.shipments = [
+            Shipment.objects.create(
+                sender_address=address, recipient_address=address, package_type='parcel',
+                weight=Decimal('1'), length=Decimal('1'), width=Decimal('1'), height=Decimal('1'),
+                shipping_date=date(2026, 10, 18), shipping_cost=Decimal('10'),
+            )
+            for _ in range(3)
+        ]
+
+    def event(self, shipment, status='processing', minutes=0, **kwargs):
+        event = {'tracking_number': shipment.tracking_number, 'status': status, 'location': 'Oakland, CA',
+                 'timestamp': (START + timedelta(minutes=minutes)).isoformat()}
+        event.update(kwargs)
+        return event
+
+    def test_ingest_creates_events_and_updates_status(self):
+        """Test that events are stored and each shipment takes the status of its newest event"""
+        first, second, _ = self.shipments
+        result = ingest_events([
+            self.event(first, 'shipped', minutes=5),
+            self.event(first, 'processing', minutes=1),
+            self.event(second, 'Delivered', minutes=2),
+        ])
+        self.assertEqual((result.created, result.duplicates, result.updated_shipments), (3, 0, 2))
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.status, second.status), ('shipped', 'delivered'))
+        self.assertEqual(TrackingEvent.objects.filter(shipment=first).count(), 2)
+
+    def test_duplicates_are_skipped(self):
+        """Test that events already stored or repeated in the batch are skipped"""
+        first = self.shipments[0]
+        ingest_events([self.event(first, minutes=1)])
+        result = ingest_events([self.event(first, minutes=1), self.event(first, minutes=2),
+                                self.event(first, minutes=2)])
+        self.assertEqual((result.created, result.duplicates), (1, 2))
+        self.assertEqual(TrackingEvent.objects.filter(shipment=first).count(), 2)
+
+    def test_late_events_do_not_change_status(self):
+        """Test that an event older than the latest stored one is kept without changing the status"""
+        first = self.shipments[0]
+        ingest_events([self.event(first, 'delivered', minutes=10)])
+        result = ingest_events([self.event(first, 'shipped', minutes=5)])
+        self.assertEqual((result.created, result.updated_shipments), (1, 0))
+        first.refresh_from_db()
+        self.assertEqual(first.status, 'delivered')
+
+    def test_invalid_and_unknown_events(self):
+        """Test that invalid events and unknown tracking numbers are reported"""
+        result = ingest_events([
+            self.event(self.shipments[0]),
+            {'tracking_number': 'PMB-NOPE', 'status': 'shipped', 'location': 'Reno, NV'},
+            self.event(self.shipments[1], status='lost', timestamp='yesterday', location=''),
+        ])
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.unknown, ['PMB-NOPE'])
+        self.assertEqual(result.errors[0][0], 2)
+        self.assertEqual(set(result.errors[0][1]), {'status', 'timestamp', 'location'})
+
+    def test_constant_queries(self):
+        """Test that a warm batch takes the same number of queries whatever its size"""
+        def count(events):
+            with CaptureQueriesContext(connection) as context:
+                ingest_events(events)
+            return len(context.captured_queries)
+
+        ingest_events([self.event(shipment) for shipment in self.shipments])
+        small = [self.event(self.shipments[0], minutes=1)]
+        large = [self.event(shipment, minutes=minute) for minute in range(2, 40) for shipment in self.shipments]
+        self.assertEqual(count(small), count(large))
+        self.assertGreater(get_tracking_map().stats()['hits'], 0)
+
+    def test_deleted_shipment_is_evicted(self):
+        """Test that a cached tracking number of a deleted shipment is reported as unknown"""
+        gone = self.shipments[2]
+        ingest_events([self.event(gone)])
+        number = gone.tracking_number
+        gone.delete()
+        result = ingest_events([self.event(self.shipments[0]), {**self.event(self.shipments[0]),
+                                                                 'tracking_number': number}])
+        self.assertEqual(result.unknown, [number])
+        self.assertEqual(result.created, 1)
+
+    def test_api(self):
+        """Test the ingestion endpoint"""
+        url = reverse('tracking-events-ingest')
+        payload = {'events': [self.event(self.shipments[0], 'shipped')]}
+        self.assertEqual(self.client.post(url, payload, content_type='application/json').status_code, 401)
+
+        admin_user = User.objects.create_superuser(username='admin', password='testpass123')
+        self.client.force_login(admin_user)
+        response = self.client.post(url, payload, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['created'], 1)
+        response = self.client.post(url, {'events': []}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_command(self):
+        """Test the ingest_tracking_events command with a JSON lines file"""
+        handle, path = tempfile.mkstemp(suffix='.jsonl')
+        with os.fdopen(handle, 'w') as events:
+            for minute, shipment in enumerate(self.shipments):
+                events.write(json.dumps(self.event(shipment, 'shipped', minutes=minute)) + '\n')
+            events.write(json.dumps({'tracking_number': 'x'}) + '\n')
+        self.addCleanup(os.remove, path)
+
+        out, err = io.StringIO(), io.StringIO()
+        call_command('ingest_tracking_events', path, batch_size=2, stdout=out, stderr=err)
+        self.assertIn('Stored 3 of 4 event(s)', out.getvalue())
+        self.assertIn('Event 4:', err.getvalue())
+        self.assertEqual(Shipment.objects.filter(status='shipped').count(), 3)
@@ -0,0 +1,184 @@
+from datetime import date, datetime
+from decimal import Decimal
+from threading import Thread
+from unittest import mock
+
+import pytz
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Shipment, ShippingAddress
+from ..shipments import create_shipments
+from ..tracking_events import ingest_events
+from ..tracking_numbers import (
+    MAX_SEQUENCE, MAX_WORKER_ID, TrackingNumberGenerator, WorkerIdNotConfigured, check_character,
+    configured_worker_id, default_worker_id, generate_tracking_number, is_mistyped, is_valid_tracking_number,
+    parse_tracking_number,
+)
+
+User = get_user_model()
+PACIFIC_TZ = pytz.timezone('America/Los_Angeles')
+
+
+class FakeClock:
+    def __init__(self, value):
+        self.value = value
+
+    def __call__(self):
+        return self.value
+
+
+class TrackingNumberGeneratorTestCase(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock(PACIFIC_TZ.localize(datetime(2026, 3, 8, 1, 59, 59)).timestamp())
+        self.generator = TrackingNumberGenerator(7, clock=self.clock)
+
+    def test_format_and_parse(self):
+        """Test the tracking number layout and round trip"""
+        number = self.generator.next()
+        self.assertRegex(number, r'^PMB-20260308-[0-9A-Z]{11}$')
+        prefix, day, milliseconds, worker_id, sequence = parse_tracking_number(number)
+        self.assertEqual((prefix, day, worker_id, sequence), ('PMB', date(2026, 3, 8), 7, 0))
+        self.assertEqual(milliseconds, (1 * 3600 + 59 * 60 + 59) * 1000)
+
+    def test_unique_and_monotonic(self):
+        """Test that numbers are unique and sorted within a day, across DST and clock steps back"""
+        numbers = []
+        for step in range(3000):
+            numbers.append(self.generator.next())
+            # Mostly same-millisecond calls, an hour jump (DST) and a clock stepping back
+            if step == 1000:
+                self.clock.value += 3600
+            elif step == 2000:
+                self.clock.value -= 5
+            elif step % 100 == 0:
+                self.clock.value += 0.001
+        self.assertEqual(len(set(numbers)), len(numbers))
+        self.assertEqual(numbers, sorted(numbers))
+
+    def test_sequence_overflow(self):
+        """Test that exhausting a millisecond's sequence borrows the next millisecond"""
+        numbers = [self.generator.next() for _ in range(MAX_SEQUENCE + 3)]
+        self.assertEqual(len(set(numbers)), len(numbers))
+        self.assertEqual(parse_tracking_number(numbers[-1])[4], 1)
+
+    def test_threads(self):
+        """Test that concurrent callers never receive the same number"""
+        generator = TrackingNumberGenerator(3)
+        results = []
+
+        def work():
+            results.extend(generator.next() for _ in range(2000))
+
+        threads = [Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(results)), 8000)
+
+    def test_workers_do_not_collide(self):
+        """Test that two workers on the same clock produce different numbers"""
+        other = TrackingNumberGenerator(8, clock=self.clock)
+        self.assertNotEqual(self.generator.next(), other.next())
+
+    def test_default_worker_id(self):
+        """Test that a worker id is only guessed in development"""
+        with mock.patch.dict('os.environ', {'PMB_WORKER_ID': '12'}):
+            self.assertEqual(default_worker_id(), 12)
+        with mock.patch.dict('os.environ', clear=True):
+            with self.assertRaises(WorkerIdNotConfigured):
+                default_worker_id()
+            self.assertTrue(0 <= default_worker_id(development=True) <= MAX_WORKER_ID)
+            with override_settings(DEBUG=False):
+                with self.assertRaises(ImproperlyConfigured):
+                    configured_worker_id()
+                with self.settings(TRACKING_WORKER_ID=3):
+                    self.assertEqual(configured_worker_id(), 3)
+
+    def test_check_character(self):
+        """Test that typos and transpositions are rejected"""
+        number = self.generator.next()
+        self.assertTrue(is_valid_tracking_number(number))
+        self.assertTrue(is_valid_tracking_number(number.lower()))
+        body = number[-11:-1]
+        self.assertEqual(check_character(body), number[-1])
+        typo = number[:-3] + ('A' if number[-3] != 'A' else 'B') + number[-2:]
+        self.assertFalse(is_valid_tracking_number(typo))
+        swapped = number[:-4] + number[-3] + number[-4] + number[-2:]
+        if swapped != number:
+            self.assertFalse(is_valid_tracking_number(swapped))
+        self.assertFalse(is_valid_tracking_number('PMB-20260308-ABCDE'))
+
+        # Only numbers shaped like generated ones are judged
+        self.assertTrue(is_mistyped(typo))
+        self.assertFalse(is_mistyped(number))
+        self.assertFalse(is_mistyped('PMB-20260308-ABCDE'))
+
+
+class ShipmentTrackingNumberTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='sender', password='testpass123')
+        self.address = ShippingAddress.objects.create(
+            user=self.user, first_name='Sam', last_name='Sender', address_line1='1 Main St',
+            city='Fremont', state='CA', postal_code='94536', country='US', phone_number='5551234567',
+        )
+
+    def test_assigned_on_save(self):
+        """Test that shipments saved without a tracking number get a generated one"""
+        shipments = [
+            Shipment.objects.create(
+                sender_address=self.address, recipient_address=self.address, package_type='parcel',
+                weight=Decimal('1.00'), length=1, width=1, height=1, shipping_date=date.today(),
+                shipping_cost=Decimal('12.00'),
+            )
+            for _ in range(3)
+        ]
+        numbers = [shipment.tracking_number for shipment in shipments]
+        self.assertEqual(len(set(numbers)), 3)
+        self.assertTrue(all(is_valid_tracking_number(number) for number in numbers))
+
+    def create(self, **fields):
+        return Shipment.objects.create(
+            sender_address=self.address, recipient_address=self.address, package_type='parcel',
+            weight=Decimal('1.00'), length=1, width=1, height=1, shipping_date=date.today(),
+            shipping_cost=Decimal('12.00'), **fields
+        )
+
+    def test_taken_number_is_retried(self):
+        """Test that a generated number another process already used is replaced once"""
+        taken = self.create().tracking_number
+        fresh = generate_tracking_number()
+        with mock.patch('shipping.models.generate_tracking_number', side_effect=[taken, fresh]):
+            self.assertEqual(self.create().tracking_number, fresh)
+        with mock.patch('shipping.models.generate_tracking_number', return_value=taken):
+            with self.assertRaises(IntegrityError):
+                self.create()
+
+    def test_taken_number_is_retried_in_bulk(self):
+        """Test that create_shipments draws new numbers once when a generated one is taken"""
+        taken = self.create().tracking_number
+        spec = {
+            'sender_address': self.address, 'recipient_address': self.address, 'package_type': 'parcel',
+            'weight': Decimal('1'), 'length': Decimal('1'), 'width': Decimal('1'), 'height': Decimal('1'),
+            'shipping_date': date.today(), 'shipping_cost': Decimal('12.00'),
+        }
+        numbers = [taken, generate_tracking_number(), generate_tracking_number(), generate_tracking_number()]
+        with mock.patch('shipping.shipments.generate_tracking_number', side_effect=numbers):
+            shipments = create_shipments([dict(spec), dict(spec)], invoice=False)
+        self.assertEqual([shipment.tracking_number for shipment in shipments], numbers[2:])
+        self.assertEqual(Shipment.objects.count(), 3)
+
+    def test_mistyped_numbers_are_not_looked_up(self):
+        """Test that the tracking page and event ingestion reject numbers failing their check character"""
+        number = self.create().tracking_number
+        typo = number[:-3] + ('A' if number[-3] != 'A' else 'B') + number[-2:]
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('shipping:tracking', args=[typo]))
+        self.assertRedirects(response, reverse('shipping:shipping_home'), fetch_redirect_response=False)
+
+        result = ingest_events([{'tracking_number': typo, 'status': 'shipped', 'location': 'Oakland, CA'}])
+        self.assertEqual(list(result.errors[0][1]), ['tracking_number'])
@@ -0,0 +1,97 @@
+"""
+Support ticket numbering.
+
+Tickets are numbered ``TICKET-YYYYMMDD-NNNNN`` per day. The last number
+handed out for each day is kept in ``TicketCounter`` and advanced with one
+atomic ``UPDATE ... SET last_value = last_value + n``, so concurrent saves
+can never read the same value.
+
+In autocommit mode each process reserves ``TICKET_NUMBER_BLOCK_SIZE``
+numbers at a time and hands them out from memory, so most ticket saves are
+a single INSERT. Inside a transaction only one number is reserved and the
+counter row stays locked until commit: a reservation that is rolled back
+returns its number, where a rolled-back block would leave this process
+holding numbers the database no longer considers taken.
+
+Numbers are unique and increase within a process, but are not gap-free:
+whatever is left of a block when a process exits is never used.
+
+Settings:
+    TICKET_NUMBER_BLOCK_SIZE: numbers reserved per round-trip (default 20)
+"""
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import TicketCounter
+
+TICKET_PREFIX = 'TICKET'
+
+
+def format_ticket_number(day, value):
+    return f'{TICKET_PREFIX}-{day:%Y%m%d}-{value:05d}'
+
+
+def reserve_ticket_numbers(day, count):
+    """Advance the counter of ``day`` by ``count`` and return the first reserved value."""
+    with transaction.atomic():
+        updated = TicketCounter.objects.filter(day=day).update(last_value=F('last_value') + count)
+        if not updated:
+            try:
+                with transaction.atomic():
+                    TicketCounter.objects.create(day=day, last_value=count)
+                return 1
+            except IntegrityError:
+                # Another process created the row first
+                TicketCounter.objects.filter(day=day).update(last_value=F('last_value') + count)
+        last_value = TicketCounter.objects.filter(day=day).values_list('last_value', flat=True).get()
+    return last_value - count + 1
+
+
+class TicketNumberAllocator:
+    """Hands out ticket numbers from blocks reserved in the database."""
+
+    def __init__(self, block_size):
+        self.block_size = max(1, block_size)
+        self._day = None
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def next(self, day):
+        if connection.in_atomic_block or self.block_size == 1:
+            return reserve_ticket_numbers(day, 1)
+        with self._lock:
+            if day != self._day or self._next >= self._end:
+                self._next = reserve_ticket_numbers(day, self.block_size)
+                self._end = self._next + self.block_size
+                self._day = day
+            value = self._next
+            self._next += 1
+            return value
+
+    def reset(self):
+        with self._lock:
+            self._day = None
+            self._next = self._end = 0
+
+
+_allocator = None
+_allocator_lock = threading.Lock()
+
+
+def get_allocator():
+    global _allocator
+    with _allocator_lock:
+        if _allocator is None:
+            _allocator = TicketNumberAllocator(getattr(settings, 'TICKET_NUMBER_BLOCK_SIZE', 20))
+        return _allocator
+
+
+def next_ticket_number(day=None):
+    """Return a new, unique ticket number for ``day`` (default: today)."""
+    day = day or timezone.now().date()
+    return format_ticket_number(day, get_allocator().next(day))
@@ -0,0 +1,196 @@
+"""
+Cached read model of the public tracking page.
+
+Customers refresh ``shipping:tracking`` and poll ``/api/tracking/<number>/``
+constantly. Both are built from one ``TrackingEntry`` per tracking number
+(``get_tracking``), kept in the Django cache. Batch lookups
+(``shipping:tracking_batch``, ``/api/tracking/batch/``) read up to
+TRACKING_LOOKUP_MAX_NUMBERS entries with one ``get_many`` (``get_trackings``).
+
+An entry is versioned by its shipment's ``updated_at``, which every change
+to the shipment or its tracking events moves: ``Shipment.save``,
+``shipping.lifecycle``, the TrackingEvent signal handler in
+``shipping.signals`` and ``tracking_events.ingest_events``. Before an
+entry is served, the current ``updated_at`` is read with one query on the
+unique tracking number index; a stale entry is rebuilt. Nothing relies on
+invalidating the cache, so a per-process cache never serves another
+process's stale page. A batch checks all its entries with one query and
+rebuilds the stale or missing ones with one ``tracking_number__in`` query
+and one prefetched events query. Numbers that fail their check character
+(``tracking_numbers.is_mistyped``) are not found without any query.
+
+Each entry carries an ETag (a digest of its contents) and Last-Modified
+(its ``updated_at``), so a conditional GET that still matches is answered
+with 304 after the version check alone, without rebuilding or rendering
+the page.
+
+Settings:
+    TRACKING_CACHE_TIMEOUT: seconds an unused entry is kept (default 300)
+    TRACKING_LOOKUP_MAX_NUMBERS: tracking numbers per batch lookup (default 50)
+"""
+import hashlib
+import json
+import re
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.db.models import Prefetch
+from django.utils.http import http_date
+
+from .models import SHIPPING_STATUS_CHOICES, Shipment, TrackingEvent
+from .tracking_numbers import is_mistyped
+
+STATUS_LABELS = dict(SHIPPING_STATUS_CHOICES)
+
+SHIPMENT_FIELDS = (
+    'tracking_number', 'status', 'latest_location', 'status_changed_at', 'shipping_date', 'delivery_date',
+    'shipping_cost',
+)
+EVENT_FIELDS = ('status', 'location', 'description', 'timestamp')
+
+# data: the shipment as a dict, with its events under 'events' in time order;
+# last_modified: the shipment's updated_at when the entry was built
+TrackingEntry = namedtuple('TrackingEntry', ['data', 'etag', 'last_modified'])
+
+# Tracking numbers are pasted one per line or separated by commas or spaces
+SEPARATORS = re.compile(r'[\s,;]+')
+
+
+class TrackingLookupError(ValueError):
+    """Raised when a batch lookup is empty or too large."""
+
+
+def cache_timeout():
+    return getattr(settings, 'TRACKING_CACHE_TIMEOUT', 300)
+
+
+def max_numbers():
+    return getattr(settings, 'TRACKING_LOOKUP_MAX_NUMBERS', 50)
+
+
+def cache_key(tracking_number):
+    # Tracking numbers come from the URL, so they are hashed into a safe key
+    return 'tracking:%s' % hashlib.sha1(tracking_number.encode()).hexdigest()
+
+
+def parse_tracking_numbers(value):
+    """
+    Split pasted text (or a list) into distinct tracking numbers, in order.
+
+    Raises TrackingLookupError if there are none or more than
+    TRACKING_LOOKUP_MAX_NUMBERS.
+    """
+    if isinstance(value, str):
+        value = SEPARATORS.split(value)
+    numbers = list(dict.fromkeys(str(number).strip().upper() for number in value if str(number).strip()))
+    if not numbers:
+        raise TrackingLookupError('Enter at least one tracking number.')
+    if len(numbers) > max_numbers():
+        raise TrackingLookupError(f'Enter at most {max_numbers()} tracking numbers at a time.')
+    return numbers
+
+
+def build_trackings(tracking_numbers):
+    """Read shipments and their events into TrackingEntries keyed by tracking number, with two queries."""
+    # updated_at is read before the events, so an event written in between only causes one more rebuild
+    shipments = Shipment.objects.filter(tracking_number__in=list(tracking_numbers)).only(
+        'pk', 'updated_at', *SHIPMENT_FIELDS
+    ).prefetch_related(Prefetch(
+        'tracking_events',
+        queryset=TrackingEvent.objects.order_by('timestamp', 'pk').only('shipment_id', *EVENT_FIELDS),
+    ))
+    entries = {}
+    for shipment in shipments:
+        data = {field: getattr(shipment, field) for field in SHIPMENT_FIELDS}
+        data['status_display'] = STATUS_LABELS.get(shipment.status, shipment.status)
+        data['events'] = [
+            {
+                **{field: getattr(event, field) for field in EVENT_FIELDS},
+                'status_display': STATUS_LABELS.get(event.status, event.status),
+            }
+            for event in shipment.tracking_events.all()
+        ]
+        digest = hashlib.sha1(json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True).encode()).hexdigest()
+        entries[shipment.tracking_number] = TrackingEntry(data, digest, shipment.updated_at)
+    return entries
+
+
+def build_tracking(tracking_number):
+    """Read one shipment and its events into a TrackingEntry, or return None."""
+    return build_trackings([tracking_number]).get(tracking_number)
+
+
+def current_versions(tracking_numbers):
+    """Return {tracking number: updated_at} of the shipments that still exist, with one query."""
+    return dict(Shipment.objects.filter(tracking_number__in=list(tracking_numbers)).values_list(
+        'tracking_number', 'updated_at'))
+
+
+def get_tracking(tracking_number):
+    """Return the current TrackingEntry of a tracking number, or None if there is no such shipment."""
+    return get_trackings([tracking_number]).get(tracking_number)
+
+
+def get_trackings(tracking_numbers):
+    """
+    Return the current TrackingEntries of several tracking numbers, keyed by number.
+
+    Numbers with no shipment are left out. Cached entries are read with one
+    ``get_many`` and checked against ``current_versions``; the stale and
+    missing ones are built together and cached with ``set_many``.
+    """
+    tracking_numbers = [number for number in tracking_numbers if not is_mistyped(number)]
+    if not tracking_numbers:
+        return {}
+    keys = {cache_key(number): number for number in tracking_numbers}
+    cached = {keys[key]: entry for key, entry in cache.get_many(list(keys)).items()}
+    entries = {}
+    if cached:
+        versions = current_versions(cached)
+        entries = {number: entry for number, entry in cached.items() if versions.get(number) == entry.last_modified}
+    missing = [number for number in tracking_numbers if number not in entries]
+    if missing:
+        built = build_trackings(missing)
+        cache.set_many({cache_key(number): entry for number, entry in built.items()}, cache_timeout())
+        entries.update(built)
+    return entries
+
+
+def timeline(entry):
+    """Compact form of an entry for batch lookups: current state plus (timestamp, status, location) events."""
+    data = entry.data
+    return {
+        'tracking_number': data['tracking_number'],
+        'status': data['status'],
+        'status_display': data['status_display'],
+        'latest_location': data['latest_location'],
+        'status_changed_at': data['status_changed_at'],
+        'delivery_date': data['delivery_date'],
+        'events': [
+            {'timestamp': event['timestamp'], 'status': event['status'], 'location': event['location']}
+            for event in data['events']
+        ],
+    }
+
+
+def etag(entry, variant=''):
+    """Quoted ETag of ``entry``; ``variant`` tells apart representations that differ per request."""
+    return '"%s%s"' % (entry.etag, f'-{variant}' if variant else '')
+
+
+def not_modified(request, entry, entity_tag):
+    """Return a 304 response if the request's validators still match ``entry``, else None."""
+    return get_conditional_response(
+        request, etag=entity_tag, last_modified=int(entry.last_modified.timestamp()),
+    )
+
+
+def add_validators(response, entry, entity_tag):
+    """Set ETag and Last-Modified and make clients revalidate before reusing ``response``."""
+    response.headers['ETag'] = entity_tag
+    response.headers['Last-Modified'] = http_date(entry.last_modified.timestamp())
+    patch_cache_control(response, no_cache=True)
+    return response
@@ -0,0 +1,352 @@
+"""
+Tracking event ingestion for courier status feeds.
+
+Couriers report events keyed by tracking number, thousands per minute. An
+event is a dict with ``tracking_number``, ``status``, ``location`` and
+optionally ``timestamp`` (ISO 8601, default now) and ``description``.
+``ingest_events`` writes a batch with a fixed number of queries:
+
+- tracking numbers are resolved through ``TrackingNumberMap``, a process
+  local LRU of tracking number -> shipment id (tracking numbers never
+  change), so a busy feed rarely looks them up at all,
+- the batch's shipments are locked with one ``SELECT ... FOR UPDATE``,
+  which also drops ids of shipments deleted since they were cached and
+  serializes concurrent ingests of the same shipment,
+- events already stored, or repeated in the batch, are skipped by their
+  (shipment, status, timestamp) key, read with one indexed query,
+- the new events are inserted with one ``bulk_create``,
+- each shipment's new events are walked in time order through the
+  ``shipping.lifecycle`` transitions, and the status, ``latest_event``,
+  ``latest_location`` and ``status_changed_at`` of all shipments are
+  written with one ``bulk_update`` for the whole batch. Events older than
+  the shipment's latest stored event, and events with a status the
+  shipment cannot move to (a courier re-sending an early scan after a
+  later one), are recorded as history only: they are stored, so a poller
+  sees them as duplicates next time, but only bump ``updated_at``, which
+  versions the cached tracking page (see ``shipping.tracking_cache``),
+- on commit, the new events are pushed to live subscribers (see
+  ``shipping.live``).
+
+Settings:
+    TRACKING_ID_CACHE_SIZE: tracking numbers kept in the map (default 100000)
+    TRACKING_INGEST_BATCH_SIZE: events written per transaction (default 1000)
+    TRACKING_INGEST_MAX_EVENTS: largest batch accepted by the API (default 5000)
+"""
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import lifecycle, live
+from .models import SHIPPING_STATUS_CHOICES, Shipment, TrackingEvent
+from .tracking_numbers import is_mistyped
+
+REQUIRED_MESSAGE = 'This field is required.'
+
+# Status values and labels, case-insensitively
+STATUSES = {
+    **{label.casefold(): value for value, label in SHIPPING_STATUS_CHOICES},
+    **{value.casefold(): value for value, _ in SHIPPING_STATUS_CHOICES},
+}
+
+
+class IngestResult:
+    """Outcome of ingesting a batch of tracking events."""
+
+    def __init__(self):
+        self.received = 0
+        self.created = 0
+        self.duplicates = 0
+        self.updated_shipments = 0
+        # Events stored without moving their shipment: late, or to a status it cannot reach
+        self.history = 0
+        # Tracking numbers that match no shipment
+        self.unknown = []
+        # (position in the batch, {field: [messages]})
+        self.errors = []
+
+    def merge(self, other, offset=0):
+        self.received += other.received
+        self.created += other.created
+        self.duplicates += other.duplicates
+        self.updated_shipments += other.updated_shipments
+        self.history += other.history
+        self.unknown.extend(other.unknown)
+        self.errors.extend((position + offset, errors) for position, errors in other.errors)
+
+    def as_dict(self):
+        return {
+            'received': self.received,
+            'created': self.created,
+            'duplicates': self.duplicates,
+            'updated_shipments': self.updated_shipments,
+            'history': self.history,
+            'unknown': self.unknown,
+            'errors': [{'index': position, 'errors': errors} for position, errors in self.errors],
+        }
+
+
+class TrackingNumberMap:
+    """Bounded LRU of tracking number -> shipment id."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolve(self, tracking_numbers):
+        """Return {tracking number: shipment id} for the numbers that exist, with at most one query."""
+        found = {}
+        missing = []
+        with self._lock:
+            for number in tracking_numbers:
+                shipment_id = self._ids.get(number)
+                if shipment_id is None:
+                    missing.append(number)
+                else:
+                    self._ids.move_to_end(number)
+                    found[number] = shipment_id
+            self.hits += len(found)
+            self.misses += len(missing)
+        if missing:
+            loaded = dict(Shipment.objects.filter(tracking_number__in=missing).values_list('tracking_number', 'id'))
+            found.update(loaded)
+            self._store(loaded)
+        return found
+
+    def _store(self, ids):
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._ids.update(ids)
+            for number in ids:
+                self._ids.move_to_end(number)
+            while len(self._ids) > self.maxsize:
+                self._ids.popitem(last=False)
+
+    def evict(self, tracking_numbers):
+        with self._lock:
+            for number in tracking_numbers:
+                self._ids.pop(number, None)
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._ids), 'maxsize': self.maxsize}
+
+
+_tracking_map = None
+_tracking_map_lock = threading.Lock()
+
+
+def get_tracking_map():
+    global _tracking_map
+    with _tracking_map_lock:
+        if _tracking_map is None:
+            _tracking_map = TrackingNumberMap(getattr(settings, 'TRACKING_ID_CACHE_SIZE', 100000))
+        return _tracking_map
+
+
+def batch_size():
+    return getattr(settings, 'TRACKING_INGEST_BATCH_SIZE', 1000)
+
+
+def max_events():
+    return getattr(settings, 'TRACKING_INGEST_MAX_EVENTS', 5000)
+
+
+def _parse_timestamp(value):
+    if isinstance(value, datetime):
+        timestamp = value
+    else:
+        timestamp = parse_datetime(str(value).strip())
+        if timestamp is None:
+            raise ValueError
+    if timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp)
+    return timestamp
+
+
+def clean_event(event, now=None):
+    """Return ``(data, errors)`` for one event; ``data`` is None when the event is invalid."""
+    if not isinstance(event, dict):
+        return None, {'non_field_errors': ['Expected an object with the event fields.']}
+
+    data = {}
+    errors = {}
+    for field in ('tracking_number', 'status', 'location'):
+        value = event.get(field)
+        if value in (None, '') or not str(value).strip():
+            errors[field] = [REQUIRED_MESSAGE]
+        else:
+            data[field] = str(value).strip()
+
+    if 'tracking_number' in data and is_mistyped(data['tracking_number']):
+        errors['tracking_number'] = ['The check character does not match; the number is mistyped.']
+    if 'status' in data:
+        status = STATUSES.get(data['status'].casefold())
+        if status is None:
+            errors['status'] = [f'"{data["status"]}" is not a valid choice.']
+        else:
+            data['status'] = status
+    max_length = TrackingEvent._meta.get_field('location').max_length
+    if len(data.get('location', '')) > max_length:
+        errors['location'] = [f'Ensure this value has at most {max_length} characters.']
+
+    if event.get('timestamp') in (None, ''):
+        data['timestamp'] = now or timezone.now()
+    else:
+        try:
+            data['timestamp'] = _parse_timestamp(event['timestamp'])
+        except (TypeError, ValueError):
+            errors['timestamp'] = ['Enter a valid ISO 8601 date and time.']
+    data['description'] = str(event.get('description') or '')
+
+    if errors:
+        return None, errors
+    return data, None
+
+
+def _ingest_batch(events):
+    result = IngestResult()
+    result.received = len(events)
+    now = timezone.now()
+
+    valid = []
+    for position, event in enumerate(events):
+        data, errors = clean_event(event, now)
+        if errors:
+            result.errors.append((position, errors))
+        else:
+            valid.append((position, data))
+    if not valid:
+        return result
+
+    tracking_map = get_tracking_map()
+    ids = tracking_map.resolve({data['tracking_number'] for _, data in valid})
+
+    with transaction.atomic():
+        locked = {
+            pk: (status, changed_at) for pk, status, changed_at in Shipment.objects.select_for_update().filter(
+                pk__in=set(ids.values())
+            ).values_list('pk', 'status', 'status_changed_at')
+        }
+        gone = [number for number, shipment_id in ids.items() if shipment_id not in locked]
+        if gone:
+            tracking_map.evict(gone)
+        unknown = set()
+        resolved = []
+        for position, data in valid:
+            shipment_id = ids.get(data['tracking_number'])
+            if shipment_id in locked:
+                resolved.append((position, shipment_id, data))
+            else:
+                unknown.add(data['tracking_number'])
+        result.unknown = sorted(unknown)
+        if not resolved:
+            return result
+
+        # Stored events in the batch's time window: duplicates and each shipment's latest event
+        seen = set()
+        latest = {}
+        stored = TrackingEvent.objects.filter(
+            shipment_id__in={shipment_id for _, shipment_id, _ in resolved},
+            timestamp__gte=min(data['timestamp'] for _, _, data in resolved),
+        ).values_list('shipment_id', 'status', 'timestamp')
+        for shipment_id, status, timestamp in stored:
+            seen.add((shipment_id, status, timestamp))
+            if shipment_id not in latest or timestamp > latest[shipment_id]:
+                latest[shipment_id] = timestamp
+
+        by_shipment = defaultdict(list)
+        for position, shipment_id, data in resolved:
+            key = (shipment_id, data['status'], data['timestamp'])
+            if key in seen:
+                result.duplicates += 1
+                continue
+            seen.add(key)
+            by_shipment[shipment_id].append((position, data))
+
+        # Walk each shipment's new events in time order from its current status
+        new_events = []
+        heads = {}
+        for shipment_id, entries in by_shipment.items():
+            status, changed_at = locked[shipment_id]
+            head = None
+            for position, data in sorted(entries, key=lambda entry: entry[1]['timestamp']):
+                event = TrackingEvent(
+                    shipment_id=shipment_id, status=data['status'], location=data['location'],
+                    timestamp=data['timestamp'], description=data['description'],
+                )
+                is_newest = shipment_id not in latest or data['timestamp'] >= latest[shipment_id]
+                if is_newest and lifecycle.can_transition(status, data['status']):
+                    if data['status'] != status:
+                        status, changed_at = data['status'], data['timestamp']
+                    head = event
+                else:
+                    result.history += 1
+                new_events.append(event)
+            if head is not None:
+                heads[shipment_id] = (head, status, changed_at)
+        TrackingEvent.objects.bulk_create(new_events, batch_size=batch_size())
+        result.created = len(new_events)
+        # bulk_create sends no signals
+        changed = {event.shipment_id for event in new_events}
+        if new_events:
+            numbers = {shipment_id: number for number, shipment_id in ids.items() if shipment_id in changed}
+            transaction.on_commit(partial(live.publish_events, new_events, numbers))
+        result.errors.sort(key=lambda error: error[0])
+
+        if heads and next(iter(heads.values()))[0].pk is None:
+            event_ids = {
+                (shipment_id, status, timestamp): pk for shipment_id, status, timestamp, pk in
+                TrackingEvent.objects.filter(
+                    shipment_id__in=list(heads), timestamp__gte=min(head.timestamp for head, _, _ in heads.values()),
+                ).values_list('shipment_id', 'status', 'timestamp', 'pk')
+            }
+            for head, _, _ in heads.values():
+                head.pk = event_ids[(head.shipment_id, head.status, head.timestamp)]
+
+        updates = [
+            Shipment(pk=shipment_id, status=status, status_changed_at=changed_at, latest_event=head,
+                     latest_location=head.location, updated_at=now)
+            for shipment_id, (head, status, changed_at) in heads.items()
+        ]
+        if updates:
+            Shipment.objects.bulk_update(
+                updates, ['status', 'status_changed_at', 'latest_event', 'latest_location', 'updated_at']
+            )
+        history_only = changed.difference(heads)
+        if history_only:
+            Shipment.objects.filter(pk__in=history_only).update(updated_at=now)
+        result.updated_shipments = sum(
+            1 for shipment_id, (_, status, _) in heads.items() if status != locked[shipment_id][0]
+        )
+    return result
+
+
+def ingest_events(events, size=None):
+    """
+    Store a list of tracking events and return an ``IngestResult``.
+
+    Events are written ``size`` (default TRACKING_INGEST_BATCH_SIZE) at a
+    time, each batch in its own transaction. Invalid events and events for
+    unknown tracking numbers are reported and skipped.
+    """
+    size = size or batch_size()
+    result = IngestResult()
+    for start in range(0, len(events), size):
+        result.merge(_ingest_batch(events[start:start + size]), offset=start)
+    return result
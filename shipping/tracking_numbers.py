@@ -0,0 +1,227 @@
+"""
+Tracking number generation.
+
+Tracking numbers look like ``PMB-20261018-0G2KQ3V8ZMX``: a prefix, the local
+calendar day, ten Crockford base-32 characters and a check character. The
+ten characters encode a Snowflake-style 50-bit value:
+
+    27 bits  milliseconds since local midnight
+    10 bits  worker id
+    13 bits  per-worker sequence within the millisecond
+
+Nothing touches the database, so allocating a number costs no round-trip
+and cannot collide as long as every running process has its own worker id.
+As a last resort ``Shipment.save`` and ``shipments.create_shipments`` retry
+once with fresh numbers when the unique index still rejects one. Within a
+day numbers sort in creation order, so inserts land at the end of the
+unique index instead of at random pages. The check character (Luhn mod 32)
+catches mistyped and transposed characters: ``is_mistyped`` is checked by
+the tracking lookups and by event ingestion before any query is made.
+
+``TrackingNumberGenerator`` only needs the standard library and pytz, so
+the locker app uses it without configuring Django.
+
+Settings:
+    TRACKING_NUMBER_PREFIX: default 'PMB'
+    TRACKING_WORKER_ID: 0-1023 and unique per process; defaults to the
+        PMB_WORKER_ID environment variable. With neither set the shipping
+        app refuses to start unless DEBUG is on, where the process id
+        modulo 1024 is used (unique on one host only)
+"""
+import os
+import re
+import threading
+import time
+from datetime import datetime, time as datetime_time
+
+import pytz
+
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+ALPHABET_INDEX = {char: value for value, char in enumerate(ALPHABET)}
+
+MILLISECOND_BITS = 27
+WORKER_BITS = 10
+SEQUENCE_BITS = 13
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+BODY_LENGTH = (MILLISECOND_BITS + WORKER_BITS + SEQUENCE_BITS) // 5
+
+# Anything shaped like a generated number, whether or not its characters are valid
+GENERATED_SHAPE = re.compile(rf'^[A-Z]+-\d{{8}}-[0-9A-Z]{{{BODY_LENGTH + 1}}}$')
+
+
+def encode_base32(value, length):
+    chars = []
+    for _ in range(length):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+def check_character(payload):
+    """Return the Luhn mod 32 check character of a base-32 string."""
+    total = 0
+    factor = 2
+    for char in reversed(payload):
+        addend = factor * ALPHABET_INDEX[char]
+        total += addend // 32 + addend % 32
+        factor = 1 if factor == 2 else 2
+    return ALPHABET[(32 - total % 32) % 32]
+
+
+def parse_tracking_number(number):
+    """
+    Split a generated tracking number into its parts.
+
+    Returns ``(prefix, day, milliseconds, worker_id, sequence)``, or None if
+    the number is not in the generated format or its check character is wrong.
+    """
+    parts = number.strip().upper().split('-')
+    if len(parts) != 3:
+        return None
+    prefix, day_str, code = parts
+    if len(code) != BODY_LENGTH + 1 or any(char not in ALPHABET_INDEX for char in code):
+        return None
+    body, check = code[:-1], code[-1]
+    if check_character(body) != check:
+        return None
+    try:
+        day = datetime.strptime(day_str, '%Y%m%d').date()
+    except ValueError:
+        return None
+
+    value = 0
+    for char in body:
+        value = value * 32 + ALPHABET_INDEX[char]
+    sequence = value & MAX_SEQUENCE
+    worker_id = (value >> SEQUENCE_BITS) & MAX_WORKER_ID
+    milliseconds = value >> (SEQUENCE_BITS + WORKER_BITS)
+    return prefix, day, milliseconds, worker_id, sequence
+
+
+def is_valid_tracking_number(number):
+    return parse_tracking_number(number) is not None
+
+
+def is_mistyped(number):
+    """
+    Return True if ``number`` is shaped like a generated number but does not parse.
+
+    Numbers in other formats, such as those issued before this generator or
+    imported from manifests, are left for the lookup to decide.
+    """
+    number = number.strip().upper()
+    return bool(GENERATED_SHAPE.match(number)) and not is_valid_tracking_number(number)
+
+
+class TrackingNumberGenerator:
+    """Thread-safe, monotonic tracking number source for one worker."""
+
+    def __init__(self, worker_id, prefix='PMB', tz='America/Los_Angeles', clock=time.time):
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f'worker_id must be between 0 and {MAX_WORKER_ID}')
+        self.worker_id = worker_id
+        self.prefix = prefix
+        self.tz = pytz.timezone(tz) if isinstance(tz, str) else tz
+        self.clock = clock
+        self._day = None
+        self._midnight = None
+        self._last_ms = -1
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def _tick(self):
+        """Return the local day and milliseconds since its midnight."""
+        now = self.clock()
+        day = datetime.fromtimestamp(now, self.tz).date()
+        if self._day is None or day > self._day:
+            # Measured from the real midnight, so DST changes never move the clock backwards
+            self._midnight = self.tz.localize(datetime.combine(day, datetime_time.min)).timestamp()
+            self._day = day
+            self._last_ms = -1
+        return self._day, int((now - self._midnight) * 1000)
+
+    def next(self):
+        """Return a new tracking number."""
+        with self._lock:
+            day, milliseconds = self._tick()
+            if milliseconds > self._last_ms:
+                self._last_ms = milliseconds
+                self._sequence = 0
+            else:
+                # Same millisecond, or the wall clock stepped back: keep counting from the last value
+                self._sequence += 1
+                if self._sequence > MAX_SEQUENCE:
+                    self._last_ms += 1
+                    self._sequence = 0
+            value = (
+                (self._last_ms << (WORKER_BITS + SEQUENCE_BITS))
+                | (self.worker_id << SEQUENCE_BITS)
+                | self._sequence
+            )
+        body = encode_base32(value, BODY_LENGTH)
+        return f'{self.prefix}-{day:%Y%m%d}-{body}{check_character(body)}'
+
+
+class WorkerIdNotConfigured(RuntimeError):
+    """Raised when no worker id is configured and none may be guessed."""
+
+
+def default_worker_id(development=False):
+    """
+    Return the worker id in the PMB_WORKER_ID environment variable.
+
+    Without it, ``development`` falls back to the process id modulo 1024;
+    otherwise WorkerIdNotConfigured is raised. Guessed ids repeat across
+    hosts and containers, and two processes sharing an id can issue the
+    same number.
+    """
+    worker_id = os.environ.get('PMB_WORKER_ID')
+    if worker_id is not None:
+        return int(worker_id)
+    if not development:
+        raise WorkerIdNotConfigured('Set PMB_WORKER_ID to a worker id (0-1023) that is unique per process')
+    return os.getpid() % (MAX_WORKER_ID + 1)
+
+
+def configured_worker_id():
+    """Return TRACKING_WORKER_ID, else ``default_worker_id``, allowing a guess only in DEBUG."""
+    from django.conf import settings
+    from django.core.exceptions import ImproperlyConfigured
+
+    worker_id = getattr(settings, 'TRACKING_WORKER_ID', None)
+    if worker_id is not None:
+        return worker_id
+    try:
+        return default_worker_id(development=settings.DEBUG)
+    except WorkerIdNotConfigured as e:
+        raise ImproperlyConfigured(f'{e}, or set TRACKING_WORKER_ID') from e
+
+
+_generator = None
+_generator_lock = threading.Lock()
+
+
+def get_generator():
+    """
+    Return the process-wide generator.
+
+    The shipping app creates it when Django starts, so a missing worker id
+    stops the process before it serves anything.
+    """
+    from django.conf import settings
+
+    global _generator
+    with _generator_lock:
+        if _generator is None:
+            _generator = TrackingNumberGenerator(
+                configured_worker_id(),
+                prefix=getattr(settings, 'TRACKING_NUMBER_PREFIX', 'PMB'),
+                tz=settings.TIME_ZONE,
+            )
+        return _generator
+
+
+def generate_tracking_number():
+    """Return a new, unique shipment tracking number."""
+    return get_generator().next()
@@ -33,15 +33,18 @@ urlpatterns = [
     path('shipment/<int:pk>/', views.shipment_detail, name='shipment_detail'),
     path('shipment/<int:pk>/cancel/', views.cancel_shipment, name='cancel_shipment'),
     path('shipment/<int:pk>/print-label/', views.print_shipping_label, name='print_shipping_label'),
+    path('shipments/print-labels/', views.print_shipping_labels, name='print_shipping_labels'),
     path('shipment/<int:pk>/generate-bill/', views.generate_shipment_bill, name='generate_shipment_bill'),
     path('shipment/<int:pk>/generate-invoice/', views.generate_shipment_invoice, name='generate_shipment_invoice'),
     path('tracking/<str:tracking_number>/', views.tracking, name='tracking'),
+    path('tracking/<str:tracking_number>/stream/', views.tracking_stream, name='tracking_stream'),
     path('addresses/', views.manage_addresses, name='manage_addresses'),
     path('address/add/', views.add_address, name='add_address'),
     path('address/edit/<int:pk>/', views.edit_address, name='edit_address'),
     path('address/delete/<int:pk>/', views.delete_address, name='delete_address'),
     path('address/set-default/<int:pk>/', views.set_default_address, name='set_default_address'),
     path('track/', views.tracking_input_page, name='tracking_input_page'), # Page for entering tracking number
+    path('track/batch/', views.tracking_batch, name='tracking_batch'), # Several tracking numbers at once
     
     # New pricing page
     path('pricing/', PricingView.as_view(), name='pricing'),
@@ -1,18 +1,33 @@
 import logging
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404, reverse
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST, require_http_methods
 from django.db import transaction
 from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.http import urlencode
 from django.views.generic import TemplateView
-from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from .models import Shipment, ShippingAddress, ShipmentItem, TrackingEvent, Invoice
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_GET, require_http_methods, require_POST
 from .activity import ActivityHistory
 from .forms import ShipmentForm, ShippingAddressForm
 from .models import CourierPlan
+from .decorators import staff_required
+from . import lifecycle
+from . import live
+from . import tracking_cache
+from . import shipments as shipment_service
+from .shipments import calculate_shipping_cost
+from .tracking_numbers import is_mistyped
+from .labels import (
+    LABEL_LAYOUTS, MAX_BATCH_LABELS, iter_file, label_rows, render_label_batch, render_label_sheets,
+    select_label_shipments,
+)
 
 @require_http_methods(["POST"])
 @login_required
@@ -72,123 +87,35 @@ def shipping_home(request):
     }
     return render(request, 'shipping/home.html', context)
 
-def calculate_shipping_cost(package_type, weight):
-    """
-    Calculate shipping cost based on package type and weight.
-    This is a simplified calculation - adjust the rates as needed.
-    """
-    # Base rates by package type (in USD)
-    base_rates = {
-        'document': 5.00,
-        'parcel': 10.00,
-        'oversized': 25.00,
-        'liquid': 15.00,
-        'fragile': 20.00,
-    }
-    
-    # Rate per kg
-    rate_per_kg = 2.00
-    
-    # Get base rate for package type, default to parcel if not found
-    base_rate = base_rates.get(package_type, 10.00)
-    
-    # Calculate total cost
-    total_cost = base_rate + (float(weight) * rate_per_kg)
-    
-    # Round to 2 decimal places
-    return round(total_cost, 2)
-
 def create_shipment(request):
     if request.method == 'POST':
         form = ShipmentForm(request.POST, user=request.user)
         if form.is_valid():
             try:
-                with transaction.atomic():
-                    # Save the shipment first
-                    shipment = form.save(commit=False)
-                    
-                    # Calculate shipping cost
-                    shipping_cost = calculate_shipping_cost(
-                        shipment.package_type,
-                        shipment.weight
+                items = [
+                    {'name': name, 'quantity': quantity, 'description': description}
+                    for name, quantity, description in zip(
+                        request.POST.getlist('item_name'),
+                        request.POST.getlist('item_quantity'),
+                        request.POST.getlist('item_description'),
                     )
-                    shipment.shipping_cost = shipping_cost
-                    
-                    # Set the tracking number if not set
-                    if not shipment.tracking_number:
-                        shipment.tracking_number = generate_tracking_number()
-                    shipment.save()
-                    
-                    # Save the many-to-many relationships
-                    form.save_m2m()
-                    
-                    # Process shipment items
-                    item_names = request.POST.getlist('item_name')
-                    item_quantities = request.POST.getlist('item_quantity')
-                    item_descriptions = request.POST.getlist('item_description')
-                    
-                    # Create shipment items
-                    for name, quantity, description in zip(item_names, item_quantities, item_descriptions):
-                        if name and quantity:  # Only create if name and quantity are provided
-                            ShipmentItem.objects.create(
-                                shipment=shipment,
-                                name=name,
-                                quantity=quantity,
-                                description=description
-                            )
-                    
-                    # Create initial tracking event
-                    TrackingEvent.objects.create(
-                        shipment=shipment,
-                        status='pending',
-                        location='Processing Center',
-                        description='Shipment created and awaiting processing'
+                    if name and quantity  # Only create if name and quantity are provided
+                ]
+                user = request.user if request.user.is_authenticated else None
+                shipment = shipment_service.create_shipment(
+                    dict(form.cleaned_data, items=items), created_by=user, request=request
+                )
+
+                invoice = getattr(shipment, 'invoice', None)
+                if invoice is not None:
+                    messages.success(request, f'Shipment created successfully! Invoice #{invoice.id} has been generated.')
+                else:
+                    messages.warning(
+                        request,
+                        'Shipment created, but there was an error generating the invoice. '\
+                        'Please generate it manually from the shipment details.'
                     )
-                    
-                    # Generate invoice for the shipment
-                    try:
-                        # Ensure we have all required fields for invoice generation
-                        if not shipment.sender_address or not shipment.sender_address.user:
-                            raise ValueError('No sender address or user associated with the shipment')
-                            
-                        if not shipment.shipping_cost:
-                            raise ValueError('Shipping cost is not set')
-                            
-                        # Generate the invoice
-                        invoice = shipment.generate_invoice(created_by=request.user, request=request)
-                        
-                        # Refresh the shipment to ensure we have the latest data
-                        shipment.refresh_from_db()
-                        
-                        # Verify the invoice was created and linked
-                        if hasattr(shipment, 'invoice') and shipment.invoice:
-                            messages.success(request, f'Shipment created successfully! Invoice #{invoice.id} has been generated.')
-                        else:
-                            raise ValueError('Invoice was not properly linked to the shipment')
-                            
-                    except Exception as e:
-                        # Log the error but don't fail the shipment creation
-                        logger = logging.getLogger(__name__)
-                        logger.error(f'Error generating invoice for shipment {shipment.id}: {str(e)}', exc_info=True)
-                        messages.warning(
-                            request,
-                            'Shipment created, but there was an error generating the invoice. '\
-                            'Please generate it manually from the shipment details.'
-                        )
-                    
-                    # Log the shipment creation activity
-                    try:
-                        from .activity import ActivityHistory
-                        ActivityHistory.log_activity(
-                            user=request.user,
-                            action='Created shipment',
-                            obj=shipment,
-                            request=request
-                        )
-                    except Exception as e:
-                        logger.error(f'Error logging shipment creation activity: {str(e)}', exc_info=True)
-                    
-                    return redirect('shipping:shipment_detail', pk=shipment.pk)
+                return redirect('shipping:shipment_detail', pk=shipment.pk)
                     
             except Exception as e:
                 error_msg = f'Error creating shipment: {str(e)}'
@@ -324,25 +251,70 @@ def add_address_ajax(request):
 def tracking_input_page(request):
     if request.method == 'POST':
         tracking_number = request.POST.get('tracking_number', '')
+        if len(tracking_cache.SEPARATORS.split(tracking_number.strip())) > 1:
+            # Several numbers pasted at once
+            return redirect(f"{reverse('shipping:tracking_batch')}?{urlencode({'numbers': tracking_number})}")
         if tracking_number:
-            return redirect(reverse('shipping:tracking', kwargs={'tracking_number': tracking_number}))
+            return redirect(reverse('shipping:tracking', kwargs={'tracking_number': tracking_number.strip()}))
         else:
             messages.error(request, 'Please enter a tracking number.')
             return render(request, 'shipping/tracking_input_page.html')
     return render(request, 'shipping/tracking_input_page.html')
 
+def tracking_batch(request):
+    """Track up to TRACKING_LOOKUP_MAX_NUMBERS shipments on one page."""
+    numbers_text = request.GET.get('numbers', '')
+    results = not_found = None
+    if numbers_text.strip():
+        try:
+            numbers = tracking_cache.parse_tracking_numbers(numbers_text)
+        except tracking_cache.TrackingLookupError as e:
+            messages.error(request, str(e))
+        else:
+            entries = tracking_cache.get_trackings(numbers)
+            results = [tracking_cache.timeline(entries[number]) for number in numbers if number in entries]
+            not_found = [number for number in numbers if number not in entries]
+    return render(request, 'shipping/tracking_batch.html', {
+        'numbers': numbers_text,
+        'results': results,
+        'not_found': not_found,
+        'max_numbers': tracking_cache.max_numbers(),
+    })
+
+async def tracking_stream(request, tracking_number):
+    """Server-sent events of a shipment's new tracking events; see shipping.live."""
+    if not isinstance(request, ASGIRequest):
+        # A WSGI server buffers the endless stream and pins a worker thread per client
+        return HttpResponse('Live tracking updates need the ASGI server.', status=501)
+    if await sync_to_async(tracking_cache.get_tracking)(tracking_number) is None:
+        raise Http404('Shipment not found')
+    response = StreamingHttpResponse(live.event_stream(tracking_number), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Keeps nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 def tracking(request, tracking_number):
-    try:
-        shipment = Shipment.objects.get(tracking_number=tracking_number)
-        tracking_events = shipment.tracking_events.all().order_by('timestamp')
-        return render(request, 'shipping/tracking.html', {
-            'shipment': shipment,
-            'tracking_events': tracking_events
-        })
-    except Shipment.DoesNotExist:
+    if is_mistyped(tracking_number):
+        messages.error(request, 'This tracking number contains a typo. Please check it and try again.')
+        return redirect('shipping:shipping_home')
+    # Served from the cached read model; unchanged pages are answered with 304
+    entry = tracking_cache.get_tracking(tracking_number)
+    if entry is None:
         messages.error(request, 'Shipment not found')
         return redirect('shipping:shipping_home')
 
+    # The page header differs for signed-in users
+    etag = tracking_cache.etag(entry, request.user.pk if request.user.is_authenticated else '')
+    response = tracking_cache.not_modified(request, entry, etag)
+    if response is None:
+        response = render(request, 'shipping/tracking.html', {
+            'shipment': entry.data,
+            'tracking_events': entry.data['events']
+        })
+    patch_vary_headers(response, ['Cookie'])
+    return tracking_cache.add_validators(response, entry, etag)
+
 def manage_addresses(request):
     if request.method == 'POST':
         form = ShippingAddressForm(request.POST, user=request.user)
@@ -461,16 +433,6 @@ def delete_address(request, pk):
     
     return render(request, 'shipping/delete_address_confirm.html', {'address': address})
 
-def generate_tracking_number():
-    # Generate a tracking number in the format: PMB-YYYYMMDD-XXXXX
-    from datetime import datetime
-    import random
-    import string
-    
-    date_str = datetime.now().strftime('%Y%m%d')
-    random_str = ''.join(random.choices(string.ascii_uppercase + string.digits, k=5))
-    return f"PMB-{date_str}-{random_str}"
-
 @login_required
 def generate_shipment_invoice(request, pk):
     """Generate an invoice for a shipment."""
@@ -517,23 +479,13 @@ def cancel_shipment(request, pk):
         return HttpResponseForbidden("You don't have permission to cancel this shipment.")
     
     # Check if shipment can be cancelled
-    if shipment.status in ['cancelled', 'delivered']:
+    if 'cancelled' not in lifecycle.TRANSITIONS.get(shipment.status, ()):
         messages.error(request, f"Cannot cancel a shipment that is already {shipment.get_status_display().lower()}.")
         return redirect('shipping:shipment_detail', pk=shipment.pk)
     
     try:
-        # Update shipment status
-        old_status = shipment.status
-        shipment.status = 'cancelled'
-        shipment.save()
-        
-        # Create tracking event
-        TrackingEvent.objects.create(
-            shipment=shipment,
-            status='cancelled',
-            location=f"{shipment.sender_address.city}, {shipment.sender_address.state}",
-            description=f"Shipment cancelled by {request.user.get_full_name() or request.user.username}"
-        )
+        # Status, tracking event and latest-event fields change together
+        lifecycle.cancel(shipment, user=request.user)
         
         # Log activity using the helper method
         ActivityHistory.log_activity(
@@ -545,6 +497,8 @@ def cancel_shipment(request, pk):
         
         messages.success(request, f"Shipment #{shipment.tracking_number} has been cancelled successfully.")
         
+    except lifecycle.InvalidTransition as e:
+        messages.error(request, f"Cannot cancel shipment: {e}.")
     except Exception as e:
         messages.error(request, f"Error cancelling shipment: {str(e)}")
     
@@ -553,131 +507,57 @@ def cancel_shipment(request, pk):
 
 def print_shipping_label(request, pk):
     """Generate a PDF shipping label for a shipment."""
-    from reportlab.lib.pagesizes import letter
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.utils import ImageReader
-    from io import BytesIO
-    import qrcode
-    
-    shipment = get_object_or_404(Shipment, pk=pk)
+    shipment = get_object_or_404(Shipment.objects.select_related('sender_address__user'), pk=pk)
     
     # Check permissions
     if not request.user.is_staff and shipment.sender_address.user != request.user:
         return HttpResponseForbidden("You don't have permission to view this label.")
     
-    # Create a file-like buffer to receive PDF data
-    buffer = BytesIO()
-    
-    # Create the PDF object, using the buffer as its "file."
-    p = canvas.Canvas(buffer, pagesize=letter)
-    width, height = letter
-    
-    # Draw the shipping label
-    p.setFont("Helvetica-Bold", 14)
-    p.drawString(72, height - 72, "SHIPPING LABEL")
-    p.line(72, height - 80, width - 72, height - 80)
-    
-    # Add shipping information
-    p.setFont("Helvetica", 10)
-    y = height - 100
-    
-    # From address
-    p.setFont("Helvetica-Bold", 12)
-    p.drawString(72, y, "FROM:")
-    p.setFont("Helvetica", 10)
-    y -= 20
-    # Get the user's full name for the sender
-    sender_name = shipment.sender_address.user.get_full_name() if shipment.sender_address.user else "Sender"
-    p.drawString(72, y, sender_name)
-    y -= 15
-    p.drawString(72, y, shipment.sender_address.address_line1)
-    if shipment.sender_address.address_line2:
-        y -= 15
-        p.drawString(72, y, shipment.sender_address.address_line2)
-    y -= 15
-    p.drawString(72, y, f"{shipment.sender_address.city}, {shipment.sender_address.state} {shipment.sender_address.postal_code}")
-    y -= 15
-    p.drawString(72, y, str(shipment.sender_address.country))
-    
-    # Add phone number if available
-    if shipment.sender_address.phone_number:
-        y -= 15
-        p.drawString(72, y, f"Phone: {shipment.sender_address.phone_number}")
-    
-    # To address
-    y -= 40  # Extra space before TO section
-    p.setFont("Helvetica-Bold", 12)
-    p.drawString(72, y, "TO:")
-    p.setFont("Helvetica", 10)
-    y -= 20
-    # For recipient, we'll use the address as is since we don't have a contact name
-    p.drawString(72, y, "Recipient")
-    y -= 15
-    p.drawString(72, y, shipment.recipient_address.address_line1)
-    if shipment.recipient_address.address_line2:
-        y -= 15
-        p.drawString(72, y, shipment.recipient_address.address_line2)
-    y -= 15
-    p.drawString(72, y, f"{shipment.recipient_address.city}, {shipment.recipient_address.state} {shipment.recipient_address.postal_code}")
-    y -= 15
-    p.drawString(72, y, str(shipment.recipient_address.country))
-    
-    # Add phone number if available
-    if shipment.recipient_address.phone_number:
-        y -= 15
-        p.drawString(72, y, f"Phone: {shipment.recipient_address.phone_number}")
-    
-    # Package info
-    y -= 40
-    p.setFont("Helvetica-Bold", 12)
-    p.drawString(72, y, "SHIPMENT DETAILS:")
-    p.setFont("Helvetica", 10)
-    y -= 20
-    p.drawString(72, y, f"Tracking #: {shipment.tracking_number}")
-    y -= 15
-    p.drawString(72, y, f"Package Type: {shipment.get_package_type_display()}")
-    y -= 15
-    p.drawString(72, y, f"Weight: {shipment.weight} kg")
-    y -= 15
-    p.drawString(72, y, f"Status: {shipment.get_status_display()}")
-    
-    # Add a QR code with tracking info if qrcode is available
-    try:
-        import qrcode
-        try:
-            qr = qrcode.QRCode(version=1, box_size=4, border=4)
-            qr.add_data(f"Tracking Number: {shipment.tracking_number}")
-            qr.make(fit=True)
-            qr_img = qr.make_image(fill_color="black", back_color="white")
-            
-            # Save QR code to a BytesIO object
-            img_io = BytesIO()
-            qr_img.save(img_io, 'PNG')
-            img_io.seek(0)
-            
-            # Draw QR code on PDF
-            qr_img_reader = ImageReader(img_io)
-            p.drawImage(qr_img_reader, width - 200, height - 200, width=100, height=100)
-        except Exception as e:
-            # If QR code generation fails, just add the tracking number as text
-            p.setFont("Helvetica", 8)
-            p.drawString(width - 200, height - 220, f"Tracking: {shipment.tracking_number}")
-    except ImportError:
-        # If qrcode package is not available, just add the tracking number as text
-        p.setFont("Helvetica", 8)
-        p.drawString(width - 200, height - 220, f"Tracking: {shipment.tracking_number}")
-    
-    # Close the PDF object cleanly, and we're done.
-    p.showPage()
-    p.save()
-    
-    # File response for the PDF
-    buffer.seek(0)
-    response = HttpResponse(buffer, content_type='application/pdf')
+    pdf = render_label_sheets(label_rows(Shipment.objects.filter(pk=shipment.pk)), per_sheet=1)
+    response = HttpResponse(pdf, content_type='application/pdf')
     response['Content-Disposition'] = f'attachment; filename="shipping_label_{shipment.tracking_number}.pdf"'
     return response
 
 
+@staff_required
+@require_http_methods(["GET", "POST"])
+def print_shipping_labels(request):
+    """
+    Generate one PDF with the labels of many shipments, several per sheet.
+
+    Shipments are picked by ``ids`` (repeated or comma separated) and/or the
+    ``status``, ``shipping_date`` and ``courier_service`` filters; ``per_sheet``
+    is 1, 4 or 6. The combined PDF is streamed to the client.
+    """
+    params = request.POST if request.method == 'POST' else request.GET
+    try:
+        ids = [int(value) for raw in params.getlist('ids') for value in raw.split(',') if value.strip()]
+        per_sheet = int(params.get('per_sheet', 4))
+    except ValueError:
+        return JsonResponse({'error': 'ids and per_sheet must be integers'}, status=400)
+    if per_sheet not in LABEL_LAYOUTS:
+        return JsonResponse({'error': f'per_sheet must be one of {sorted(LABEL_LAYOUTS)}'}, status=400)
+
+    filters = {key: params.get(key) for key in ('status', 'shipping_date', 'courier_service')}
+    if not ids and not any(filters.values()):
+        return JsonResponse({'error': 'Select shipments with ids or at least one filter'}, status=400)
+
+    try:
+        shipments = select_label_shipments(ids=ids, **filters)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    rows = label_rows(shipments, limit=MAX_BATCH_LABELS + 1)
+    if not rows:
+        return JsonResponse({'error': 'No shipments matched'}, status=404)
+    if len(rows) > MAX_BATCH_LABELS:
+        return JsonResponse({'error': f'At most {MAX_BATCH_LABELS} labels can be printed at once'}, status=400)
+
+    pdf_file = render_label_batch(rows, per_sheet=per_sheet)
+    response = StreamingHttpResponse(iter_file(pdf_file), content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="shipping_labels_{timezone.now():%Y%m%d_%H%M%S}.pdf"'
+    return response
+
+
 #def get_courier_plans(request):
 #   return JsonResponse({"message": "Courier plans retrieved"})
 
@@ -4,7 +4,9 @@ from django.contrib import messages
 from django.core.paginator import Paginator
 from django.conf import settings
 from django.db import transaction
-from django.db.models import Q, Sum, Count, Case, When, Value, IntegerField
+from django.db.models import Q, Sum, Count, Case, When, Value, IntegerField, DecimalField
+from django.db.models.functions import Coalesce
+from django.core.cache import cache
 from django.utils import timezone
 from django.utils.crypto import get_random_string
 from datetime import timedelta, datetime
@@ -13,8 +15,10 @@ from xhtml2pdf import pisa
 from django.contrib.auth import get_user_model, login
 from django.views.generic import ListView, CreateView, FormView, DeleteView, UpdateView
 from django.urls import reverse_lazy, reverse
-from django.http import JsonResponse
+from django.http import FileResponse, JsonResponse
+import hashlib
 import logging
+from urllib.parse import urlencode
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -22,31 +26,27 @@ logger = logging.getLogger(__name__)
 from .models import Bill
 from .activity import ActivityHistory
 from .forms import BillForm, BillFilterForm
+from .search import search_bills
+from .pagination import KeysetPaginationMixin
+from .pdf_render import get_or_render_pdf
 from .decorators import staff_required
 from .constants import BILL_STATUS_CHOICES
 
 User = get_user_model()
 
-class BillListView(ListView):
+# Filter parameters that change the bill list summary, and how long it is cached
+SUMMARY_FILTER_PARAMS = ('status', 'customer', 'search')
+SUMMARY_CACHE_TIMEOUT = getattr(settings, 'BILL_SUMMARY_CACHE_TIMEOUT', 60)
+
+class BillListView(KeysetPaginationMixin, ListView):
     model = Bill
     template_name = 'shipping/billing/bill_list.html'
     context_object_name = 'bills'
     paginate_by = 20
     
     def get_queryset(self):
-        # First, update any pending bills that are now overdue
-        overdue_bills = Bill.objects.filter(
-            status='PENDING',
-            due_date__lt=timezone.now().date()
-        )
-        
-        # Update status to OVERDUE for any pending bills that are now overdue
-        if overdue_bills.exists():
-            updated_count = overdue_bills.update(status='OVERDUE')
-            if updated_count > 0:
-                logger.info(f"Updated {updated_count} bills to OVERDUE status")
-        
-        # Get the base queryset
+        # Read-only: PENDING bills past their due date are flipped to OVERDUE
+        # by the sweep_overdue_bills management command, not on page views.
         queryset = Bill.objects.select_related('customer').order_by('-created_at')
         
         # Apply filters
@@ -72,64 +72,51 @@ class BillListView(ListView):
             queryset = queryset.filter(customer_id=customer_id)
             
         if search:
-            queryset = queryset.filter(
-                Q(description__icontains=search) |
-                Q(customer__username__icontains=search) |
-                Q(id__icontains=search) |
-                Q(customer__first_name__icontains=search) |
-                Q(customer__last_name__icontains=search) |
-                Q(customer__email__icontains=search)
-            )
+            queryset = search_bills(queryset, search)
             
         return queryset
     
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        
-        # Get the base queryset without pagination for summary
-        base_queryset = self.get_queryset()
-        
-        # Get all bills for summary calculations
-        all_bills = Bill.objects.all()
-        
-        # Calculate overdue bills for summary
-        # Include both PENDING bills past due date and bills already marked as OVERDUE
+    def get_summary(self):
+        """
+        Summary card totals for the current filters, computed by the database
+        in one conditional aggregate and cached briefly per filter combination.
+        """
         today = timezone.now().date()
-        
-        # Get bills that are PENDING and past due date
-        pending_overdue = all_bills.filter(
-            status='PENDING',
-            due_date__lt=today
+        filters = {key: self.request.GET.get(key, '') for key in SUMMARY_FILTER_PARAMS}
+        cache_key = 'bill_list_summary:%s:%s' % (
+            today.isoformat(),
+            hashlib.md5(urlencode(sorted(filters.items())).encode()).hexdigest(),
         )
-        
-        # Get bills already marked as OVERDUE
-        already_overdue = all_bills.filter(
-            status='OVERDUE'
+        summary = cache.get(cache_key)
+        if summary is not None:
+            return summary
+
+        overdue = Q(status='PENDING', due_date__lt=today) | Q(status='OVERDUE')
+        summary = self.get_queryset().order_by().aggregate(
+            total_bills=Count('id'),
+            total_amount=Coalesce(Sum('amount'), Value(Decimal('0')), output_field=DecimalField()),
+            pending_amount=Coalesce(Sum('amount', filter=Q(status='PENDING')), Value(Decimal('0')),
+                                    output_field=DecimalField()),
+            overdue_amount=Coalesce(Sum('amount', filter=overdue), Value(Decimal('0')),
+                                    output_field=DecimalField()),
+            overdue_count=Count('id', filter=overdue),
         )
-        
-        # Combine both querysets and remove duplicates
-        overdue_bills_qs = (pending_overdue | already_overdue).distinct()
-        
-        # Calculate totals
-        overdue_amount = sum(bill.amount for bill in overdue_bills_qs if bill.amount is not None)
-        overdue_count = overdue_bills_qs.count()
+        cache.set(cache_key, summary, SUMMARY_CACHE_TIMEOUT)
+        return summary
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
         
         # Add filter form with current request data
         context['filter_form'] = BillFilterForm(self.request.GET or None, user=self.request.user)
         
         # Get unique customers who have bills
         context['customers'] = User.objects.filter(
-            id__in=all_bills.values_list('customer', flat=True).distinct()
+            id__in=Bill.objects.values_list('customer', flat=True)
         ).order_by('first_name', 'last_name', 'username')
         
         # Add summary data for the cards
-        context['summary'] = {
-            'total_bills': all_bills.count(),
-            'total_amount': all_bills.aggregate(total=Sum('amount'))['total'] or 0,
-            'pending_amount': all_bills.filter(status='PENDING').aggregate(total=Sum('amount'))['total'] or 0,
-            'overdue_amount': overdue_amount,
-            'overdue_count': overdue_count,
-        }
+        context['summary'] = self.get_summary()
         
         # Add current request to context for pagination
         context['request'] = self.request
@@ -296,6 +283,31 @@ def bill_detail(request, bill_id):
         'now': timezone.now(),  # Add current time for cache busting
     })
 
+# Simple CSS to ensure basic formatting of bill PDFs
+BILL_PDF_CSS = """
+    body {
+        font-family: Arial, sans-serif;
+        font-size: 10px;
+        line-height: 1.4;
+        margin: 0;
+        padding: 0;
+    }
+    table {
+        width: 100%;
+        border-collapse: collapse;
+        margin: 10px 0;
+    }
+    th, td {
+        border: 1px solid #ddd;
+        padding: 6px;
+        text-align: left;
+    }
+    th {
+        background-color: #f5f5f5;
+        font-weight: bold;
+    }
+"""
+
 def export_bill_pdf(request, bill_id):
     bill = get_object_or_404(Bill, id=bill_id)
     
@@ -371,62 +383,20 @@ def export_bill_pdf(request, bill_id):
     # Render the HTML with context
     html = template.render(context)
     
-    # Create HTTP response with PDF headers
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="bill_{bill.id}.pdf"'
-    
     try:
-        # Generate PDF using xhtml2pdf with minimal configuration
-        from xhtml2pdf import pisa
-        
-        # Simple CSS to ensure basic formatting
-        default_css = """
-            body {
-                font-family: Arial, sans-serif;
-                font-size: 10px;
-                line-height: 1.4;
-                margin: 0;
-                padding: 0;
-            }
-            table {
-                width: 100%;
-                border-collapse: collapse;
-                margin: 10px 0;
-            }
-            th, td {
-                border: 1px solid #ddd;
-                padding: 6px;
-                text-align: left;
-            }
-            th {
-                background-color: #f5f5f5;
-                font-weight: bold;
-            }
-        """
-        
-        # Generate PDF
-        pisa_status = pisa.CreatePDF(
-            html,
-            dest=response,
-            encoding='UTF-8',
-            link_callback=None,
-            show_error_as_pdf=False,
-            xhtml=False,
-            default_css=default_css
-        )
-        
-        # Check for errors
-        if pisa_status.err:
-            logger.error(f'PDF generation error: {pisa_status.err}')
-            messages.error(request, 'Error generating PDF. Please try again.')
-            return redirect('shipping:bill_detail', bill_id=bill.id)
-            
+        # Rendered by the PDF worker pool and cached until the bill changes
+        pdf_path = get_or_render_pdf('bill', bill.id, html, default_css=BILL_PDF_CSS)
     except Exception as e:
         logger.error(f'Error in PDF generation: {str(e)}')
         messages.error(request, f'Error generating PDF: {str(e)}')
         return redirect('shipping:bill_detail', bill_id=bill.id)
-    
-    return response
+
+    if pdf_path is None:
+        messages.info(request, 'The PDF is still being generated. Please try the download again in a moment.')
+        return redirect('shipping:bill_detail', bill_id=bill.id)
+
+    return FileResponse(open(pdf_path, 'rb'), as_attachment=True,
+                        filename=f'bill_{bill.id}.pdf', content_type='application/pdf')
 
 @staff_required
 def update_bill_status(request, bill_id):
@@ -3,7 +3,7 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required, permission_required
 from django.views.generic import ListView, DetailView
 from django.views.decorators.http import require_http_methods
-from django.http import HttpResponse, HttpResponseForbidden
+from django.http import FileResponse, HttpResponse, HttpResponseForbidden
 from django.template.loader import get_template
 from django.utils import timezone
 from xhtml2pdf import pisa
@@ -12,11 +12,13 @@ from io import BytesIO
 from .models import Invoice
 from .activity import ActivityHistory
 from .forms import InvoiceForm
+from .pagination import KeysetPaginationMixin
+from .pdf_render import PdfRenderError, get_or_render_pdf
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
-class InvoiceListView(ListView):
+class InvoiceListView(KeysetPaginationMixin, ListView):
     model = Invoice
     template_name = 'shipping/invoice_list.html'
     context_object_name = 'invoices'
@@ -27,7 +29,7 @@ class InvoiceListView(ListView):
         if not self.request.user.is_staff:
             # Non-staff users only see their own invoices
             queryset = queryset.filter(customer=self.request.user)
-        return queryset.order_by('-created_at')
+        return queryset.select_related('customer').order_by('-created_at', '-id')
 
 def invoice_detail(request, invoice_id):
     """View for displaying invoice details."""
@@ -63,16 +65,19 @@ def export_invoice_pdf(request, invoice_id):
     }
     html = template.render(context)
     
-    # Create PDF
-    result = BytesIO()
-    pdf = pisa.pisaDocument(BytesIO(html.encode("UTF-8")), result)
+    # Rendered by the PDF worker pool and cached until the invoice changes
+    try:
+        pdf_path = get_or_render_pdf('invoice', invoice.id, html)
+    except PdfRenderError:
+        return HttpResponse('Error generating PDF', status=500)
     
-    if not pdf.err:
-        response = HttpResponse(result.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="invoice_{invoice.id}.pdf"'
+    if pdf_path is None:
+        response = HttpResponse('The PDF is still being generated. Please try again in a moment.', status=202)
+        response['Retry-After'] = '5'
         return response
     
-    return HttpResponse('Error generating PDF', status=500)
+    return FileResponse(open(pdf_path, 'rb'), as_attachment=True,
+                        filename=f'invoice_{invoice.id}.pdf', content_type='application/pdf')
 
 @login_required
 @permission_required('shipping.change_invoice', raise_exception=True)